@@ -2,29 +2,79 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
-from app.agent.router import route_tool
+from app.agent.router import keyword_route, route_tool
+from app.agent.session import RetrievedContext, Session, Turn, classify_follow_up, get_session_store
+from app.agent.tiering import TierPolicy
 from app.core.config import get_settings
+from app.core.deadline import (
+    DeadlineExceeded,
+    current_degradations,
+    note_degradation,
+    request_deadline,
+    run_within,
+    stage_budget,
+)
+from app.core.limiter import OverloadedError
 from app.schemas.responses import AgentResponse
+from app.retriever.faiss_store import FAISSStore
+from app.tools.issue_aggregate_tool import issue_aggregate_tool
 from app.tools.internal_qa_tool import internal_qa_tool
 from app.tools.issue_summary_tool import issue_summary_tool
+from app.utils.llm_usage import request_usage
+from app.utils.metrics import FOLLOW_UPS, REQUESTS
+from app.utils.trace import annotate, request_trace, span
+
+
+# LLM routing may use at most this share of the remaining deadline.
+ROUTE_BUDGET_FRACTION = 0.25
 
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _answer_text(tool_out: Dict[str, Any]) -> str:
+    if tool_out.get("answer"):
+        return str(tool_out["answer"])
+    # Issue summaries: keep what a follow-up is likely to refer to.
+    parts = [", ".join(tool_out.get("reported_issues") or []), f"Severity: {tool_out.get('severity', 'Unknown')}"]
+    return "; ".join(p for p in parts if p)
+
+
 class AIAgent:
     """
     Orchestrates:
       1) route user input -> tool
       2) call selected tool
       3) return a unified AgentResponse (structured)
+
+    `tiers` picks the chat model per step (default: from settings).
     """
 
-    def __init__(self):
+    def __init__(self, tiers: Optional[TierPolicy] = None):
         self.settings = get_settings()
+        self.tiers = tiers or TierPolicy.from_settings(self.settings)
+
+    def _deadline_s(self, deadline_ms: Optional[float]) -> Optional[float]:
+        ms = deadline_ms if deadline_ms is not None else self.settings.REQUEST_DEADLINE_MS
+        return ms / 1000.0 if ms and ms > 0 else None
+
+    def _route(self, user_text: str) -> Tuple[str, str]:
+        """
+        LLM routing within its budget; keyword routing when the budget is
+        exhausted or the chat upstream is shedding load.
+        """
+        try:
+            return run_within(
+                lambda: route_tool(user_text, model=self.tiers.tool_model("router")),
+                stage_budget(fraction=ROUTE_BUDGET_FRACTION),
+                stage="route",
+            )
+        except (DeadlineExceeded, OverloadedError):
+            note_degradation("keyword_routing")
+            return keyword_route(user_text)
 
     def run(
         self,
@@ -32,18 +82,83 @@ class AIAgent:
         user_text: str,
         top_k: Optional[int] = None,
         request_id: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        answer_mode: Optional[str] = None,
+        expand_clusters: bool = False,
+        retrieval_mode: Optional[str] = None,
+        session_id: Optional[str] = None,
     ) -> AgentResponse:
         rid = request_id or str(uuid.uuid4())
         ts = _utc_now_iso()
 
-        tool_selected, reasoning = route_tool(user_text)
+        with request_trace(rid), request_deadline(self._deadline_s(deadline_ms)), span("agent.run"):
+            session = get_session_store().get(session_id) if session_id else None
+            follow_up = classify_follow_up(user_text, session)
+            if follow_up is not None:
+                return self._follow_up(
+                    session, follow_up, user_text=user_text, top_k=top_k, rid=rid, ts=ts,
+                    answer_mode=answer_mode, expand_clusters=expand_clusters, retrieval_mode=retrieval_mode,
+                )
 
-        # Run tool
-        if tool_selected == "internal_qa":
-            k = top_k or self.settings.DEFAULT_TOP_K
-            tool_out = internal_qa_tool(user_text, top_k=k).model_dump()
-        else:
-            tool_out = issue_summary_tool(user_text).model_dump()
+            # "All High issues affecting Search": answered from the precomputed
+            # issue-summary store, skipping routing, retrieval and generation.
+            with span("tool.issue_aggregate"):
+                aggregate = issue_aggregate_tool(user_text)
+            if aggregate is not None:
+                REQUESTS.inc(tool="issue_aggregate")
+                annotate(tool="issue_aggregate")
+                if session_id:
+                    get_session_store().record(
+                        session_id, Turn(question=user_text, answer=aggregate.answer, tool="issue_aggregate")
+                    )
+                return AgentResponse(
+                    request_id=rid,
+                    timestamp=ts,
+                    tool_selected="internal_qa",
+                    reasoning="Aggregate query over bug reports, answered from the precomputed issue-summary store.",
+                    tool_output=aggregate.model_dump(),
+                    degradations=current_degradations(),
+                    usage=request_usage(),
+                    session_id=session_id,
+                )
+
+            with span("route"):
+                if answer_mode == "extractive":
+                    # Extractive answers only exist for document Q&A; no need to ask the router.
+                    tool_selected, reasoning = "internal_qa", "answer_mode=extractive requests document Q&A."
+                else:
+                    tool_selected, reasoning = self._route(user_text)
+            REQUESTS.inc(tool=tool_selected)
+            annotate(tool=tool_selected)
+
+            # Run tool
+            retrieved: Dict[str, RetrievedContext] = {}
+            with span(f"tool.{tool_selected}"):
+                if tool_selected == "internal_qa":
+                    k = top_k or self.settings.DEFAULT_TOP_K
+                    tool_out = internal_qa_tool(
+                        user_text,
+                        top_k=k,
+                        answer_mode=answer_mode,
+                        expand_clusters=expand_clusters,
+                        retrieval_mode=retrieval_mode,
+                        on_retrieved=(lambda c: retrieved.update(context=c)) if session_id else None,
+                        tiers=self.tiers,
+                    ).model_dump()
+                else:
+                    tool_out = issue_summary_tool(user_text, model=self.tiers.tool_model("issue_summary")).model_dump()
+            if session_id:
+                get_session_store().record(
+                    session_id,
+                    Turn(
+                        question=user_text,
+                        answer=_answer_text(tool_out),
+                        tool=tool_selected,
+                        context=retrieved.get("context"),
+                    ),
+                )
+            degradations = current_degradations()
+            usage = request_usage()
 
         return AgentResponse(
             request_id=rid,
@@ -51,6 +166,80 @@ class AIAgent:
             tool_selected=tool_selected,  # type: ignore
             reasoning=reasoning,
             tool_output=tool_out,
+            degradations=degradations,
+            usage=usage,
+            session_id=session_id,
+        )
+
+    def _follow_up(
+        self,
+        session: Session,
+        kind: str,
+        *,
+        user_text: str,
+        top_k: Optional[int],
+        rid: str,
+        ts: str,
+        answer_mode: Optional[str],
+        expand_clusters: bool,
+        retrieval_mode: Optional[str],
+    ) -> AgentResponse:
+        """
+        Answer a follow-up in an existing session with document Q&A, skipping
+        the aggregate check and routing. "reuse" answers from the chunks the
+        previous turn retrieved (no embedding or search); "rewrite" searches
+        for the previous question and the follow-up together. Either way the
+        condensed conversation is given to the generation prompt.
+        """
+        last = session.last
+        if kind == "reuse" and last.context is None:
+            # Aggregates and summaries retrieve nothing to reuse.
+            kind = "rewrite"
+        elif kind == "reuse" and last.context.generation != FAISSStore().cached_generation_id():
+            # Reindexed since the previous turn: its chunk_ids may name other chunks now.
+            note_degradation("session_context_stale")
+            kind = "rewrite"
+        FOLLOW_UPS.inc(kind=kind)
+        REQUESTS.inc(tool="internal_qa")
+        annotate(tool="internal_qa", follow_up=kind)
+
+        retrieved: Dict[str, RetrievedContext] = {}
+        k = top_k or self.settings.DEFAULT_TOP_K
+        with span("tool.internal_qa"):
+            tool_out = internal_qa_tool(
+                user_text,
+                top_k=k,
+                answer_mode=answer_mode,
+                expand_clusters=expand_clusters,
+                retrieval_mode=retrieval_mode,
+                search_query=f"{last.question} {user_text}" if kind == "rewrite" else None,
+                context=last.context if kind == "reuse" else None,
+                history=session.history(self.settings.SESSION_HISTORY_TOKENS),
+                on_retrieved=lambda c: retrieved.update(context=c),
+                tiers=self.tiers,
+            ).model_dump()
+        get_session_store().record(
+            session.session_id,
+            Turn(
+                question=user_text,
+                answer=_answer_text(tool_out),
+                tool="internal_qa",
+                context=retrieved.get("context"),
+            ),
+        )
+        if kind == "reuse":
+            reasoning = "Follow-up question in the session; answered from the previous turn's retrieved context."
+        else:
+            reasoning = "Follow-up question in the session; retrieved for the previous question and the follow-up together."
+        return AgentResponse(
+            request_id=rid,
+            timestamp=ts,
+            tool_selected="internal_qa",
+            reasoning=reasoning,
+            tool_output=tool_out,
+            degradations=current_degradations(),
+            usage=request_usage(),
+            session_id=session.session_id,
         )
 
     def run_issue_summary(
@@ -58,6 +247,7 @@ class AIAgent:
         *,
         issue_text: str,
         request_id: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
     ) -> AgentResponse:
         """
         Convenience method for explicit summarize endpoint.
@@ -65,7 +255,12 @@ class AIAgent:
         rid = request_id or str(uuid.uuid4())
         ts = _utc_now_iso()
 
-        tool_out = issue_summary_tool(issue_text).model_dump()
+        with request_trace(rid), request_deadline(self._deadline_s(deadline_ms)), span("tool.issue_summary"):
+            REQUESTS.inc(tool="issue_summary")
+            annotate(tool="issue_summary")
+            tool_out = issue_summary_tool(issue_text, model=self.tiers.tool_model("issue_summary")).model_dump()
+            degradations = current_degradations()
+            usage = request_usage()
 
         return AgentResponse(
             request_id=rid,
@@ -73,4 +268,6 @@ class AIAgent:
             tool_selected="issue_summary",  # type: ignore
             reasoning="Explicit summarize endpoint.",
             tool_output=tool_out,
+            degradations=degradations,
+            usage=usage,
         )
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from string import Formatter
+from typing import Dict, FrozenSet, List
+
+from app.agent.prompts import (
+    HYDE_SYSTEM_PROMPT,
+    HYDE_USER_PROMPT_TEMPLATE,
+    INTERNAL_QA_FOLLOWUP_USER_PROMPT_TEMPLATE,
+    INTERNAL_QA_SYSTEM_PROMPT,
+    INTERNAL_QA_USER_PROMPT_TEMPLATE,
+    ISSUE_SUMMARY_SYSTEM_PROMPT,
+    ISSUE_SUMMARY_USER_PROMPT_TEMPLATE,
+    QUERY_EXPANSION_SYSTEM_PROMPT,
+    QUERY_EXPANSION_USER_PROMPT_TEMPLATE,
+    ROUTER_SYSTEM_PROMPT,
+    ROUTER_USER_PROMPT_TEMPLATE,
+)
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """
+    A (system, user) prompt pair validated once at import time.
+
+    Everything before the first placeholder of the user template is the static
+    prefix: identical bytes for every request, so providers can cache it.
+    """
+    name: str
+    system: str
+    user_template: str
+    static_user_prefix: str
+    fields: FrozenSet[str]
+
+    @property
+    def static_prefix(self) -> str:
+        """
+        System prompt + static head of the user prompt (what providers can cache).
+        """
+        return self.system + self.static_user_prefix
+
+    def render_user(self, **values: str) -> str:
+        try:
+            return self.user_template.format_map(values)
+        except KeyError as e:
+            raise KeyError(f"Prompt '{self.name}' missing value: {e}") from None
+
+    def messages(self, **values: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render_user(**values)},
+        ]
+
+
+def compile_prompt(name: str, system: str, user_template: str) -> CompiledPrompt:
+    """
+    Validate a str.format-style template and record its static prefix.
+    Only plain {field} placeholders are supported (no conversions/format specs).
+    """
+    fields = set()
+    head: List[str] = []
+    for literal, field, spec, conversion in Formatter().parse(user_template):
+        if not fields:
+            # Escaped braces split literals, so the prefix can span several pieces.
+            head.append(literal)
+        if field is None:
+            continue
+        if not field.isidentifier() or spec or conversion:
+            raise ValueError(f"Prompt '{name}' has unsupported placeholder: {{{field}}}")
+        fields.add(field)
+
+    if not fields:
+        raise ValueError(f"Prompt '{name}' has no placeholders.")
+
+    return CompiledPrompt(
+        name=name,
+        system=system,
+        user_template=user_template,
+        static_user_prefix="".join(head),
+        fields=frozenset(fields),
+    )
+
+
+PROMPTS: Dict[str, CompiledPrompt] = {
+    "router": compile_prompt("router", ROUTER_SYSTEM_PROMPT, ROUTER_USER_PROMPT_TEMPLATE),
+    "internal_qa": compile_prompt(
+        "internal_qa", INTERNAL_QA_SYSTEM_PROMPT, INTERNAL_QA_USER_PROMPT_TEMPLATE
+    ),
+    # Same system prompt as internal_qa, so both share the cached prefix.
+    "internal_qa_followup": compile_prompt(
+        "internal_qa_followup", INTERNAL_QA_SYSTEM_PROMPT, INTERNAL_QA_FOLLOWUP_USER_PROMPT_TEMPLATE
+    ),
+    "issue_summary": compile_prompt(
+        "issue_summary", ISSUE_SUMMARY_SYSTEM_PROMPT, ISSUE_SUMMARY_USER_PROMPT_TEMPLATE
+    ),
+    "query_expansion": compile_prompt(
+        "query_expansion", QUERY_EXPANSION_SYSTEM_PROMPT, QUERY_EXPANSION_USER_PROMPT_TEMPLATE
+    ),
+    "hyde": compile_prompt("hyde", HYDE_SYSTEM_PROMPT, HYDE_USER_PROMPT_TEMPLATE),
+}
+
+
+def build_messages(name: str, **values: str) -> List[Dict[str, str]]:
+    """
+    Render chat messages for a registered prompt:
+      [system (static), user (static instructions first, variable content last)]
+    """
+    try:
+        prompt = PROMPTS[name]
+    except KeyError:
+        raise KeyError(f"Unknown prompt: {name}")
+    return prompt.messages(**values)
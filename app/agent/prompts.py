@@ -15,12 +15,14 @@ Rules:
 - reasoning should be short (1-3 sentences).
 """
 
+# User templates keep static instructions first and variable content last,
+# so every request shares a byte-identical prefix (provider prompt caching).
 ROUTER_USER_PROMPT_TEMPLATE = """\
-User request:
-{user_text}
-
 Return JSON:
 {{"tool_selected":"internal_qa|issue_summary","reasoning":"..."}}
+
+User request:
+{user_text}
 """
 
 INTERNAL_QA_SYSTEM_PROMPT = """\
@@ -31,13 +33,30 @@ Be concise and accurate.
 """
 
 INTERNAL_QA_USER_PROMPT_TEMPLATE = """\
+Answer the question using the numbered context blocks below.
+Return a direct answer.
+
 Context:
 {context}
 
 Question:
 {question}
+"""
 
+INTERNAL_QA_FOLLOWUP_USER_PROMPT_TEMPLATE = """\
+Answer the follow-up question using the numbered context blocks below.
+The conversation so far is only there to resolve what the question refers to;
+facts must come from the context.
 Return a direct answer.
+
+Context:
+{context}
+
+Conversation so far:
+{history}
+
+Question:
+{question}
 """
 
 ISSUE_SUMMARY_SYSTEM_PROMPT = """\
@@ -47,9 +66,6 @@ You MUST return valid JSON only (no markdown, no extra commentary).
 """
 
 ISSUE_SUMMARY_USER_PROMPT_TEMPLATE = """\
-Issue text:
-{issue_text}
-
 Return JSON with this schema:
 {{
   "reported_issues": [string],
@@ -57,4 +73,42 @@ Return JSON with this schema:
   "severity": "Low|Medium|High|Critical|Unknown",
   "notes": string
 }}
+
+Issue text:
+{issue_text}
+"""
+
+QUERY_EXPANSION_SYSTEM_PROMPT = """\
+You rewrite search questions for an internal search over bug reports and user feedback.
+You MUST return valid JSON only (no markdown, no extra commentary).
 """
+
+QUERY_EXPANSION_USER_PROMPT_TEMPLATE = """\
+Rewrite the question into short alternative search queries that would find the
+same bug reports or feedback: use other wording, likely product terms and the
+symptoms a user would describe. Do not repeat the original question.
+Return JSON: {{"queries": [string]}}
+
+Number of queries: {count}
+
+Question:
+{question}
+"""
+
+HYDE_SYSTEM_PROMPT = """\
+You write realistic internal bug reports for search indexing.
+Write plain text only.
+"""
+
+HYDE_USER_PROMPT_TEMPLATE = """\
+Write a short bug report that would answer the question below, in this format:
+Title: ...
+Description: ...
+Environment: ...
+Severity: ...
+Keep it under 80 words; invent plausible details where needed.
+
+Question:
+{question}
+"""
+
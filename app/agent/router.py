@@ -1,18 +1,41 @@
 from __future__ import annotations
 
 import json
-from typing import Tuple
-
-from langchain_openai import ChatOpenAI
+import re
+from typing import Optional, Tuple
 
 from app.core.config import get_settings
-from app.agent.prompts import ROUTER_SYSTEM_PROMPT, ROUTER_USER_PROMPT_TEMPLATE
+from app.core.limiter import upstream_slot
+from app.core.llm import get_chat_llm
+from app.agent.prompt_builder import build_messages
 from app.utils.json_guard import parse_json_object
+from app.utils.llm_usage import record_usage
+from app.utils.trace import span
+
+
+# Requests that ask for a summary, or paste a report/log rather than ask a question.
+_SUMMARY_HINTS = re.compile(
+    r"\b(summari[sz]e|summary|tl;?dr|bug report|stack ?trace|traceback|steps to reproduce)\b|สรุป",
+    flags=re.IGNORECASE,
+)
 
 
-def route_tool(user_text: str) -> Tuple[str, str]:
+def keyword_route(user_text: str) -> Tuple[str, str]:
     """
-    LLM-based router.
+    LLM-free routing used when the router's budget is exhausted.
+    Questions go to internal_qa; summary requests and pasted issue text to issue_summary.
+    """
+    text = user_text.strip()
+    if _SUMMARY_HINTS.search(text):
+        return "issue_summary", "Keyword routing: the request asks for a summary of issue text."
+    if len(text) > 400 and "?" not in text:
+        return "issue_summary", "Keyword routing: long statement without a question, treated as issue text."
+    return "internal_qa", "Keyword routing: treated as a question about internal documents."
+
+
+def route_tool(user_text: str, *, model: Optional[str] = None) -> Tuple[str, str]:
+    """
+    LLM-based router (default model: the ROUTER_TIER model).
     Returns (tool_selected, reasoning).
 
     tool_selected: "internal_qa" | "issue_summary"
@@ -21,21 +44,13 @@ def route_tool(user_text: str) -> Tuple[str, str]:
     if not s.is_openai_configured:
         raise RuntimeError("OPENAI_API_KEY is not set. Cannot run router.")
 
-    llm = ChatOpenAI(
-        model=s.OPENAI_CHAT_MODEL,  # e.g., gpt-4o-mini
-        api_key=s.OPENAI_API_KEY,
-        temperature=0,
-    )
-
-    user_prompt = ROUTER_USER_PROMPT_TEMPLATE.format(user_text=user_text.strip())
-    msg = llm.invoke(
-        [
-            {"role": "system", "content": ROUTER_SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ]
-    ).content
-
-    data = parse_json_object(msg)
+    llm = get_chat_llm(model or s.chat_model(s.ROUTER_TIER))  # e.g., gpt-4o-mini
+
+    with upstream_slot("chat"), span("route.llm"):
+        response = llm.invoke(build_messages("router", user_text=user_text.strip()))
+    record_usage("router", response)
+
+    data = parse_json_object(response.content)
 
     tool = data.get("tool_selected", "internal_qa")
     reasoning = data.get("reasoning", "").strip() or "No reasoning provided."
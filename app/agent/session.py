@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.retriever.rerank import tokenize
+from app.utils.metrics import SESSION_BYTES, SESSION_EVICTIONS, SESSIONS
+
+# Question / answer text kept per turn (history is condensed further for prompts).
+MAX_TEXT_CHARS = 1000
+# Rough chars-per-token for English text; good enough for a history budget.
+CHARS_PER_TOKEN = 4
+
+# Follow-ups that point back at what was just retrieved ("its severity", "is it fixed",
+# "that one"). Pronouns count only where they stand for the previous answer: at the
+# start, as subject after an auxiliary, as possessive, or as the final object; a
+# relative "that" ("a bug that affects login") starts a new question.
+_PRONOUN = r"(?:it|this|that|these|those|they|them)"
+_REFERS = re.compile(
+    r"^\s*(?:" + _PRONOUN + r"|it's|that's)\b"
+    r"|\b(?:its|their|theirs)\b"
+    r"|\b(?:is|are|was|were|do|does|did|can|could|should|will|would|has|have|what's|how's)\s+" + _PRONOUN + r"\b"
+    r"|\b(?:that|this|these|those)\s+(?:one|ones)\b"
+    r"|\b" + _PRONOUN + r"\s*[?.!]*\s*$"
+    r"|\b(?:the\s+)?(?:same|above|previous|former|latter)\s+(?:one|ones|bug|bugs|issue|issues)\b"
+    r"|มัน|อันนั้น|อันนี้|ตัวนั้น|เรื่องนี้|เรื่องนั้น",
+    flags=re.IGNORECASE,
+)
+# Follow-ups that continue the previous question with a new aspect ("what about mobile?").
+_CONTINUES = re.compile(
+    r"^\s*(and|also|so|then|but|what about|how about|what else|anything else|more on|และ|แล้ว)\b",
+    flags=re.IGNORECASE,
+)
+# Record fields a bare one-word follow-up can ask about.
+_ASPECTS = frozenset(
+    {
+        "severity", "priority", "status", "component", "components", "environment", "platform", "version",
+        "fix", "workaround", "cause", "impact", "steps", "owner", "description",
+    }
+)
+# A follow-up carries few words of its own; a longer request is a new question.
+_MAX_FOLLOW_UP_TERMS = 6
+
+
+@dataclass(frozen=True)
+class RetrievedContext:
+    """
+    Chunks retrieved for a turn: chunk_id metadata and their scores, in rank
+    order, plus the index generation they came from. chunk_ids are only
+    unique within a generation; after a reindex they may name other chunks.
+    """
+    chunk_ids: Tuple[str, ...]
+    scores: Tuple[float, ...]
+    score_kind: str = "similarity"
+    generation: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Turn:
+    question: str
+    answer: str
+    tool: str
+    context: Optional[RetrievedContext] = None
+    at: float = field(default_factory=time.time)
+
+    def size_bytes(self) -> int:
+        """
+        Memory held by the turn (CPython object sizes; strings shared with other
+        objects are counted as if owned).
+        """
+        n = sys.getsizeof(self) + sys.getsizeof(self.__dict__)
+        n += sys.getsizeof(self.question) + sys.getsizeof(self.answer) + sys.getsizeof(self.tool)
+        if self.context is not None:
+            ids, scores = self.context.chunk_ids, self.context.scores
+            n += sys.getsizeof(self.context) + sys.getsizeof(self.context.__dict__)
+            n += sys.getsizeof(ids) + sys.getsizeof(scores)
+            n += sum(sys.getsizeof(c) for c in ids) + sum(sys.getsizeof(s) for s in scores)
+        return n
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class Session:
+    """
+    Recent turns of one conversation, capped at max_turns and max_bytes
+    (oldest turns are dropped first).
+    """
+
+    def __init__(self, session_id: str, *, max_turns: int, max_bytes: int):
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.turns: Deque[Turn] = deque()
+        self.last_seen = time.monotonic()
+        # Fixed cost of the session itself, so max_bytes bounds the whole entry.
+        self.bytes = (
+            sys.getsizeof(self) + sys.getsizeof(self.__dict__) + sys.getsizeof(self.turns) + sys.getsizeof(session_id)
+        )
+
+    def add(self, turn: Turn) -> None:
+        self.turns.append(turn)
+        self.bytes += turn.size_bytes()
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.bytes > self.max_bytes):
+            self.bytes -= self.turns.popleft().size_bytes()
+
+    @property
+    def last(self) -> Optional[Turn]:
+        return self.turns[-1] if self.turns else None
+
+    def history(self, token_budget: int) -> str:
+        """
+        Most recent turns that fit in token_budget, oldest first, as
+        "User: ... / Assistant: ..." lines. Older answers are clipped harder.
+        """
+        budget = token_budget * CHARS_PER_TOKEN
+        lines: List[str] = []
+        for age, turn in enumerate(reversed(self.turns)):
+            block = f"User: {_clip(turn.question, 300)}\nAssistant: {_clip(turn.answer, 400 if age == 0 else 150)}"
+            if len(block) > budget:
+                break
+            lines.append(block)
+            budget -= len(block) + 1
+        return "\n".join(reversed(lines))
+
+
+def classify_follow_up(text: str, session: Optional[Session]) -> Optional[str]:
+    """
+    "reuse": refers back to what the previous answer retrieved; answer from
+    the same chunks. "rewrite": continues the previous question with a new
+    aspect; retrieve again for both together. None: a new question.
+    """
+    if session is None or session.last is None:
+        return None
+    terms = tokenize(text)
+    if len(terms) > _MAX_FOLLOW_UP_TERMS:
+        return None
+    if _REFERS.search(text):
+        return "reuse"
+    if _CONTINUES.search(text):
+        return "rewrite"
+    # A bare aspect ("severity?") asks about what was just retrieved; any other
+    # single word ("login") is a new topic.
+    return "reuse" if len(terms) == 1 and terms[0] in _ASPECTS else None
+
+
+class SessionStore:
+    """
+    In-memory conversation sessions for one process: least recently used
+    first out when max_sessions is reached, and dropped after ttl_s idle.
+
+    Entries are kept in last-use order, so expired sessions are always at
+    the front and eviction is amortised O(1) per access.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_s: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        max_turns: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        s = get_settings()
+        self.ttl_s = ttl_s if ttl_s is not None else s.SESSION_TTL_S
+        self.max_sessions = max_sessions if max_sessions is not None else s.SESSION_MAX_SESSIONS
+        self.max_turns = max_turns if max_turns is not None else s.SESSION_MAX_TURNS
+        self.max_bytes = max_bytes if max_bytes is not None else s.SESSION_MAX_BYTES
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen < self.ttl_s:
+                break
+            self._drop(oldest.session_id, "ttl")
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)), "capacity")
+
+    def _drop(self, session_id: str, reason: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.bytes
+        SESSION_EVICTIONS.inc(reason=reason)
+
+    def _publish(self) -> None:
+        SESSIONS.set(len(self._sessions))
+        SESSION_BYTES.set(self._bytes)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        The live session (None if unknown or expired); refreshes its TTL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(session_id)
+            self._publish()
+            return session
+
+    def record(self, session_id: str, turn: Turn) -> Session:
+        now = time.monotonic()
+        turn = Turn(
+            question=_clip(turn.question, MAX_TEXT_CHARS),
+            answer=_clip(turn.answer, MAX_TEXT_CHARS),
+            tool=turn.tool,
+            context=turn.context,
+            at=turn.at,
+        )
+        with self._lock:
+            session = self._sessions.get(session_id)
+            before = 0
+            if session is None:
+                session = Session(session_id, max_turns=self.max_turns, max_bytes=self.max_bytes)
+                self._sessions[session_id] = session
+            else:
+                before = session.bytes
+            session.add(turn)
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            self._bytes += session.bytes - before
+            self._evict(now)
+            self._publish()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            session = self._sessions.pop(session_id)
+            self._bytes -= session.bytes
+            self._publish()
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = len(self._sessions)
+            return {
+                "sessions": n,
+                "bytes": self._bytes,
+                "mean_bytes": round(self._bytes / n, 1) if n else 0.0,
+                "max_session_bytes": self.max_bytes,
+            }
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from app.core.config import Settings, get_settings
+
+Tier = Literal["small", "large"]
+
+# Answers that decline, as the Q&A prompt asks for when the context lacks the
+# answer ("If the answer is not present in the context, say you do not know").
+_DONT_KNOW = re.compile(
+    r"\b(i|we) (do not|don't|dont|cannot|can't) (know|tell|say|find|determine)\b"
+    r"|\b(not|isn't|is not) (present|mentioned|found|available|provided|stated|included) in the (provided |given )?context\b"
+    r"|\bcontext (does not|doesn't) (contain|mention|say|include|provide|specify)\b"
+    r"|\bno (relevant )?information (about|on|regarding)\b"
+    r"|ไม่ทราบ|ไม่มีข้อมูล",
+    flags=re.IGNORECASE,
+)
+# Declines come first; a long answer that mentions a gap later is still an answer.
+_DONT_KNOW_HEAD_CHARS = 300
+
+
+def says_dont_know(answer: str) -> bool:
+    return bool(_DONT_KNOW.search(answer[:_DONT_KNOW_HEAD_CHARS]))
+
+
+@dataclass(frozen=True)
+class TierPolicy:
+    """
+    Which chat model each LLM call uses.
+      router / query_expansion / issue_summary: a fixed tier each
+      qa: "small", "large", or "escalate" (small first; large when retrieval
+          confidence is low or the small model's answer says it does not know)
+    With one model for both tiers there is nothing to escalate to.
+    """
+
+    small: str
+    large: str
+    router: Tier = "small"
+    query_expansion: Tier = "small"
+    issue_summary: Tier = "large"
+    qa: str = "escalate"
+
+    @classmethod
+    def from_settings(cls, s: Optional[Settings] = None) -> "TierPolicy":
+        s = s or get_settings()
+        return cls(
+            small=s.chat_model("small"),
+            large=s.chat_model("large"),
+            router=s.ROUTER_TIER,
+            query_expansion=s.QUERY_EXPANSION_TIER,
+            issue_summary=s.ISSUE_SUMMARY_TIER,
+            qa=s.QA_TIER,
+        )
+
+    @property
+    def tiered(self) -> bool:
+        return self.small != self.large
+
+    def model(self, tier: str) -> str:
+        return self.small if tier == "small" else self.large
+
+    def tool_model(self, tool: str) -> str:
+        """
+        Model for "router", "query_expansion" or "issue_summary".
+        """
+        return self.model(getattr(self, tool))
+
+    def qa_first_tier(self, retrieval_confidence: str) -> Tier:
+        """
+        Tier of the first Q&A generation, given confidence_from_scores().
+        """
+        if self.qa in ("small", "large"):
+            return self.qa  # type: ignore[return-value]
+        if not self.tiered:
+            return "large"
+        return "large" if retrieval_confidence == "low" else "small"
+
+    def qa_escalates(self, tier: str, answer: str) -> bool:
+        """
+        Ask the large model again after a small-tier answer that declines.
+        """
+        return self.qa == "escalate" and self.tiered and tier == "small" and says_dont_know(answer)
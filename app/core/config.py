@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import json
 import os
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Dict, Literal, Optional
 
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
@@ -13,19 +14,161 @@ class Settings(BaseModel):
     APP_NAME: str = Field(default="Internal AI Assistant API")
     ENV: Literal["local", "dev", "prod"] = Field(default="local")
     LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = Field(default="INFO")
+    # Logs: one JSON object per line ("json") or the human-readable "text" format.
+    # LOG_ASYNC hands records to a background thread through a queue of
+    # LOG_QUEUE_SIZE (records are dropped, and counted, when it is full).
+    # DEBUG/INFO records are kept for a LOG_SAMPLE_RATE share of requests, and for
+    # LOG_LOAD_SAMPLE_RATE while the queue is over half full; WARNING+ always.
+    LOG_FORMAT: Literal["json", "text"] = Field(default="json")
+    LOG_ASYNC: bool = Field(default=True)
+    LOG_QUEUE_SIZE: int = Field(default=10000, ge=100)
+    LOG_SAMPLE_RATE: float = Field(default=1.0, ge=0, le=1)
+    LOG_LOAD_SAMPLE_RATE: float = Field(default=0.1, ge=0, le=1)
 
     # OpenAI
     OPENAI_API_KEY: str = Field(default="", description="OpenAI API key (required)")
     OPENAI_CHAT_MODEL: str = Field(default="gpt-4o-mini")
     OPENAI_EMBEDDING_MODEL: str = Field(default="text-embedding-3-small")
+    # Optional OpenAI-compatible endpoint (e.g. benchmarks/fake_openai.py)
+    OPENAI_BASE_URL: Optional[str] = Field(default=None)
+
+    # Embeddings: "openai" (OPENAI_EMBEDDING_MODEL) or "hash" (deterministic local
+    # feature hashing, HASH_EMBEDDING_DIM wide; offline CI / evaluation only, not a
+    # semantic model). EMBEDDING_CACHE_PATH: optional SQLite cache of vectors by
+    # (model, text), shared by index builds, the watcher and evaluation runs
+    # (serving queries are never cached).
+    EMBEDDING_PROVIDER: Literal["openai", "hash"] = Field(default="openai")
+    HASH_EMBEDDING_DIM: int = Field(default=1536, ge=8, le=8192)
+    EMBEDDING_CACHE_PATH: Optional[Path] = Field(default=None)
 
     # Data
     DATA_DIR: Path = Field(default=Path("data"))
     STORAGE_DIR: Path = Field(default=Path("storage"))
     FAISS_INDEX_DIR: Path = Field(default=Path("storage/faiss_index"))
 
+    # Index build: vector storage (float16/int8 scalar quantization) and optional
+    # Matryoshka truncation of embeddings to the leading N dimensions. Recorded
+    # in manifest.json; loading and query vectors follow the manifest.
+    INDEX_VECTOR_DTYPE: Literal["float32", "float16", "int8"] = Field(default="float32")
+    INDEX_DIMENSIONS: Optional[int] = Field(default=None, ge=1)
+
+    # Index sharding: "source" = one FAISS index per corpus, "hash" = INDEX_HASH_SHARDS
+    # hash partitions, "none" = single index. Shards are searched in parallel on
+    # SHARD_SEARCH_THREADS threads and skipped when a source filter excludes them.
+    INDEX_SHARDING: Literal["none", "source", "hash"] = Field(default="none")
+    INDEX_HASH_SHARDS: int = Field(default=4, ge=1, le=256)
+    SHARD_SEARCH_THREADS: int = Field(default=8, ge=1, le=256)
+
+    # Serving processes check manifest.json at most every INDEX_RELOAD_CHECK_S
+    # (0 = never) and load a new index generation in the background.
+    INDEX_RELOAD_CHECK_S: float = Field(default=2.0, ge=0)
+
+    # Background reindex jobs (POST /admin/reindex) run in a separate process at
+    # this nice level. /admin/* requires ADMIN_TOKEN in X-Admin-Token (unset = disabled).
+    REINDEX_NICE: int = Field(default=10, ge=0, le=19)
+    ADMIN_TOKEN: Optional[str] = Field(default=None)
+
+    # Directory watcher (scripts.ingest --watch): poll DATA_DIR every WATCH_POLL_S,
+    # apply changes once files are quiet for WATCH_DEBOUNCE_S, and at the latest
+    # WATCH_MAX_DELAY_S after the first change of a burst.
+    WATCH_POLL_S: float = Field(default=1.0, gt=0)
+    WATCH_DEBOUNCE_S: float = Field(default=2.0, ge=0)
+    WATCH_MAX_DELAY_S: float = Field(default=20.0, gt=0)
+
+    # Conversation sessions (/ask session_id): per-process, LRU + idle TTL; each
+    # session keeps at most SESSION_MAX_TURNS turns and SESSION_MAX_BYTES of memory.
+    # Follow-up answers see at most SESSION_HISTORY_TOKENS of condensed history.
+    SESSION_TTL_S: float = Field(default=1800.0, gt=0)
+    SESSION_MAX_SESSIONS: int = Field(default=10000, ge=1)
+    SESSION_MAX_TURNS: int = Field(default=6, ge=1, le=50)
+    SESSION_MAX_BYTES: int = Field(default=16384, ge=1024)
+    SESSION_HISTORY_TOKENS: int = Field(default=400, ge=0)
+
     # Retrieval
     DEFAULT_TOP_K: int = Field(default=5, ge=1, le=20)
+    # "single" query, or several sub-queries embedded in one request, searched in
+    # one batched FAISS call and fused: "multi_query" (local templates/synonyms),
+    # "llm_multi_query" (LLM rephrasings) or "hyde" (LLM-written hypothetical record)
+    RETRIEVAL_MODE: Literal["single", "multi_query", "llm_multi_query", "hyde"] = Field(default="single")
+    MULTI_QUERY_COUNT: int = Field(default=4, ge=2, le=8)
+
+    # Re-ranking (optional second stage over FAISS candidates)
+    RERANK_ENABLED: bool = Field(default=False)
+    RERANK_SCORER: Literal["lexical", "cross_encoder"] = Field(default="lexical")
+    RERANK_MODEL: str = Field(default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = Field(default=20, ge=1, le=200)
+    RERANK_BUDGET_MS: float = Field(default=50.0, gt=0)
+    RERANK_MIN_SCORE: float = Field(default=0.0, ge=0.0, le=1.0)
+
+    # Internal Q&A answers: "generate" (LLM), "extractive" (quote record fields /
+    # sentences, no LLM) or "auto" (extractive when its confidence reaches the threshold)
+    QA_ANSWER_MODE: Literal["auto", "generate", "extractive"] = Field(default="auto")
+    QA_EXTRACTIVE_MIN_CONFIDENCE: float = Field(default=0.8, ge=0.0, le=1.0)
+
+    # Issue summary: schema-constrained output when the provider supports it,
+    # otherwise streamed JSON, closed as soon as the object closes (no trailing text)
+    ISSUE_SUMMARY_OUTPUT_MODE: Literal["json_schema", "stream"] = Field(default="json_schema")
+
+    # Ingestion: index the feedback corpus one line per document with near-duplicate
+    # lines (MinHash/LSH, char-shingle Jaccard >= threshold) collapsed into one
+    # representative; members are expanded at query time only on request
+    FEEDBACK_DEDUP_ENABLED: bool = Field(default=False)
+    FEEDBACK_DEDUP_THRESHOLD: float = Field(default=0.6, gt=0.0, le=1.0)
+
+    # Issue summaries precomputed at ingestion (STORAGE_DIR/issue_summaries.json):
+    # SUMMARY_PRECOMPUTE picks how they are built ("llm", "fields" = from record
+    # fields, no LLM; "off" = not built). Pasted text whose word shingles match a
+    # stored record at SUMMARY_STORE_MIN_SIMILARITY is answered from the store.
+    SUMMARY_PRECOMPUTE: Literal["off", "llm", "fields"] = Field(default="off")
+    SUMMARY_STORE_ENABLED: bool = Field(default=True)
+    SUMMARY_STORE_MIN_SIMILARITY: float = Field(default=0.9, gt=0.0, le=1.0)
+
+    # Adaptive concurrency limit (AIMD) + bounded admission queue per upstream
+    # (chat, embeddings); calls that wait longer than the queue timeout get 503
+    LIMITER_ENABLED: bool = Field(default=True)
+    LIMITER_INITIAL: int = Field(default=16, ge=1)
+    LIMITER_MIN: int = Field(default=1, ge=1)
+    LIMITER_MAX: int = Field(default=64, ge=1)
+    LIMITER_QUEUE_SIZE: int = Field(default=64, ge=0)
+    LIMITER_QUEUE_TIMEOUT_MS: float = Field(default=5000.0, gt=0)
+
+    # Per-request deadline (0 = none); stages degrade instead of overrunning it.
+    # DEADLINE_RESERVE_MS is kept back for fallbacks and the response itself.
+    REQUEST_DEADLINE_MS: float = Field(default=30000.0, ge=0)
+    DEADLINE_RESERVE_MS: float = Field(default=150.0, ge=0)
+
+    # Optional: append /ask and /summarize payloads as JSONL (input for benchmarks/replay.py)
+    REQUEST_LOG_PATH: Optional[Path] = Field(default=None)
+
+    # Usage accounting: tokens and estimated cost per request, tool and tenant
+    # (API_KEY_TENANTS JSON {"<X-API-Key value>": "tenant"}; callers without a
+    # configured key share the "anonymous" tenant). MODEL_PRICES (JSON, USD per
+    # 1M tokens: {"model": {"prompt": .., "cached": .., "completion": ..}}) is
+    # merged over the built-in price list. Totals are flushed every USAGE_FLUSH_S
+    # to USAGE_DIR/usage.sqlite (shared by workers) and a daily rollup
+    # USAGE_DIR/<YYYY-MM-DD>.json. A tenant over its daily budget
+    # (TENANT_BUDGETS_USD JSON {"tenant": usd}, else TENANT_DAILY_BUDGET_USD;
+    # unset = unlimited) gets extractive-only answers ("downgrade") or 429 ("reject").
+    USAGE_ENABLED: bool = Field(default=True)
+    USAGE_DIR: Path = Field(default=Path("storage/usage"))
+    USAGE_FLUSH_S: float = Field(default=5.0, gt=0)
+    API_KEY_TENANTS: Dict[str, str] = Field(default_factory=dict)
+    MODEL_PRICES: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    TENANT_DAILY_BUDGET_USD: Optional[float] = Field(default=None, ge=0)
+    TENANT_BUDGETS_USD: Dict[str, float] = Field(default_factory=dict)
+    BUDGET_ACTION: Literal["downgrade", "reject"] = Field(default="downgrade")
+
+    # Model tiers: CHAT_MODEL_SMALL / CHAT_MODEL_LARGE (unset = OPENAI_CHAT_MODEL,
+    # i.e. a single tier). Routing, query expansion and issue summaries use a
+    # fixed tier each; QA_TIER="escalate" answers Q&A on the small model and
+    # uses the large one when retrieval confidence is low, or asks it again
+    # when the small model's answer says it does not know.
+    CHAT_MODEL_SMALL: Optional[str] = Field(default=None)
+    CHAT_MODEL_LARGE: Optional[str] = Field(default=None)
+    ROUTER_TIER: Literal["small", "large"] = Field(default="small")
+    QUERY_EXPANSION_TIER: Literal["small", "large"] = Field(default="small")
+    ISSUE_SUMMARY_TIER: Literal["small", "large"] = Field(default="large")
+    QA_TIER: Literal["small", "large", "escalate"] = Field(default="escalate")
 
     # Optional: request safety
     MAX_QUERY_CHARS: int = Field(default=2000, ge=200, le=20000)
@@ -34,10 +177,46 @@ class Settings(BaseModel):
     def is_openai_configured(self) -> bool:
         return bool(self.OPENAI_API_KEY.strip())
 
+    @property
+    def embedding_model_id(self) -> str:
+        """
+        Identifies the vector space (recorded in the manifest, keys the embedding cache).
+        """
+        if self.EMBEDDING_PROVIDER == "hash":
+            return f"hash-{self.HASH_EMBEDDING_DIM}"
+        return self.OPENAI_EMBEDDING_MODEL
+
+    def chat_model(self, tier: str) -> str:
+        """
+        Chat model of a tier ("small" / "large").
+        """
+        name = self.CHAT_MODEL_SMALL if tier == "small" else self.CHAT_MODEL_LARGE
+        return name or self.OPENAI_CHAT_MODEL
+
 
 _settings: Optional[Settings] = None
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_json(name: str) -> Dict:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return {}
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"{name} is not valid JSON: {e}") from e
+    if not isinstance(value, dict):
+        raise RuntimeError(f"{name} must be a JSON object")
+    return value
+
+
 def get_settings() -> Settings:
     """
     Loads settings from .env (if present) and environment variables.
@@ -54,16 +233,83 @@ def get_settings() -> Settings:
         APP_NAME=os.getenv("APP_NAME", "Internal AI Assistant API"),
         ENV=os.getenv("ENV", "local"),
         LOG_LEVEL=os.getenv("LOG_LEVEL", "INFO"),
+        LOG_FORMAT=os.getenv("LOG_FORMAT", "json"),
+        LOG_ASYNC=_env_bool("LOG_ASYNC", True),
+        LOG_QUEUE_SIZE=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        LOG_SAMPLE_RATE=float(os.getenv("LOG_SAMPLE_RATE", "1")),
+        LOG_LOAD_SAMPLE_RATE=float(os.getenv("LOG_LOAD_SAMPLE_RATE", "0.1")),
 
         OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", ""),
         OPENAI_CHAT_MODEL=os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini"),
         OPENAI_EMBEDDING_MODEL=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"),
+        OPENAI_BASE_URL=os.getenv("OPENAI_BASE_URL") or None,
+        EMBEDDING_PROVIDER=os.getenv("EMBEDDING_PROVIDER", "openai"),
+        HASH_EMBEDDING_DIM=int(os.getenv("HASH_EMBEDDING_DIM", "1536")),
+        EMBEDDING_CACHE_PATH=Path(os.environ["EMBEDDING_CACHE_PATH"]) if os.getenv("EMBEDDING_CACHE_PATH") else None,
 
         DATA_DIR=Path(os.getenv("DATA_DIR", "data")),
         STORAGE_DIR=Path(os.getenv("STORAGE_DIR", "storage")),
         FAISS_INDEX_DIR=Path(os.getenv("FAISS_INDEX_DIR", "storage/faiss_index")),
+        INDEX_VECTOR_DTYPE=os.getenv("INDEX_VECTOR_DTYPE", "float32"),
+        INDEX_DIMENSIONS=int(os.environ["INDEX_DIMENSIONS"]) if os.getenv("INDEX_DIMENSIONS") else None,
+        INDEX_SHARDING=os.getenv("INDEX_SHARDING", "none"),
+        INDEX_HASH_SHARDS=int(os.getenv("INDEX_HASH_SHARDS", "4")),
+        SHARD_SEARCH_THREADS=int(os.getenv("SHARD_SEARCH_THREADS", "8")),
+        INDEX_RELOAD_CHECK_S=float(os.getenv("INDEX_RELOAD_CHECK_S", "2")),
+        REINDEX_NICE=int(os.getenv("REINDEX_NICE", "10")),
+        ADMIN_TOKEN=os.getenv("ADMIN_TOKEN") or None,
+        WATCH_POLL_S=float(os.getenv("WATCH_POLL_S", "1")),
+        WATCH_DEBOUNCE_S=float(os.getenv("WATCH_DEBOUNCE_S", "2")),
+        WATCH_MAX_DELAY_S=float(os.getenv("WATCH_MAX_DELAY_S", "20")),
+
+        SESSION_TTL_S=float(os.getenv("SESSION_TTL_S", "1800")),
+        SESSION_MAX_SESSIONS=int(os.getenv("SESSION_MAX_SESSIONS", "10000")),
+        SESSION_MAX_TURNS=int(os.getenv("SESSION_MAX_TURNS", "6")),
+        SESSION_MAX_BYTES=int(os.getenv("SESSION_MAX_BYTES", "16384")),
+        SESSION_HISTORY_TOKENS=int(os.getenv("SESSION_HISTORY_TOKENS", "400")),
 
         DEFAULT_TOP_K=int(os.getenv("DEFAULT_TOP_K", "5")),
+        RETRIEVAL_MODE=os.getenv("RETRIEVAL_MODE", "single"),
+        MULTI_QUERY_COUNT=int(os.getenv("MULTI_QUERY_COUNT", "4")),
+        RERANK_ENABLED=_env_bool("RERANK_ENABLED", False),
+        RERANK_SCORER=os.getenv("RERANK_SCORER", "lexical"),
+        RERANK_MODEL=os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+        RERANK_CANDIDATES=int(os.getenv("RERANK_CANDIDATES", "20")),
+        RERANK_BUDGET_MS=float(os.getenv("RERANK_BUDGET_MS", "50")),
+        RERANK_MIN_SCORE=float(os.getenv("RERANK_MIN_SCORE", "0")),
+        QA_ANSWER_MODE=os.getenv("QA_ANSWER_MODE", "auto"),
+        QA_EXTRACTIVE_MIN_CONFIDENCE=float(os.getenv("QA_EXTRACTIVE_MIN_CONFIDENCE", "0.8")),
+        ISSUE_SUMMARY_OUTPUT_MODE=os.getenv("ISSUE_SUMMARY_OUTPUT_MODE", "json_schema"),
+        FEEDBACK_DEDUP_ENABLED=_env_bool("FEEDBACK_DEDUP_ENABLED", False),
+        FEEDBACK_DEDUP_THRESHOLD=float(os.getenv("FEEDBACK_DEDUP_THRESHOLD", "0.6")),
+        SUMMARY_PRECOMPUTE=os.getenv("SUMMARY_PRECOMPUTE", "off"),
+        SUMMARY_STORE_ENABLED=_env_bool("SUMMARY_STORE_ENABLED", True),
+        SUMMARY_STORE_MIN_SIMILARITY=float(os.getenv("SUMMARY_STORE_MIN_SIMILARITY", "0.9")),
+        LIMITER_ENABLED=_env_bool("LIMITER_ENABLED", True),
+        LIMITER_INITIAL=int(os.getenv("LIMITER_INITIAL", "16")),
+        LIMITER_MIN=int(os.getenv("LIMITER_MIN", "1")),
+        LIMITER_MAX=int(os.getenv("LIMITER_MAX", "64")),
+        LIMITER_QUEUE_SIZE=int(os.getenv("LIMITER_QUEUE_SIZE", "64")),
+        LIMITER_QUEUE_TIMEOUT_MS=float(os.getenv("LIMITER_QUEUE_TIMEOUT_MS", "5000")),
+        REQUEST_DEADLINE_MS=float(os.getenv("REQUEST_DEADLINE_MS", "30000")),
+        DEADLINE_RESERVE_MS=float(os.getenv("DEADLINE_RESERVE_MS", "150")),
+        REQUEST_LOG_PATH=Path(os.environ["REQUEST_LOG_PATH"]) if os.getenv("REQUEST_LOG_PATH") else None,
+        USAGE_ENABLED=_env_bool("USAGE_ENABLED", True),
+        USAGE_DIR=Path(os.getenv("USAGE_DIR") or Path(os.getenv("STORAGE_DIR", "storage")) / "usage"),
+        USAGE_FLUSH_S=float(os.getenv("USAGE_FLUSH_S", "5")),
+        API_KEY_TENANTS=_env_json("API_KEY_TENANTS"),
+        MODEL_PRICES=_env_json("MODEL_PRICES"),
+        TENANT_DAILY_BUDGET_USD=(
+            float(os.environ["TENANT_DAILY_BUDGET_USD"]) if os.getenv("TENANT_DAILY_BUDGET_USD") else None
+        ),
+        TENANT_BUDGETS_USD=_env_json("TENANT_BUDGETS_USD"),
+        BUDGET_ACTION=os.getenv("BUDGET_ACTION", "downgrade"),
+        CHAT_MODEL_SMALL=os.getenv("CHAT_MODEL_SMALL") or None,
+        CHAT_MODEL_LARGE=os.getenv("CHAT_MODEL_LARGE") or None,
+        ROUTER_TIER=os.getenv("ROUTER_TIER", "small"),
+        QUERY_EXPANSION_TIER=os.getenv("QUERY_EXPANSION_TIER", "small"),
+        ISSUE_SUMMARY_TIER=os.getenv("ISSUE_SUMMARY_TIER", "large"),
+        QA_TIER=os.getenv("QA_TIER", "escalate"),
         MAX_QUERY_CHARS=int(os.getenv("MAX_QUERY_CHARS", "2000")),
     )
 
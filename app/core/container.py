@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import gc
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.agent.agent import AIAgent
+from app.core.config import Settings, get_settings
+from app.core.llm import get_chat_llm
+from app.retriever.faiss_store import FAISSStore
+from app.retriever.rerank import get_scorer
+from app.retriever.summary_store import get_summary_store
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ServiceContainer:
+    """
+    Long-lived services shared by all API requests.
+    Built once in the FastAPI lifespan, before the server accepts traffic,
+    or in the pre-fork master when served by gunicorn with preload.
+    """
+    settings: Settings
+    agent: AIAgent
+    store: FAISSStore
+    started_at: float
+    cold_start_ms: float = 0.0
+    warmup_errors: Dict[str, str] = None
+
+    def __post_init__(self):
+        if self.warmup_errors is None:
+            self.warmup_errors = {}
+
+    @property
+    def index_loaded(self) -> bool:
+        return self.store.is_loaded()
+
+    @property
+    def index_generation(self) -> Optional[str]:
+        return self.store.cached_generation_id()
+
+    @property
+    def ready(self) -> bool:
+        return self.index_loaded
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "index_loaded": self.index_loaded,
+            "index_generation": self.index_generation,
+            "cold_start_ms": round(self.cold_start_ms, 1),
+            "warmup_errors": self.warmup_errors,
+        }
+
+
+def build_container() -> ServiceContainer:
+    """
+    Create and pre-warm shared services:
+      - settings
+      - OpenAI chat (one per model tier) / embedding clients (connection pools)
+      - FAISS index + docstore (loaded into the process-wide cache)
+      - optional re-ranker model
+      - precomputed issue-summary store, if one was built
+
+    Failures are recorded rather than raised so liveness still works and
+    readiness reports what is missing (e.g. index not built yet).
+    """
+    from app.ingestion.embeddings import get_embeddings
+
+    t0 = time.perf_counter()
+    s = get_settings()
+    store = FAISSStore()
+    errors: Dict[str, str] = {}
+
+    try:
+        embeddings = get_embeddings()
+        for tier in ("small", "large"):
+            get_chat_llm(s.chat_model(tier))
+    except RuntimeError as e:
+        embeddings = None
+        errors["clients"] = str(e)
+
+    if embeddings is not None:
+        try:
+            store.load_cached(embeddings)
+        except FileNotFoundError as e:
+            errors["index"] = str(e)
+
+    try:
+        get_summary_store()
+    except (OSError, ValueError) as e:
+        errors["summary_store"] = str(e)
+
+    if s.RERANK_ENABLED:
+        try:
+            get_scorer(s.RERANK_SCORER, model_name=s.RERANK_MODEL)
+        except (RuntimeError, ValueError) as e:
+            errors["rerank"] = str(e)
+
+    container = ServiceContainer(
+        settings=s,
+        agent=AIAgent(),
+        store=store,
+        started_at=time.time(),
+        cold_start_ms=(time.perf_counter() - t0) * 1000.0,
+        warmup_errors=errors,
+    )
+
+    logger.info(
+        "Service container ready in %.1f ms | index_loaded=%s generation=%s",
+        container.cold_start_ms,
+        container.index_loaded,
+        container.index_generation,
+    )
+    for name, err in errors.items():
+        logger.warning("Warm-up incomplete (%s): %s", name, err)
+
+    return container
+
+
+# Container built in a pre-fork master (see preload_container); inherited by workers.
+_preloaded: Optional[ServiceContainer] = None
+
+
+def preload_container() -> ServiceContainer:
+    """
+    Build the container before workers are forked (gunicorn `preload_app`),
+    so the FAISS index and docstore pages are shared copy-on-write instead
+    of being loaded once per worker.
+
+    gc.freeze() moves every object allocated so far to the permanent
+    generation: collections in the workers then never write to their
+    headers, which would otherwise un-share the pages they live on.
+    """
+    global _preloaded
+    _preloaded = build_container()
+    gc.freeze()
+    logger.info("Preloaded service container; %d objects frozen before fork", gc.get_freeze_count())
+    return _preloaded
+
+
+def preloaded_container() -> Optional[ServiceContainer]:
+    """
+    Container inherited from the pre-fork master, if any.
+    """
+    return _preloaded
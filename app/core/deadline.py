@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from app.utils.metrics import DEGRADATIONS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    A stage ran out of its time budget.
+    """
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded in stage '{stage}'")
+        self.stage = stage
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """
+    Absolute per-request deadline (monotonic clock).
+    """
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining_s(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_s() <= 0.0
+
+    def budget_s(self, *, fraction: float = 1.0, cap_s: Optional[float] = None, reserve_s: float = 0.0) -> float:
+        """
+        Time a stage may use: `fraction` of what is left after `reserve_s`
+        (kept for later stages / fallbacks), optionally capped.
+        """
+        budget = max(0.0, self.remaining_s() - reserve_s) * fraction
+        return min(budget, cap_s) if cap_s is not None else budget
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+_degradations: ContextVar[Optional[List[str]]] = ContextVar("request_degradations", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Bind a deadline (None = no deadline) and a fresh degradation list
+    to the current request.
+    """
+    deadline = Deadline.after(seconds) if seconds else None
+    t1 = _deadline.set(deadline)
+    t2 = _degradations.set([])
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(t1)
+        _degradations.reset(t2)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def stage_budget(*, fraction: float = 1.0, cap_s: Optional[float] = None, reserve_s: float = 0.0) -> Optional[float]:
+    """
+    Budget for the next stage of the current request, or None without a deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline.budget_s(fraction=fraction, cap_s=cap_s, reserve_s=reserve_s)
+
+
+def note_degradation(name: str) -> None:
+    """
+    Record that the current request returned a degraded result.
+    """
+    items = _degradations.get()
+    if items is not None and name not in items:
+        items.append(name)
+    DEGRADATIONS.inc(kind=name)
+    logger.info("Degraded: %s", name)
+
+
+def current_degradations() -> List[str]:
+    return list(_degradations.get() or [])
+
+
+# A timeout this close to the stage end counts as the stage running out.
+_STAGE_END_SLACK_S = 0.05
+_MIN_TIMEOUT_S = 0.001
+
+# (stage name, monotonic end) of the run_within stage the current call runs in.
+_stage: ContextVar[Optional[Tuple[str, float]]] = ContextVar("deadline_stage", default=None)
+
+
+def stage_remaining_s() -> Optional[float]:
+    """
+    Time left in the current run_within stage, or None outside one.
+    """
+    stage = _stage.get()
+    if stage is None:
+        return None
+    return max(0.0, stage[1] - time.monotonic())
+
+
+def stage_expired() -> bool:
+    """
+    True inside a run_within stage whose budget is (about) spent.
+    """
+    remaining = stage_remaining_s()
+    return remaining is not None and remaining <= _STAGE_END_SLACK_S
+
+
+def apply_stage_timeout(request: Any) -> None:
+    """
+    httpx request hook: cap the request's timeouts at what is left of the
+    current stage, so an upstream call is cut off at the stage deadline
+    instead of outliving it.
+    """
+    remaining = stage_remaining_s()
+    if remaining is None:
+        return
+    remaining = max(remaining, _MIN_TIMEOUT_S)  # 0 would mean "no timeout" to some transports
+    timeouts = dict(request.extensions.get("timeout") or {})
+    for key in ("connect", "read", "write", "pool"):
+        current = timeouts.get(key)
+        timeouts[key] = remaining if current is None else min(current, remaining)
+    request.extensions["timeout"] = timeouts
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    import httpx
+    import openai
+
+    return isinstance(exc, (TimeoutError, openai.APITimeoutError, httpx.TimeoutException))
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="deadline")
+    return _executor
+
+
+def run_within(fn: Callable[[], T], budget_s: Optional[float], *, stage: str, abandon: bool = False) -> T:
+    """
+    Run fn, giving up after budget_s seconds (None = no limit).
+
+    fn runs on the calling thread with the stage deadline in context: HTTP
+    clients built with apply_stage_timeout get the remaining budget as their
+    timeout and the chat/embedding clients skip SDK retries, so a call that
+    runs over is cancelled and releases its limiter slot. A timeout raised
+    once the budget is spent becomes DeadlineExceeded.
+
+    abandon=True is for local work that cannot be interrupted: fn runs on a
+    worker thread and the caller stops waiting at the budget, leaving the
+    work to finish in the background with its result discarded.
+    """
+    if budget_s is None:
+        return fn()
+    if budget_s <= 0.0:
+        raise DeadlineExceeded(stage)
+
+    if abandon:
+        ctx = contextvars.copy_context()
+        future = _get_executor().submit(ctx.run, fn)
+        try:
+            return future.result(timeout=budget_s)
+        except FutureTimeout:
+            future.cancel()  # only effective if it never started
+            raise DeadlineExceeded(stage) from None
+
+    token = _stage.set((stage, time.monotonic() + budget_s))
+    try:
+        return fn()
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        if _is_timeout(e) and stage_expired():
+            raise DeadlineExceeded(stage) from e
+        raise
+    finally:
+        _stage.reset(token)
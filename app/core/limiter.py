@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.deadline import apply_stage_timeout, current_deadline, stage_expired
+from app.utils.metrics import (
+    LIMITER_IN_FLIGHT,
+    LIMITER_LIMIT,
+    LIMITER_OVERLOAD_SIGNALS,
+    LIMITER_QUEUED,
+    LIMITER_SHED,
+)
+from app.utils.trace import span
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Lower value is served first.
+    """
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.BATCH)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """
+    Set the admission priority for upstream calls made in this context.
+    Outside a request (ingestion, scripts) calls default to BATCH.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+class OverloadedError(RuntimeError):
+    """
+    Raised when a call is shed instead of queued; maps to 503 + Retry-After.
+    """
+
+    def __init__(self, message: str, *, limiter: str, reason: str, retry_after_s: float):
+        super().__init__(message)
+        self.limiter = limiter
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """
+    Upstream signals that mean "send less": rate limits and timeouts.
+    """
+    import openai
+
+    return isinstance(exc, (openai.RateLimitError, openai.APITimeoutError, httpx.TimeoutException))
+
+
+class _Waiter:
+    __slots__ = ("priority", "event", "granted", "rejected")
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+        self.rejected: Optional[str] = None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter with a bounded priority admission queue.
+
+      - at most `limit` calls hold a slot; others wait in priority order
+      - a success while the limit is fully used raises it by 1/limit
+        (about +1 per limit's worth of completions)
+      - an overload signal (429/timeout) multiplies it by `backoff`,
+        at most once per `cooldown_s` so one burst of 429s counts once
+      - a call that arrives to a full queue, whose expected wait (calls ahead
+        of it x average latency / limit) exceeds `queue_timeout_s`, or that
+        still has no slot after `queue_timeout_s`, fails fast with
+        OverloadedError; when the queue is full a higher-priority arrival
+        evicts the newest lower-priority waiter
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        queue_size: int = 64,
+        queue_timeout_s: float = 5.0,
+        backoff: float = 0.5,
+        cooldown_s: float = 1.0,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limiter bounds must satisfy 1 <= min <= initial <= max")
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout_s = queue_timeout_s
+        self.backoff = backoff
+        self.cooldown_s = cooldown_s
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._queued = 0
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self._avg_latency_s = 1.0
+        self._lock = threading.Lock()
+        self._publish_locked()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "avg_latency_s": round(self._avg_latency_s, 3),
+            }
+
+    def _publish_locked(self) -> None:
+        LIMITER_LIMIT.set(self.limit, limiter=self.name)
+        LIMITER_IN_FLIGHT.set(self._in_flight, limiter=self.name)
+        LIMITER_QUEUED.set(self._queued, limiter=self.name)
+
+    def retry_after_s(self) -> float:
+        """
+        Rough time until a new call could be admitted: queued work / drain rate.
+        """
+        drain_per_s = self.limit / max(self._avg_latency_s, 0.05)
+        return max(1.0, (self._queued + 1) / drain_per_s)
+
+    def _shed(self, reason: str) -> OverloadedError:
+        LIMITER_SHED.inc(limiter=self.name, reason=reason)
+        return OverloadedError(
+            f"Upstream '{self.name}' is overloaded ({reason})",
+            limiter=self.name,
+            reason=reason,
+            retry_after_s=self.retry_after_s(),
+        )
+
+    def _expected_wait_s_locked(self, priority: Priority) -> float:
+        ahead = sum(1 for _, _, w in self._heap if not w.rejected and w.priority <= priority)
+        return (ahead + 1) * self._avg_latency_s / self.limit
+
+    def _evict_for_locked(self, priority: Priority) -> bool:
+        # Newest waiter of the lowest priority below `priority`, if any.
+        victim = None
+        for entry in self._heap:
+            w = entry[2]
+            if w.granted or w.rejected or w.priority <= priority:
+                continue
+            if victim is None or entry[:2] > victim[:2]:
+                victim = entry
+        if victim is None:
+            return False
+        victim[2].rejected = "evicted"
+        self._queued -= 1
+        victim[2].event.set()
+        return True
+
+    def _grant_locked(self) -> None:
+        while self._heap and self._in_flight < self.limit:
+            _, _, w = heapq.heappop(self._heap)
+            if w.rejected:
+                continue
+            w.granted = True
+            self._queued -= 1
+            self._in_flight += 1
+            w.event.set()
+
+    def acquire(self, priority: Optional[Priority] = None) -> None:
+        priority = current_priority() if priority is None else priority
+        # Never queue past the request deadline.
+        deadline = current_deadline()
+        timeout_s = self.queue_timeout_s if deadline is None else min(self.queue_timeout_s, deadline.remaining_s())
+        with self._lock:
+            if self._in_flight < self.limit and not self._queued:
+                self._in_flight += 1
+                self._publish_locked()
+                return
+            if self._expected_wait_s_locked(priority) > timeout_s:
+                # Would time out anyway: fail now instead of holding the request.
+                raise self._shed("queue_timeout")
+            if self._queued >= self.queue_size and not self._evict_for_locked(priority):
+                raise self._shed("queue_full")
+            waiter = _Waiter(priority)
+            heapq.heappush(self._heap, (int(priority), next(self._seq), waiter))
+            self._queued += 1
+            self._publish_locked()
+
+        waiter.event.wait(timeout_s)
+
+        with self._lock:
+            if waiter.granted:
+                self._publish_locked()
+                return
+            if waiter.rejected is None:
+                waiter.rejected = "queue_timeout"
+                self._queued -= 1
+            self._publish_locked()
+        raise self._shed(waiter.rejected)
+
+    def release(self, *, latency_s: Optional[float] = None, overloaded: bool = False) -> None:
+        with self._lock:
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease_locked()
+            elif latency_s is not None:
+                self._avg_latency_s += 0.2 * (latency_s - self._avg_latency_s)
+                if saturated and self._limit < self.max_limit:
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._grant_locked()
+            self._publish_locked()
+
+    def _decrease_locked(self) -> None:
+        now = time.monotonic()
+        LIMITER_OVERLOAD_SIGNALS.inc(limiter=self.name)
+        if now - self._last_decrease < self.cooldown_s:
+            return
+        self._last_decrease = now
+        old = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        logger.warning("Limiter '%s' overload signal: limit %d -> %d", self.name, old, self.limit)
+
+    def on_overload(self) -> None:
+        """
+        Overload signal observed outside a slot (e.g. a 429 the client retried).
+        """
+        with self._lock:
+            self._decrease_locked()
+            self._publish_locked()
+
+    @contextmanager
+    def slot(self, priority: Optional[Priority] = None) -> Iterator[None]:
+        with span(f"limiter.{self.name}"):
+            self.acquire(priority)
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            # A timeout cut at the caller's stage deadline says nothing about upstream load.
+            self.release(overloaded=is_overload_error(e) and not stage_expired())
+            raise
+        self.release(latency_s=time.perf_counter() - t0)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """
+    Process-wide limiter per upstream ("chat", "embeddings").
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                s = get_settings()
+                limiter = AdaptiveLimiter(
+                    name,
+                    initial_limit=s.LIMITER_INITIAL,
+                    min_limit=s.LIMITER_MIN,
+                    max_limit=s.LIMITER_MAX,
+                    queue_size=s.LIMITER_QUEUE_SIZE,
+                    queue_timeout_s=s.LIMITER_QUEUE_TIMEOUT_MS / 1000.0,
+                )
+                _limiters[name] = limiter
+    return limiter
+
+
+@contextmanager
+def upstream_slot(name: str) -> Iterator[None]:
+    """
+    Hold a concurrency slot for one upstream call. No-op when LIMITER_ENABLED is off.
+    """
+    if not get_settings().LIMITER_ENABLED:
+        yield
+        return
+    with get_limiter(name).slot():
+        yield
+
+
+def upstream_http_client(name: str) -> httpx.Client:
+    """
+    HTTP client for the OpenAI SDK. Requests made inside a run_within stage
+    time out when the stage does; with LIMITER_ENABLED every 429 is reported
+    to the limiter, including the ones the SDK retries internally and never
+    raises.
+    """
+    import openai
+
+    hooks = {"request": [apply_stage_timeout]}
+    if get_settings().LIMITER_ENABLED:
+
+        def _on_response(response: httpx.Response) -> None:
+            if response.status_code == 429:
+                get_limiter(name).on_overload()
+
+        hooks["response"] = [_on_response]
+    return openai.DefaultHttpxClient(event_hooks=hooks)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.deadline import stage_remaining_s
+from app.core.limiter import upstream_http_client
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+_SDK_RETRIES = 2  # the SDK default
+_clients: Dict[Tuple[str, bool], ChatOpenAI] = {}
+_lock = threading.Lock()
+
+
+def get_chat_llm(model: Optional[str] = None) -> ChatOpenAI:
+    """
+    Returns a shared ChatOpenAI client per model (temperature=0).
+    Reusing the client keeps its HTTP connection pool warm across requests.
+    Inside a run_within stage the client makes no SDK retries: the call gets
+    the rest of the stage budget as its timeout and nothing more.
+    """
+    s = get_settings()
+    if not s.is_openai_configured:
+        raise RuntimeError("OPENAI_API_KEY is not set. Add it to .env or environment variables.")
+
+    name = model or s.OPENAI_CHAT_MODEL
+    retries = stage_remaining_s() is None
+    key = (name, retries)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                from langchain_openai import ChatOpenAI
+
+                client = ChatOpenAI(
+                    model=name,
+                    api_key=s.OPENAI_API_KEY,
+                    base_url=s.OPENAI_BASE_URL,
+                    http_client=upstream_http_client("chat"),
+                    temperature=0,
+                    max_retries=_SDK_RETRIES if retries else 0,
+                )
+                _clients[key] = client
+    return client
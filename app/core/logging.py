@@ -1,35 +1,244 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import random
 import sys
-from typing import Optional
+import threading
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Optional
 
 from app.core.config import get_settings
+from app.utils.metrics import LOG_RECORDS_DROPPED
+from app.utils.trace import current_trace
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Queue fill (share of LOG_QUEUE_SIZE) from which LOG_LOAD_SAMPLE_RATE applies.
+LOAD_FILL = 0.5
+
+_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_listener: Optional[QueueListener] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the current request's id. Filters run on the thread
+    that logs, so the id is read from the request's context before the
+    record is handed to the queue.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            trace = current_trace()
+            record.request_id = trace.request_id if trace is not None else "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep DEBUG/INFO records for a `rate` share of requests (`load_rate`
+    while `queue` is at least LOAD_FILL full); WARNING and above always
+    pass. The decision is a hash of the request id, so a request's verbose
+    records are kept or dropped together.
+    """
+
+    def __init__(self, rate: float, load_rate: float, log_queue: Optional[queue.Queue] = None):
+        super().__init__()
+        self.rate = rate
+        self.load_rate = min(rate, load_rate)
+        self.queue = log_queue
+        self._load_size = int(log_queue.maxsize * LOAD_FILL) if log_queue is not None and log_queue.maxsize else 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate
+        if self._load_size and self.queue.qsize() >= self._load_size:
+            rate = self.load_rate
+        if rate >= 1.0:
+            return True
+        rid = getattr(record, "request_id", "-")
+        u = zlib.crc32(rid.encode()) / 0x100000000 if rid != "-" else random.random()
+        if u < rate:
+            return True
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One compact JSON object per record:
+      {"ts": ..., "level": ..., "logger": ..., "msg": ..., "request_id": ..., **fields}
+    `fields` is an optional dict passed as `extra={"fields": {...}}`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        rid = getattr(record, "request_id", "-")
+        if rid != "-":
+            out["request_id"] = rid
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The human-readable format; `fields` are appended as key=value pairs.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " | " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller: records are dropped (and
+    counted) when the queue is full, and formatting is left to the
+    listener thread; only the message is interpolated here.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks keep frames alive; render them before handing off.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+def configure_logging(
+    level: str = "INFO",
+    *,
+    fmt: str = "json",
+    async_: bool = True,
+    queue_size: int = 10000,
+    sample_rate: float = 1.0,
+    load_sample_rate: float = 1.0,
+    stream: Optional[IO[str]] = None,
+) -> logging.Handler:
+    """
+    Install the app's root handler (replacing one installed earlier).
+    setup_logging() calls this with the LOG_* settings.
+    """
+    global _handler, _listener
+    level_no = getattr(logging, level.upper(), logging.INFO)
+    sink = logging.StreamHandler(stream or sys.stdout)
+    sink.setLevel(level_no)
+    sink.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT, DATE_FORMAT))
+
+    with _lock:
+        _remove_handler()
+        if async_:
+            log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+            handler: logging.Handler = _AsyncQueueHandler(log_queue)
+            _listener = QueueListener(log_queue, sink, respect_handler_level=True)
+            _listener.start()
+        else:
+            log_queue = None
+            handler = sink
+        handler.setLevel(level_no)
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(SamplingFilter(sample_rate, load_sample_rate, log_queue))
+        root = logging.getLogger()
+        root.setLevel(level_no)
+        root.addHandler(handler)
+        _handler = handler
+    return handler
+
+
+def _remove_handler() -> None:
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()  # drains the queue
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and remove the app's handler.
+    """
+    with _lock:
+        _remove_handler()
+
+
+def _restart_listener_after_fork() -> None:
+    # The listener thread does not survive fork (gunicorn preload); give the
+    # child its own queue and thread.
+    global _listener
+    if _listener is None or not isinstance(_handler, _AsyncQueueHandler):
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _handler.queue = log_queue
+    for f in _handler.filters:
+        if isinstance(f, SamplingFilter):
+            f.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
 
 
 def setup_logging(log_level: Optional[str] = None) -> logging.Logger:
     """
     Configure app-wide logging.
-    - Uses stdout handler (docker-friendly)
+    - Uses stdout handler (docker-friendly), JSON or text (LOG_FORMAT)
+    - With LOG_ASYNC, request threads only enqueue records; a listener
+      thread formats and writes them
     - Avoids duplicate handlers on reload
     """
     settings = get_settings()
     level_name = (log_level or settings.LOG_LEVEL).upper()
 
-    logger = logging.getLogger()  # root logger
-    logger.setLevel(getattr(logging, level_name, logging.INFO))
-
-    # Prevent duplicated handlers
-    if not any(isinstance(h, logging.StreamHandler) for h in logger.handlers):
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setLevel(getattr(logging, level_name, logging.INFO))
-
-        formatter = logging.Formatter(
-            fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
+    root = logging.getLogger()
+    # Prevent duplicated handlers (ours from an earlier call, or a host's)
+    if _handler is None and not any(isinstance(h, logging.StreamHandler) for h in root.handlers):
+        configure_logging(
+            level_name,
+            fmt=settings.LOG_FORMAT,
+            async_=settings.LOG_ASYNC,
+            queue_size=settings.LOG_QUEUE_SIZE,
+            sample_rate=settings.LOG_SAMPLE_RATE,
+            load_sample_rate=settings.LOG_LOAD_SAMPLE_RATE,
         )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    root.setLevel(getattr(logging, level_name, logging.INFO))
 
     # Make noisy libs quieter if needed
     logging.getLogger("uvicorn").setLevel(getattr(logging, level_name, logging.INFO))
@@ -1,22 +1,59 @@
 from __future__ import annotations
 
 import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional
 
-from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
 
 from app.core.config import get_settings
 from app.core.logging import setup_logging
-from app.ingestion.loader import load_all_corpora, flatten_documents
+from app.ingestion.build_summaries import build_issue_summaries
+from app.ingestion.dedup import deduplicate_feedback
+from app.ingestion.loader import file_signatures, load_all_corpora, flatten_documents
 from app.ingestion.splitter import split_documents
+from app.ingestion.embedding_cache import cached
 from app.ingestion.embeddings import get_embeddings
+from app.retriever.quantization import VectorFormat, build_vectorstore, index_bytes
+from app.retriever.sharded import ShardedFAISS, partition
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 
 logger = setup_logging()
 
+# progress(stage, done, total) with stage in load / split / embed / summaries / save;
+# total is None while not known yet. It may raise to abort the build.
+ProgressFn = Callable[[str, int, Optional[int]], None]
+
+
+class _ProgressEmbeddings(Embeddings):
+    """
+    Embeds in batches and reports each one, so a build shows chunks embedded
+    (and can be stopped between batches) instead of one long opaque call.
+    """
+
+    def __init__(self, inner: Embeddings, on_batch: Callable[[int], None], batch_size: int = 256):
+        self.inner = inner
+        self.on_batch = on_batch
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        out: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            out.extend(self.inner.embed_documents(batch))
+            self.on_batch(len(batch))
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
+
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -33,6 +70,7 @@ def _build_manifest(
     chunk_overlap: int,
 ) -> Dict[str, Any]:
     return {
+        "generation_id": uuid.uuid4().hex[:12],
         "built_at_utc": _utc_now_iso(),
         "total_files": total_files,
         "total_docs": total_docs,
@@ -58,6 +96,14 @@ def build_faiss_index(
     chunk_overlap: int = 150,
     index_dir: Path | None = None,
     manifest_path: Path | None = None,
+    summaries: Optional[str] = None,
+    dedup_feedback: Optional[bool] = None,
+    vector_dtype: Optional[str] = None,
+    dimensions: Optional[int] = None,
+    sharding: Optional[str] = None,
+    num_shards: Optional[int] = None,
+    summaries_path: Optional[Path] = None,
+    progress: Optional[ProgressFn] = None,
 ) -> Dict[str, Any]:
     """
     Build and persist a FAISS index from:
@@ -67,42 +113,142 @@ def build_faiss_index(
     Persists:
       - FAISS index folder to STORAGE_DIR/faiss_index/
       - manifest.json to STORAGE_DIR/manifest.json
+      - optionally, precomputed bug-report summaries to STORAGE_DIR/issue_summaries.json
+        (or summaries_path)
+        (summaries="llm"|"fields"; default SUMMARY_PRECOMPUTE)
+
+    With dedup_feedback (default FEEDBACK_DEDUP_ENABLED) the feedback corpus is
+    indexed one line per document, one representative per near-duplicate cluster.
+
+    vector_dtype / dimensions (default INDEX_VECTOR_DTYPE / INDEX_DIMENSIONS)
+    select float16/int8 storage and Matryoshka truncation; recorded in the
+    manifest under "vectors".
+
+    sharding (default INDEX_SHARDING): "source" builds one index per corpus,
+    "hash" num_shards (default INDEX_HASH_SHARDS) hash partitions, under
+    FAISS_INDEX_DIR/shards/<name>/; listed in the manifest under "sharding".
+
+    progress, if given, is called per file parsed, per embedding batch and per
+    summarised record (see ProgressFn); background reindex jobs use it for
+    status and cancellation.
 
     Returns manifest dict.
     """
     s = get_settings()
     index_dir = index_dir or s.FAISS_INDEX_DIR
     manifest_path = manifest_path or (s.STORAGE_DIR / "manifest.json")
+    report: ProgressFn = progress or (lambda stage, done, total: None)
+    counts = {"files": 0, "embedded": 0, "summarised": 0}
+    counts_lock = threading.Lock()
+
+    def _count(key: str, n: int = 1) -> int:
+        with counts_lock:
+            counts[key] += n
+            return counts[key]
 
     logger.info("Loading corpora from: %s", s.DATA_DIR.resolve())
-    corpora = load_all_corpora(s.DATA_DIR)
+    # Taken before parsing: a file changed meanwhile looks changed to the watcher.
+    files = file_signatures(s.DATA_DIR)
+    corpora = load_all_corpora(s.DATA_DIR, on_file=lambda _path: report("load", _count("files"), None))
     raw_docs = flatten_documents(corpora)
+    report("load", counts["files"], counts["files"])
     logger.info("Loaded documents: %d", len(raw_docs))
 
+    index_docs = raw_docs
+    dedup_stats: Optional[Dict[str, Any]] = None
+    if s.FEEDBACK_DEDUP_ENABLED if dedup_feedback is None else dedup_feedback:
+        feedback = [d for c in corpora if c.name == "ai_test_user_feedback" for d in c.documents]
+        deduped, dedup_stats = deduplicate_feedback(feedback, threshold=s.FEEDBACK_DEDUP_THRESHOLD)
+        index_docs = [d for c in corpora if c.name != "ai_test_user_feedback" for d in c.documents] + deduped
+        logger.info(
+            "Feedback near-duplicates: %d lines -> %d indexed", dedup_stats["records"], dedup_stats["indexed"]
+        )
+
     # Split into chunks
-    chunks = split_documents(raw_docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = split_documents(index_docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     logger.info("Split into chunks: %d", len(chunks))
+    report("split", len(chunks), len(chunks))
 
-    # Create vector store
-    embeddings = get_embeddings()
-    logger.info("Building FAISS index with embedding model: %s", s.OPENAI_EMBEDDING_MODEL)
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+    # Create vector store (through the vector cache, if configured; serving queries never use it)
+    embeddings = cached(get_embeddings(), s.EMBEDDING_CACHE_PATH, s.embedding_model_id)
+    if progress is not None:
+        report("embed", 0, len(chunks))
+        embeddings = _ProgressEmbeddings(
+            embeddings, lambda n: report("embed", _count("embedded", n), len(chunks))
+        )
+    vector_format = VectorFormat(
+        dtype=vector_dtype or s.INDEX_VECTOR_DTYPE,
+        dimensions=dimensions if dimensions is not None else s.INDEX_DIMENSIONS,
+    )
+    logger.info(
+        "Building FAISS index with embedding model: %s (vectors: %s, dimensions: %s)",
+        s.embedding_model_id,
+        vector_format.dtype,
+        vector_format.dimensions or "full",
+    )
+    sharding = sharding or s.INDEX_SHARDING
+    sharding_info: Optional[Dict[str, Any]] = None
+    if sharding == "none":
+        vectorstore = build_vectorstore(chunks, embeddings, vector_format)
+        indexes = [vectorstore.index]
+    else:
+        num_shards = num_shards or s.INDEX_HASH_SHARDS
+        parts = partition(chunks, sharding, num_shards)
+        logger.info("Sharding by %s: %s", sharding, {name: len(docs) for name, docs in parts.items()})
+        with ThreadPoolExecutor(max_workers=min(4, len(parts)), thread_name_prefix="build-shard") as pool:
+            built = list(pool.map(lambda docs: build_vectorstore(docs, embeddings, vector_format), parts.values()))
+        sources = {name: (name if sharding == "source" else None) for name in parts}
+        vectorstore = ShardedFAISS(dict(zip(parts, built)), sources=sources)
+        indexes = [shard.index for shard in built]
+        sharding_info = {
+            "mode": sharding,
+            "shards": [
+                {"name": name, "source": sources[name], "chunks": len(docs), "index_bytes": index_bytes(shard.index)}
+                for (name, docs), shard in zip(parts.items(), built)
+            ],
+        }
+        if sharding == "hash":
+            sharding_info["num_shards"] = num_shards
 
     # Persist index
+    report("save", 0, 1)
     index_dir.mkdir(parents=True, exist_ok=True)
     logger.info("Saving FAISS index to: %s", index_dir.resolve())
     vectorstore.save_local(str(index_dir))
+    report("save", 1, 1)
 
     # Write manifest for traceability
     manifest = _build_manifest(
         total_files=_count_unique_files(raw_docs),
         total_docs=len(raw_docs),
         total_chunks=len(chunks),
-        embedding_model=s.OPENAI_EMBEDDING_MODEL,
+        embedding_model=s.embedding_model_id,
         chat_model=s.OPENAI_CHAT_MODEL,
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
     )
+    manifest["vectors"] = vector_format.to_manifest(indexes)
+    manifest["files"] = files
+    if sharding_info is not None:
+        manifest["sharding"] = sharding_info
+    if dedup_stats is not None:
+        manifest["feedback_dedup"] = dedup_stats
+
+    summaries = summaries or s.SUMMARY_PRECOMPUTE
+    bug_docs = next((c.documents for c in corpora if c.name == "ai_test_bug_report"), None)
+    if summaries != "off" and bug_docs is None:
+        logger.warning("Issue summaries (%s) skipped: no ai_test_bug_report corpus in %s", summaries, s.DATA_DIR)
+    elif summaries != "off":
+        logger.info("Precomputing issue summaries (%s)", summaries)
+        manifest["issue_summaries"] = build_issue_summaries(
+            bug_docs,
+            mode=summaries,
+            out_path=summaries_path,
+            generation_id=manifest["generation_id"],
+            on_record=lambda: report("summaries", _count("summarised"), None),
+        )
+        report("summaries", counts["summarised"], counts["summarised"])
+
     manifest_path.parent.mkdir(parents=True, exist_ok=True)
     manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
     logger.info("Wrote manifest: %s", manifest_path.resolve())
@@ -112,4 +258,7 @@ def build_faiss_index(
 
 if __name__ == "__main__":
     # Allows: python -m app.ingestion.build_index
-    build_faiss_index()
+    from app.utils.usage_ledger import usage_scope
+
+    with usage_scope("ingestion"):
+        build_faiss_index()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+from app.ingestion.records import BugRecord, content_hash, parse_bug_records
+from app.retriever.summary_store import IssueSummaryStore, SummaryEntry, make_entry, summary_store_path
+from app.schemas.responses import IssueSummaryOutput
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+_SEVERITIES = ("Low", "Medium", "High", "Critical")
+
+
+def fields_summary(record: BugRecord) -> IssueSummaryOutput:
+    """
+    LLM-free summary straight from the record fields.
+    """
+    severity = record.severity.strip().capitalize()
+    description = " ".join(record.get("Description").split())
+    return IssueSummaryOutput(
+        reported_issues=[f"{record.title}: {description}" if description else record.title],
+        affected_components=[c.strip() for c in record.get("Environment").split(",") if c.strip()],
+        severity=severity if severity in _SEVERITIES else "Unknown",
+        notes=" ".join(record.get("Proposed Fix").split()) or None,
+    )
+
+
+def _llm_summary(record: BugRecord) -> IssueSummaryOutput:
+    # Imported here so "fields" builds do not need chat clients.
+    from app.tools.issue_summary_tool import issue_summary_tool
+
+    return issue_summary_tool(f"Bug #{record.number}\n{record.text}", use_store=False)
+
+
+def _entry(record: BugRecord, summary: IssueSummaryOutput) -> SummaryEntry:
+    return make_entry(
+        record_id=record.record_id,
+        number=record.number,
+        text=record.text,
+        title=record.title,
+        severity=record.severity or summary.severity,
+        environment=" ".join(record.get("Environment").split()),
+        summary=summary,
+    )
+
+
+def build_issue_summaries(
+    bug_documents: Sequence[Document],
+    *,
+    mode: str,
+    out_path: Optional[Path] = None,
+    generation_id: Optional[str] = None,
+    max_workers: int = 4,
+    on_record: Optional[Callable[[], None]] = None,
+    reuse: Optional[IssueSummaryStore] = None,
+) -> Dict[str, Any]:
+    """
+    Summarise every `Bug #N` record of the bug-report corpus and persist the
+    store to STORAGE_DIR/issue_summaries.json.
+
+    mode:
+      - llm: issue_summary_tool per record (batch priority, max_workers in parallel);
+        records whose call fails fall back to the field summary
+      - fields: summaries built from the record fields, no LLM
+
+    on_record is called after each record is summarised (progress reporting).
+    Records whose text is unchanged in `reuse` (the current store) keep
+    their summary instead of being summarised again.
+    Returns build stats for the manifest.
+    """
+    if mode not in ("llm", "fields"):
+        raise ValueError(f"Unknown summary precompute mode: {mode}")
+    out_path = out_path or summary_store_path()
+
+    records: Dict[int, BugRecord] = {}
+    for d in bug_documents:
+        for rec in parse_bug_records(d.page_content):
+            records.setdefault(rec.number, rec)
+    ordered = [records[n] for n in sorted(records)]
+
+    reused: Dict[int, IssueSummaryOutput] = {}
+    if reuse is not None:
+        previous = {e.content_hash: e.summary for e in reuse.entries}
+        for rec in ordered:
+            hit = previous.get(content_hash(rec.text))
+            if hit is not None:
+                reused[rec.number] = hit
+    todo = [rec for rec in ordered if rec.number not in reused]
+
+    def _done() -> None:
+        if on_record is not None:
+            on_record()
+
+    failures = 0
+    if mode == "llm":
+        def _summarise(rec: BugRecord) -> Optional[IssueSummaryOutput]:
+            try:
+                return _llm_summary(rec)
+            except Exception as e:  # one bad record must not fail the whole build
+                logger.warning("Summary for bug #%d failed, using record fields: %s", rec.number, e)
+                return None
+            finally:
+                _done()
+
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summaries")
+        try:
+            generated = dict(zip((rec.number for rec in todo), pool.map(_summarise, todo)))
+        finally:
+            # If on_record raised (e.g. a cancelled reindex), do not start the remaining calls.
+            pool.shutdown(wait=True, cancel_futures=True)
+        for rec in todo:
+            if generated[rec.number] is None:
+                failures += 1
+                generated[rec.number] = fields_summary(rec)
+    else:
+        generated = {}
+        for rec in todo:
+            generated[rec.number] = fields_summary(rec)
+            _done()
+    summaries: List[IssueSummaryOutput] = [reused.get(rec.number) or generated[rec.number] for rec in ordered]
+
+    store = IssueSummaryStore(
+        (_entry(rec, summary) for rec, summary in zip(ordered, summaries)),
+        meta={
+            "generation_id": generation_id,
+            "built_at_utc": datetime.now(timezone.utc).isoformat(),
+            "mode": mode,
+        },
+    )
+    store.save(out_path)
+    logger.info("Wrote %d issue summaries (%s) to %s", len(store), mode, out_path.resolve())
+    return {"path": str(out_path), "mode": mode, "records": len(store), "failures": failures, "reused": len(reused)}
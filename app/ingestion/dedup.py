@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Set, Tuple
+
+from app.ingestion.records import normalize_record_text, parse_feedback_records
+
+if TYPE_CHECKING:
+    import numpy as np
+    from langchain_core.documents import Document
+
+# Mersenne prime for the universal hash family h(x) = (a*x + b) mod p;
+# shingle hashes are 32-bit so a*x stays below 2**64.
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def char_shingles(text: str, k: int = 5) -> Set[str]:
+    """
+    Character k-grams of the normalised text. Short feedback lines differ
+    by a word or two, which word shingles punish much harder.
+    """
+    norm = normalize_record_text(text)
+    if len(norm) <= k:
+        return {norm} if norm else set()
+    return {norm[i : i + k] for i in range(len(norm) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash signatures with `num_perm` hash functions (fixed seed, so
+    signatures are comparable across runs).
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        import numpy as np
+
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: Set[str]) -> np.ndarray:
+        import numpy as np
+
+        prime, max_hash = np.uint64(_PRIME), np.uint64(_MAX_HASH)
+        if not shingles:
+            return np.full(self.num_perm, max_hash, dtype=np.uint64)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # (num_perm, n_shingles) permuted hashes, min over shingles
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % prime & max_hash
+        return permuted.min(axis=1)
+
+
+@dataclass
+class Cluster:
+    """
+    Near-duplicate group; `representative` is the member indexed in its place.
+    """
+    representative: str
+    members: List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_near_duplicates(
+    items: Sequence[Tuple[str, str]],
+    *,
+    threshold: float = 0.6,
+    num_perm: int = 128,
+    bands: int = 32,
+) -> List[Cluster]:
+    """
+    Group (id, text) items whose character-shingle Jaccard similarity is at
+    least `threshold`.
+
+    LSH over MinHash signatures (`bands` bands of num_perm/bands rows) proposes
+    candidate pairs; each candidate is confirmed with the exact Jaccard, so
+    banding only affects recall, never precision. Pairs are merged with
+    union-find (single linkage). Clusters keep input order; the first member
+    is the representative.
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    rows = num_perm // bands
+
+    shingles = [char_shingles(text) for _, text in items]
+    hasher = MinHasher(num_perm)
+    signatures = [hasher.signature(s) for s in shingles]
+
+    candidates: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, sig in enumerate(signatures):
+            buckets.setdefault(sig[band * rows : (band + 1) * rows].tobytes(), []).append(i)
+        for idx in buckets.values():
+            for x in range(len(idx)):
+                for y in range(x + 1, len(idx)):
+                    candidates.add((idx[x], idx[y]))
+
+    parent = list(range(len(items)))
+    for i, j in candidates:
+        if jaccard(shingles[i], shingles[j]) >= threshold:
+            ri, rj = _find(parent, i), _find(parent, j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return [
+        Cluster(representative=items[root][0], members=[items[i][0] for i in idx])
+        for root, idx in sorted(groups.items())
+    ]
+
+
+def deduplicate_feedback(
+    documents: Sequence[Document], *, threshold: float = 0.6
+) -> Tuple[List[Document], Dict[str, Any]]:
+    """
+    One Document per `Feedback #N` line, near-duplicates collapsed into the
+    cluster's representative. Metadata of each indexed Document:
+      - record_id: feedback_N of the representative
+      - cluster_size: number of feedback lines it stands for
+      - cluster_members: their record ids (representative first)
+      - cluster_member_texts: texts of the other members, for expansion at query time
+
+    Returns (documents, stats for the manifest).
+    """
+    from langchain_core.documents import Document
+
+    records: List[Tuple[str, str, Dict[str, Any]]] = []
+    for d in documents:
+        for rec in parse_feedback_records(d.page_content):
+            records.append((rec.record_id, rec.text, dict(d.metadata or {})))
+
+    if not records:
+        # Not in the `Feedback #N: ...` format: index as-is.
+        return list(documents), {"threshold": threshold, "records": 0, "indexed": len(documents)}
+
+    clusters = cluster_near_duplicates([(rid, text) for rid, text, _ in records], threshold=threshold)
+    by_id = {rid: (text, md) for rid, text, md in records}
+
+    out: List[Document] = []
+    for c in clusters:
+        text, md = by_id[c.representative]
+        out.append(
+            Document(
+                page_content=text,
+                metadata={
+                    **md,
+                    "record_id": c.representative,
+                    "cluster_size": c.size,
+                    "cluster_members": list(c.members),
+                    "cluster_member_texts": [by_id[m][0] for m in c.members[1:]],
+                },
+            )
+        )
+
+    stats = {
+        "threshold": threshold,
+        "records": len(records),
+        "indexed": len(out),
+        "duplicate_clusters": sum(1 for c in clusters if c.size > 1),
+        "largest_cluster": max((c.size for c in clusters), default=0),
+    }
+    return out, stats
+
+
+def expand_clusters(docs: Sequence[Document]) -> List[Document]:
+    """
+    Insert the members of each clustered representative right after it
+    (same source, chunk_id `<representative chunk>/<member id>`).
+    """
+    from langchain_core.documents import Document
+
+    out: List[Document] = []
+    for d in docs:
+        out.append(d)
+        md = d.metadata or {}
+        members = md.get("cluster_members") or []
+        texts = md.get("cluster_member_texts") or []
+        base = {k: v for k, v in md.items() if not k.startswith("cluster_")}
+        for member_id, text in zip(members[1:], texts):
+            out.append(
+                Document(
+                    page_content=text,
+                    metadata={
+                        **base,
+                        "record_id": member_id,
+                        "chunk_id": f"{md.get('chunk_id')}/{member_id}",
+                        "expanded_from": md.get("record_id"),
+                    },
+                )
+            )
+    return out
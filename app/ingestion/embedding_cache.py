@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCacheMiss(RuntimeError):
+    pass
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper backed by a SQLite file: vectors are stored as
+    float32 blobs keyed by (model id, text), so rebuilding an index with
+    other chunking or index settings only embeds chunks it has not seen.
+
+    offline=True never calls the wrapped client and raises
+    EmbeddingCacheMiss for texts that are not cached (reproducible runs
+    on a prepared cache, e.g. in CI).
+    """
+
+    def __init__(self, inner: Embeddings, path: Path, model_id: str, *, offline: bool = False):
+        self.inner = inner
+        self.path = Path(path)
+        self.model_id = model_id
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # SQLite caps bound parameters per statement (999 on older builds).
+            for start in range(0, len(keys), 900):
+                part = keys[start : start + 900]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self._lookup(sorted(set(keys)))
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - sum(1 for k in keys if k in missing)
+        self.misses += len(missing)
+
+        if missing:
+            if self.offline:
+                raise EmbeddingCacheMiss(
+                    f"{len(missing)} text(s) not in embedding cache {self.path} for {self.model_id} (offline)"
+                )
+            vectors = self.inner.embed_documents(list(missing.values()))
+            rows = [
+                (key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in zip(missing, vectors)
+            ]
+            with self._lock:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._db.commit()
+            for key, (_, blob) in zip(missing, rows):
+                # Same float32 values a later cache hit returns.
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def size(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def cached(inner: Embeddings, path: Optional[Path], model_id: str, *, offline: bool = False) -> Embeddings:
+    """
+    `inner` wrapped in a CachedEmbeddings when a cache path is set.
+    """
+    if path is None:
+        return inner
+    return CachedEmbeddings(inner, path, model_id, offline=offline)
@@ -1,22 +1,128 @@
 from __future__ import annotations
 
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
+from langchain_openai.embeddings.base import _process_batched_chunked_embeddings
 
 from app.core.config import get_settings
+from app.core.deadline import stage_remaining_s
+from app.core.limiter import upstream_http_client
+from app.utils.llm_usage import record_embedding_usage
+
 
+_SDK_RETRIES = 2  # the SDK default
+_embeddings: Dict[bool, Embeddings] = {}
 
-def get_embeddings() -> OpenAIEmbeddings:
+
+class MeteredOpenAIEmbeddings(OpenAIEmbeddings):
     """
-    Returns an OpenAI embeddings client (text-embedding-3-small by default).
-    Requires OPENAI_API_KEY in environment/.env.
+    OpenAIEmbeddings that records the token usage reported by each response.
+
+    Keeps the stock tiktoken chunking of long texts (chunk embeddings are
+    averaged per text), but sends the batches itself: the stock path drops
+    the usage field of its responses.
+    """
+
+    def _create(self, batch: List) -> Dict:
+        response = self.client.create(input=batch, **self._invocation_params)
+        if not isinstance(response, dict):
+            response = response.model_dump()
+        usage = response.get("usage") or {}
+        record_embedding_usage(self.model, int(usage.get("prompt_tokens") or 0))
+        return response
+
+    def _get_len_safe_embeddings(
+        self, texts: List[str], *, engine: str, chunk_size: Optional[int] = None
+    ) -> List[List[float]]:
+        batch = chunk_size or self.chunk_size
+        batches, tokens, indices = self._tokenize(texts, batch)
+        chunk_embeddings: List[List[float]] = []
+        for start in batches:
+            response = self._create(tokens[start : start + batch])
+            chunk_embeddings.extend(r["embedding"] for r in response["data"])
+
+        embeddings = _process_batched_chunked_embeddings(
+            len(texts), tokens, chunk_embeddings, indices, self.skip_empty
+        )
+        empty: Optional[List[float]] = None
+        out: List[List[float]] = []
+        for e in embeddings:
+            if e is None:
+                if empty is None:
+                    empty = self._create([""])["data"][0]["embedding"]
+                e = empty
+            out.append(e)
+        return out
+
+
+class CompatibleOpenAIEmbeddings(MeteredOpenAIEmbeddings):
+    """
+    OpenAIEmbeddings for OpenAI-compatible endpoints (OPENAI_BASE_URL).
+
+    Sends raw text instead of tiktoken-tokenized chunks (no tokenizer download
+    needed offline) while still batching chunk_size texts per request; the
+    stock non-tokenizing path issues one request per text.
     """
+
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = 0) -> List[List[float]]:
+        batch = chunk_size or self.chunk_size
+        out: List[List[float]] = []
+        for start in range(0, len(texts), batch):
+            response = self._create(texts[start : start + batch])
+            out.extend(r["embedding"] for r in sorted(response["data"], key=lambda r: r["index"]))
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Returns the embeddings client for EMBEDDING_PROVIDER: OpenAI
+    (text-embedding-3-small by default; requires OPENAI_API_KEY in
+    environment/.env) or the local HashEmbeddings. Vectors are not cached
+    here: index builds and the watcher wrap the client in the
+    EMBEDDING_CACHE_PATH cache themselves, so query text never reaches it.
+    The client (and its HTTP connection pool) is created once per process;
+    inside a run_within stage a second one without SDK retries is used.
+    """
+    retries = stage_remaining_s() is None
+    embeddings = _embeddings.get(retries)
+    if embeddings is not None:
+        return embeddings
+
+    s = get_settings()
+    if s.EMBEDDING_PROVIDER == "hash":
+        from app.ingestion.hash_embeddings import HashEmbeddings
+
+        embeddings = HashEmbeddings(s.HASH_EMBEDDING_DIM)
+    else:
+        embeddings = _openai_embeddings(max_retries=_SDK_RETRIES if retries else 0)
+    _embeddings[retries] = embeddings
+    return embeddings
+
+
+def _openai_embeddings(max_retries: int = _SDK_RETRIES) -> OpenAIEmbeddings:
     s = get_settings()
     if not s.is_openai_configured:
         raise RuntimeError(
             "OPENAI_API_KEY is not set. Add it to .env or environment variables."
         )
 
-    return OpenAIEmbeddings(
+    if s.OPENAI_BASE_URL:
+        return CompatibleOpenAIEmbeddings(
+            model=s.OPENAI_EMBEDDING_MODEL,
+            api_key=s.OPENAI_API_KEY,
+            base_url=s.OPENAI_BASE_URL,
+            http_client=upstream_http_client("embeddings"),
+            max_retries=max_retries,
+            check_embedding_ctx_length=False,
+        )
+    return MeteredOpenAIEmbeddings(
         model=s.OPENAI_EMBEDDING_MODEL,
         api_key=s.OPENAI_API_KEY,
+        http_client=upstream_http_client("embeddings"),
+        max_retries=max_retries,
     )
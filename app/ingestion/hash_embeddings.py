@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+_WORD_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+
+def hash_embedding(text: str, dim: int = 1536) -> List[float]:
+    """
+    Deterministic feature-hashing embedding (word unigrams + bigrams, signed
+    buckets, L2-normalised). Texts sharing words land close together, which is
+    enough for offline benchmarks and CI; it is not a semantic model.
+    """
+    words = _WORD_RE.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    vec = np.zeros(dim, dtype=np.float32)
+    for f in features:
+        h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0:
+        vec[0] = 1.0
+        norm = 1.0
+    return (vec / norm).tolist()
+
+
+class HashEmbeddings(Embeddings):
+    """
+    LangChain Embeddings backed by hash_embedding (no network, no model).
+    """
+
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [hash_embedding(t, self.dim) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return hash_embedding(text, self.dim)
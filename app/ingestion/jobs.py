@@ -0,0 +1,407 @@
+"""
+Background reindex jobs.
+
+A job is a separate `python -m app.ingestion.jobs <job_id>` process (niced,
+never on the API's request threads) that builds the index into staging paths
+next to the live ones and, on success, swaps them in. Serving processes pick
+up the new generation through FAISSStore's manifest watch.
+
+Job state lives in STORAGE_DIR/jobs/<job_id>/status.json, written by the job
+process and readable by every API worker; cancellation is a `cancel` marker
+file the job checks between batches.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+STAGES = ("load", "split", "embed", "save", "summaries", "swap")
+
+# A queued job whose process has not reported yet counts as active this long.
+_QUEUED_GRACE_S = 30.0
+# Minimum interval between status writes for progress within a stage.
+_WRITE_INTERVAL_S = 0.5
+
+_JOB_ID = re.compile(r"[0-9a-f]{12}")
+
+# Job processes started by this API process (polled so they are reaped).
+_processes: Dict[str, subprocess.Popen] = {}
+_processes_lock = threading.Lock()
+
+
+class ReindexConflict(RuntimeError):
+    """
+    Another reindex job is still queued or running.
+    """
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Reindex job {job_id} is already in progress")
+        self.job_id = job_id
+
+
+class ReindexCancelled(Exception):
+    pass
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def jobs_dir() -> Path:
+    return get_settings().STORAGE_DIR / "jobs"
+
+
+def _job_dir(job_id: str) -> Path:
+    return jobs_dir() / job_id
+
+
+def _write_status(job_id: str, status: Dict[str, Any]) -> None:
+    path = _job_dir(job_id) / "status.json"
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(status, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_status(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((_job_dir(job_id) / "status.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        # An exited child not yet reaped by the worker that started it.
+        return Path(f"/proc/{pid}/stat").read_text().split(")")[-1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def staging_paths(tag: str) -> Dict[str, Path]:
+    """
+    Build outputs, next to the live paths so the swap is a rename on one filesystem.
+    """
+    from app.retriever.summary_store import summary_store_path
+
+    s = get_settings()
+    index_dir = s.FAISS_INDEX_DIR
+    manifest = s.STORAGE_DIR / "manifest.json"
+    summaries = summary_store_path()
+    return {
+        "index_dir": index_dir.with_name(f".{index_dir.name}.{tag}"),
+        "manifest": manifest.with_name(f".{manifest.stem}.{tag}.json"),
+        "summaries": summaries.with_name(f".{summaries.stem}.{tag}.json"),
+    }
+
+
+def _refresh(status: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reap this process's job children and mark jobs whose process died
+    without reporting as failed.
+    """
+    job_id = status["job_id"]
+    with _processes_lock:
+        proc = _processes.get(job_id)
+        if proc is not None and proc.poll() is not None:
+            _processes.pop(job_id, None)
+
+    if status["status"] in FINISHED_STATES:
+        return status
+    if status["status"] == "queued" and time.time() - status["created_at_ts"] < _QUEUED_GRACE_S:
+        return status
+    if _pid_alive(status.get("pid")) and (proc is None or proc.poll() is None):
+        return status
+
+    fresh = _read_status(job_id) or status  # it may have finished meanwhile
+    if fresh["status"] in FINISHED_STATES:
+        return fresh
+    fresh.update(status="failed", error="job process exited without reporting", finished_at=_utc_now_iso())
+    _write_status(job_id, fresh)
+    return fresh
+
+
+def _claim(job_id: str) -> None:
+    """
+    One job at a time, across API workers: STORAGE_DIR/jobs/active holds the
+    running job id (O_EXCL create); stale claims of finished jobs are cleared.
+    """
+    active = jobs_dir() / "active"
+    for _ in range(2):
+        try:
+            fd = os.open(active, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            other = active.read_text(encoding="utf-8").strip()
+            status = _read_status(other) if other else None
+            if status is not None and _refresh(status)["status"] not in FINISHED_STATES:
+                raise ReindexConflict(other)
+            active.unlink(missing_ok=True)
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(job_id)
+        return
+    raise ReindexConflict(active.read_text(encoding="utf-8").strip())
+
+
+def _release(job_id: str) -> None:
+    active = jobs_dir() / "active"
+    try:
+        if active.read_text(encoding="utf-8").strip() == job_id:
+            active.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def start_reindex(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Queue a reindex with build_faiss_index keyword `options` and start its
+    process. Raises ReindexConflict if another job is active.
+    """
+    job_id = uuid.uuid4().hex[:12]
+    _job_dir(job_id).mkdir(parents=True, exist_ok=True)
+    _claim(job_id)
+
+    status: Dict[str, Any] = {
+        "job_id": job_id,
+        "status": "queued",
+        "stage": None,
+        "options": options,
+        "created_at": _utc_now_iso(),
+        "created_at_ts": time.time(),
+        "progress": {},
+    }
+    _write_status(job_id, status)
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "app.ingestion.jobs", job_id],
+            cwd=os.getcwd(),
+            env=dict(os.environ),
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,  # not killed with the API's process group
+        )
+    except OSError:
+        _release(job_id)
+        raise
+    with _processes_lock:
+        _processes[job_id] = proc
+    # The job process records its own pid when it starts running.
+    logger.info("Started reindex job %s (pid %d)", job_id, proc.pid)
+    return {**status, "pid": proc.pid}
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if not _JOB_ID.fullmatch(job_id):
+        return None
+    status = _read_status(job_id)
+    return _refresh(status) if status is not None else None
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Ask a job to stop; it aborts at its next progress report (one embedding
+    batch or summary) and removes its staging files. A job already swapping
+    in its build completes.
+    """
+    status = get_job(job_id)
+    if status is None or status["status"] in FINISHED_STATES:
+        return status
+    (_job_dir(job_id) / "cancel").touch()
+    status["cancel_requested"] = True
+    return status
+
+
+class _JobRecorder:
+    """
+    Status writer of the job process: stage progress with throughput and ETA,
+    throttled to one write per _WRITE_INTERVAL_S within a stage.
+    """
+
+    def __init__(self, job_id: str, status: Dict[str, Any]):
+        self.job_id = job_id
+        self.status = status
+        self.cancel_marker = _job_dir(job_id) / "cancel"
+        self._stage_started: Dict[str, float] = {}
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self.swapping = False
+
+    def check_cancelled(self) -> None:
+        if not self.swapping and self.cancel_marker.exists():
+            raise ReindexCancelled()
+
+    def write(self) -> None:
+        self.status["elapsed_s"] = round(time.time() - self.status["started_at_ts"], 2)
+        _write_status(self.job_id, self.status)
+        self._last_write = time.monotonic()
+
+    def stage(self, stage: str, done: int, total: Optional[int]) -> None:
+        with self._lock:
+            now = time.monotonic()
+            started = self._stage_started.setdefault(stage, now)
+            entry: Dict[str, Any] = {"done": done, "total": total}
+            elapsed = now - started
+            if elapsed > 0 and done:
+                entry["per_s"] = round(done / elapsed, 1)
+                if total:
+                    entry["eta_s"] = round((total - done) * elapsed / done, 1)
+            new_stage = self.status.get("stage") != stage
+            self.status["stage"] = stage
+            self.status["progress"][stage] = entry
+            if new_stage or done == total or now - self._last_write >= _WRITE_INTERVAL_S:
+                self.write()
+        self.check_cancelled()
+
+
+@contextmanager
+def index_swap_lock() -> Iterator[None]:
+    """
+    Exclusive lock (flock on STORAGE_DIR/.index.lock) around swapping a build
+    in, shared by reindex jobs and the directory watcher.
+    """
+    path = get_settings().STORAGE_DIR / ".index.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def promote_build(paths: Dict[str, Path], manifest: Dict[str, Any]) -> None:
+    """
+    Swap the staged build in: index directory by rename (the previous one is
+    kept as <name>.prev until the next swap), then summaries, then the
+    manifest last, which is what serving processes watch. Callers hold
+    index_swap_lock.
+    """
+    from app.retriever.summary_store import summary_store_path
+
+    s = get_settings()
+    live, prev = s.FAISS_INDEX_DIR, s.FAISS_INDEX_DIR.with_name(f"{s.FAISS_INDEX_DIR.name}.prev")
+    shutil.rmtree(prev, ignore_errors=True)
+    if live.exists():
+        os.rename(live, prev)
+    os.rename(paths["index_dir"], live)
+
+    if paths["summaries"].exists():
+        os.replace(paths["summaries"], summary_store_path())
+        manifest["issue_summaries"]["path"] = str(summary_store_path())
+
+    manifest_path = s.STORAGE_DIR / "manifest.json"
+    tmp = manifest_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    paths["manifest"].unlink(missing_ok=True)
+
+
+def cleanup_build(paths: Dict[str, Path]) -> None:
+    shutil.rmtree(paths["index_dir"], ignore_errors=True)
+    paths["manifest"].unlink(missing_ok=True)
+    paths["summaries"].unlink(missing_ok=True)
+
+
+def _lower_priority(nice: int) -> None:
+    """
+    Nice the job process. It runs in its own session, which with scheduler
+    autogroups (most desktop and many server kernels) is a separate group
+    competing 1:1 with the API, so the group is niced as well.
+    """
+    os.nice(nice)
+    try:
+        Path("/proc/self/autogroup").write_text(str(nice))
+    except OSError:
+        pass  # no autogroups, or not permitted
+
+
+def run_job(job_id: str) -> int:
+    """
+    Entry point of the job process. Returns the process exit code.
+    """
+    from app.core.limiter import Priority, request_priority
+    from app.ingestion.build_index import build_faiss_index
+    from app.utils.usage_ledger import usage_scope
+
+    s = get_settings()
+    if s.REINDEX_NICE:
+        _lower_priority(s.REINDEX_NICE)
+
+    status = _read_status(job_id)
+    if status is None:
+        logger.error("Unknown reindex job %s", job_id)
+        return 2
+    status.update(status="running", pid=os.getpid(), started_at=_utc_now_iso(), started_at_ts=time.time())
+    recorder = _JobRecorder(job_id, status)
+    paths = staging_paths(job_id)
+    try:
+        recorder.write()
+        recorder.check_cancelled()
+        with request_priority(Priority.BATCH), usage_scope("ingestion"):
+            manifest = build_faiss_index(
+                **status["options"],
+                index_dir=paths["index_dir"],
+                manifest_path=paths["manifest"],
+                summaries_path=paths["summaries"],
+                progress=recorder.stage,
+            )
+        recorder.check_cancelled()
+        recorder.swapping = True
+        recorder.stage("swap", 0, 1)
+        with index_swap_lock():
+            promote_build(paths, manifest)
+        recorder.stage("swap", 1, 1)
+        status.update(
+            status="succeeded",
+            generation_id=manifest["generation_id"],
+            total_chunks=manifest["total_chunks"],
+        )
+        code = 0
+    except ReindexCancelled:
+        cleanup_build(paths)
+        status["status"] = "cancelled"
+        code = 0
+    except Exception as e:
+        logger.exception("Reindex job %s failed", job_id)
+        cleanup_build(paths)
+        status.update(status="failed", error=f"{type(e).__name__}: {e}")
+        code = 1
+
+    status["finished_at"] = _utc_now_iso()
+    recorder.write()
+    _release(job_id)
+    logger.info("Reindex job %s %s in %.1f s", job_id, status["status"], status["elapsed_s"])
+    return code
+
+
+if __name__ == "__main__":
+    # python -m app.ingestion.jobs <job_id>  (started by start_reindex)
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    sys.exit(run_job(sys.argv[1]))
@@ -2,17 +2,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
 
-from langchain_core.documents import Document
-
-# Minimal loader dependencies
-# pip install langchain-community
-from langchain_community.document_loaders import (
-    TextLoader,
-    PyPDFLoader,
-    UnstructuredWordDocumentLoader,
-)
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 
 @dataclass(frozen=True)
@@ -21,17 +14,30 @@ class LoadedCorpus:
     documents: List[Document]
 
 
+# Corpora indexed from DATA_DIR: files named <corpus>.<ext>
+CORPORA = ("ai_test_bug_report", "ai_test_user_feedback")
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf", ".docx")
+
+
 def _pick_loader(path: Path):
     """
     Pick a loader based on file extension.
     Supported: .txt, .md, .pdf, .docx
+    Loaders are imported per file type, so a .txt corpus never loads pypdf
+    or unstructured (pip install langchain-community).
     """
     ext = path.suffix.lower()
     if ext in {".txt", ".md"}:
+        from langchain_community.document_loaders import TextLoader
+
         return TextLoader(str(path), encoding="utf-8")
     if ext == ".pdf":
+        from langchain_community.document_loaders import PyPDFLoader
+
         return PyPDFLoader(str(path))
     if ext == ".docx":
+        from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+
         return UnstructuredWordDocumentLoader(str(path))
     raise ValueError(f"Unsupported file type: {ext} for {path.name}")
 
@@ -41,10 +47,54 @@ def _discover_files(data_dir: Path, stem_prefix: str) -> List[Path]:
     Finds files in data_dir that match a prefix like:
       ai_test_bug_report.*
       ai_test_user_feedback.*
-    Returns sorted paths for deterministic indexing.
+    Returns sorted paths for deterministic indexing. Other extensions
+    (editor swap files, partial downloads) are ignored.
     """
     candidates = sorted(data_dir.glob(f"{stem_prefix}.*"))
-    return [p for p in candidates if p.is_file()]
+    return [p for p in candidates if p.suffix.lower() in SUPPORTED_EXTENSIONS and p.is_file()]
+
+
+def load_file(fp: Path, corpus_name: str, *, extra_metadata: Optional[dict] = None) -> List[Document]:
+    """
+    Parse one corpus file into Documents with normalized metadata
+    (see load_corpus).
+    """
+    docs = _pick_loader(fp).load()
+    for d in docs:
+        d.metadata = dict(d.metadata or {})
+        d.metadata.update(
+            {
+                "source": corpus_name,
+                "file_name": fp.name,
+                "file_path": str(fp.resolve()),
+            }
+        )
+        d.metadata.update(extra_metadata or {})
+    return docs
+
+
+def corpus_files(data_dir: Path) -> Dict[str, List[Path]]:
+    """
+    Files of every corpus in CORPORA, by corpus name (may be empty).
+    """
+    return {name: _discover_files(data_dir, name) for name in CORPORA}
+
+
+def file_signatures(data_dir: Path) -> Dict[str, Dict[str, object]]:
+    """
+    Corpus files keyed by resolved path, with corpus name, size and mtime_ns.
+    Recorded in the manifest so the directory watcher can tell what the
+    index was built from.
+    """
+    out: Dict[str, Dict[str, object]] = {}
+    for name, files in corpus_files(data_dir).items():
+        for fp in files:
+            try:
+                st = fp.stat()
+            except FileNotFoundError:
+                continue
+            out[str(fp.resolve())] = {"corpus": name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    return out
 
 
 def load_corpus(
@@ -53,6 +103,7 @@ def load_corpus(
     *,
     corpus_name: Optional[str] = None,
     extra_metadata: Optional[dict] = None,
+    on_file: Optional[Callable[[Path], None]] = None,
 ) -> LoadedCorpus:
     """
     Load a corpus from files that match stem_prefix.* inside data_dir.
@@ -63,6 +114,8 @@ def load_corpus(
       - file_path
       - page (if available)
       - plus extra_metadata (if provided)
+
+    on_file is called after each file is parsed (progress reporting).
     """
     files = _discover_files(data_dir, stem_prefix)
     if not files:
@@ -75,36 +128,20 @@ def load_corpus(
 
     all_docs: List[Document] = []
     for fp in files:
-        loader = _pick_loader(fp)
-        docs = loader.load()
-
-        # Normalize metadata
-        for d in docs:
-            d.metadata = dict(d.metadata or {})
-            d.metadata.update(
-                {
-                    "source": name,
-                    "file_name": fp.name,
-                    "file_path": str(fp.resolve()),
-                }
-            )
-            d.metadata.update(md_extra)
-        all_docs.extend(docs)
+        all_docs.extend(load_file(fp, name, extra_metadata=md_extra))
+        if on_file is not None:
+            on_file(fp)
 
     return LoadedCorpus(name=name, documents=all_docs)
 
 
-def load_all_corpora(data_dir: Path) -> List[LoadedCorpus]:
+def load_all_corpora(data_dir: Path, on_file: Optional[Callable[[Path], None]] = None) -> List[LoadedCorpus]:
     """
     Convenience helper for this test:
       - ai_test_bug_report.*
       - ai_test_user_feedback.*
     """
-    bug = load_corpus(data_dir, "ai_test_bug_report", corpus_name="ai_test_bug_report")
-    feedback = load_corpus(
-        data_dir, "ai_test_user_feedback", corpus_name="ai_test_user_feedback"
-    )
-    return [bug, feedback]
+    return [load_corpus(data_dir, name, corpus_name=name, on_file=on_file) for name in CORPORA]
 
 
 def flatten_documents(corpora: Sequence[LoadedCorpus]) -> List[Document]:
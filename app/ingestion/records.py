@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+# "Field: value" lines of a bug record, in the order they appear in the corpus.
+BUG_FIELDS = ("Title", "Description", "Steps to Reproduce", "Environment", "Severity", "Proposed Fix")
+
+_BUG_HEADER = re.compile(r"^\ufeff?\s*Bug #(\d+)\s*$", flags=re.MULTILINE)
+_FEEDBACK_LINE = re.compile(r"^\ufeff?\s*Feedback #(\d+):\s*(.+?)\s*$", flags=re.MULTILINE)
+_HEADER_LINE = re.compile(r"^\ufeff?\s*(Bug|Feedback) #\d+:?\s*", flags=re.MULTILINE | re.IGNORECASE)
+_WORD = re.compile(r"\w+", flags=re.UNICODE)
+_FIELD_LINE = re.compile(r"^(%s):\s*(.*)$" % "|".join(re.escape(f) for f in BUG_FIELDS))
+
+
+@dataclass(frozen=True)
+class BugRecord:
+    """
+    One `Bug #N` block of the bug-report corpus.
+    Fields missing from the text (e.g. a record cut by chunking) are empty strings.
+    """
+    number: int
+    fields: Dict[str, str] = field(default_factory=dict)
+    text: str = ""
+
+    @property
+    def record_id(self) -> str:
+        return f"bug_{self.number}"
+
+    @property
+    def title(self) -> str:
+        return self.fields.get("Title", "")
+
+    @property
+    def severity(self) -> str:
+        return self.fields.get("Severity", "")
+
+    def get(self, name: str) -> str:
+        return self.fields.get(name, "")
+
+
+@dataclass(frozen=True)
+class FeedbackRecord:
+    number: int
+    text: str
+
+    @property
+    def record_id(self) -> str:
+        return f"feedback_{self.number}"
+
+
+def parse_bug_fields(block: str) -> Dict[str, str]:
+    """
+    Parse `Field: value` lines; continuation lines (numbered steps, wrapped
+    text) are appended to the preceding field.
+    """
+    fields: Dict[str, str] = {}
+    current: Optional[str] = None
+    for raw in block.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        m = _FIELD_LINE.match(line)
+        if m:
+            current = m.group(1)
+            fields[current] = m.group(2).strip()
+        elif current is not None:
+            fields[current] = f"{fields[current]}\n{line}".strip()
+    return fields
+
+
+def parse_bug_records(text: str) -> List[BugRecord]:
+    """
+    Split text on `Bug #N` headers. Works on whole files and on chunks;
+    text before the first header in a chunk (the tail of a previous record)
+    is ignored.
+    """
+    headers = list(_BUG_HEADER.finditer(text))
+    records: List[BugRecord] = []
+    for i, m in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        block = text[m.end() : end].strip()
+        records.append(BugRecord(number=int(m.group(1)), fields=parse_bug_fields(block), text=block))
+    return records
+
+
+def parse_feedback_records(text: str) -> List[FeedbackRecord]:
+    """
+    One record per `Feedback #N: ...` line.
+    """
+    return [FeedbackRecord(number=int(m.group(1)), text=m.group(2)) for m in _FEEDBACK_LINE.finditer(text)]
+
+
+def normalize_record_text(text: str) -> str:
+    """
+    Canonical form for matching pasted records against the corpus:
+    no `Bug #N` / `Feedback #N` header, lower case, words only.
+    """
+    return " ".join(_WORD.findall(_HEADER_LINE.sub("", text).lower()))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_record_text(text).encode("utf-8")).hexdigest()[:16]
+
+
+def word_shingles(text: str, k: int = 3) -> Set[str]:
+    """
+    Overlapping k-word shingles of the normalised text (the whole text if shorter).
+    """
+    words = normalize_record_text(text).split()
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)}
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import List, Optional
-from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 def get_splitter(
@@ -18,6 +20,8 @@ def get_splitter(
       - chunk_size ~ 900 chars (safe for many embedding models; adjust as needed)
       - overlap ~ 150 chars to preserve context between chunks
     """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     seps = separators or ["\n\n", "\n", ". ", " ", ""]
     return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
@@ -33,12 +37,14 @@ def split_documents(
     *,
     chunk_size: int = 900,
     chunk_overlap: int = 150,
+    first_chunk_id: int = 0,
 ) -> List[Document]:
     """
     Split documents into chunks and add chunk metadata.
 
     Adds/ensures:
-      - chunk_id: stable-ish id based on order within input list
+      - chunk_id: stable-ish id based on order within input list (from
+        first_chunk_id, so incremental additions do not reuse ids)
       - parent_source/file_name/page metadata kept from original
     """
     splitter = get_splitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
@@ -46,5 +52,5 @@ def split_documents(
 
     for i, d in enumerate(chunks):
         d.metadata = dict(d.metadata or {})
-        d.metadata["chunk_id"] = d.metadata.get("chunk_id") or f"chunk_{i}"
+        d.metadata["chunk_id"] = d.metadata.get("chunk_id") or f"chunk_{first_chunk_id + i}"
     return chunks
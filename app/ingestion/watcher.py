@@ -0,0 +1,408 @@
+"""
+Directory watcher: near-real-time ingestion of DATA_DIR.
+
+Polls the corpus files (stat only), waits for a burst of writes to settle,
+then applies the difference to the index incrementally: chunks of changed
+or removed files are deleted, added or changed files are parsed, split and
+embedded, and nothing else is re-embedded. Each update is published like a
+reindex job (staging build, swap, manifest written last), so serving
+processes pick it up through FAISSStore's generation watch.
+
+The manifest's "files" map (path -> corpus, size, mtime_ns) is what the
+index was built from; the watcher diffs DATA_DIR against it, so changes
+made while it was not running are applied on start, and a full rebuild
+(scripts.ingest, /admin/reindex) simply becomes the new base.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.ingestion.jobs import cleanup_build, index_swap_lock, promote_build, staging_paths
+from app.ingestion.loader import file_signatures, load_file
+from app.retriever.faiss_store import FAISSStore
+from app.retriever.sharded import ShardedFAISS
+from app.utils.usage_ledger import usage_scope
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+
+    from app.retriever.faiss_store import VectorStore
+    from app.retriever.quantization import VectorFormat
+
+logger = logging.getLogger(__name__)
+
+BUG_CORPUS = "ai_test_bug_report"
+FEEDBACK_CORPUS = "ai_test_user_feedback"
+
+
+@dataclass
+class FileChanges:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    @property
+    def stale(self) -> List[str]:
+        """
+        Files whose indexed chunks must go.
+        """
+        return self.changed + self.removed
+
+    @property
+    def fresh(self) -> List[str]:
+        """
+        Files to parse and embed.
+        """
+        return self.added + self.changed
+
+
+def diff_files(indexed: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]]) -> FileChanges:
+    """
+    Compare file signatures (size, mtime_ns) of the index with DATA_DIR.
+    """
+    changes = FileChanges()
+    for path, sig in sorted(current.items()):
+        old = indexed.get(path)
+        if old is None:
+            changes.added.append(path)
+        elif (old.get("size"), old.get("mtime_ns")) != (sig["size"], sig["mtime_ns"]):
+            changes.changed.append(path)
+    changes.removed = sorted(set(indexed) - set(current))
+    return changes
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _delete_files(store: FAISS, paths: Set[str]) -> int:
+    ids = [
+        doc_id
+        for doc_id in store.index_to_docstore_id.values()
+        if (store.docstore.search(doc_id).metadata or {}).get("file_path") in paths
+    ]
+    if ids:
+        store.delete(ids)
+    return len(ids)
+
+
+class IndexWatcher:
+    """
+    Keeps the live index in memory and applies DATA_DIR changes to it.
+
+    poll() is one polling step (call it every WATCH_POLL_S); run() loops
+    until `stop` is set. Changes are applied once no file changed for
+    debounce_s, or max_delay_s after the first change of a burst.
+    """
+
+    def __init__(
+        self,
+        *,
+        poll_s: Optional[float] = None,
+        debounce_s: Optional[float] = None,
+        max_delay_s: Optional[float] = None,
+        embeddings: Optional[Embeddings] = None,
+    ):
+        s = get_settings()
+        self.poll_s = poll_s if poll_s is not None else s.WATCH_POLL_S
+        self.debounce_s = debounce_s if debounce_s is not None else s.WATCH_DEBOUNCE_S
+        self.max_delay_s = max_delay_s if max_delay_s is not None else s.WATCH_MAX_DELAY_S
+        self.data_dir = s.DATA_DIR
+        self.fs = FAISSStore()
+        self._embeddings = embeddings
+        self.store: Optional[VectorStore] = None
+        self.manifest: Dict[str, Any] = {}
+        # Debounce state: last scan, when it last differed, first change of the burst.
+        self._last_scan: Optional[Dict[str, Dict[str, Any]]] = None
+        self._last_change = 0.0
+        self._burst_started: Optional[float] = None
+        # Files that failed to parse, by signature: retried once they change again.
+        self._failed: Dict[str, tuple] = {}
+        self.updates = 0
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            from app.ingestion.embedding_cache import cached
+            from app.ingestion.embeddings import get_embeddings
+
+            s = get_settings()
+            self._embeddings = cached(get_embeddings(), s.EMBEDDING_CACHE_PATH, s.embedding_model_id)
+        return self._embeddings
+
+    def load(self) -> None:
+        """
+        (Re)load the live index and manifest as the base for updates.
+        """
+        manifest = self.fs.read_manifest()
+        if "files" not in manifest:
+            raise RuntimeError(
+                "The index manifest does not list its source files (built before the watcher existed); "
+                "rebuild it once with python -m scripts.ingest"
+            )
+        self.store = self.fs.load(self.embeddings)
+        self.manifest = manifest
+        logger.info(
+            "Watching %s: index generation %s, %d files",
+            self.data_dir.resolve(),
+            manifest.get("generation_id"),
+            len(manifest["files"]),
+        )
+
+    def pending(self, scan: Optional[Dict[str, Dict[str, Any]]] = None) -> FileChanges:
+        """
+        What DATA_DIR would change in the index now (excluding files that
+        failed to parse and have not changed since).
+        """
+        scan = file_signatures(self.data_dir) if scan is None else scan
+        changes = diff_files(self.manifest.get("files", {}), scan)
+        skip = {p for p, sig in self._failed.items() if p in scan and (scan[p]["size"], scan[p]["mtime_ns"]) == sig}
+        changes.added = [p for p in changes.added if p not in skip]
+        changes.changed = [p for p in changes.changed if p not in skip]
+        return changes
+
+    def poll(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        One polling step. Returns the update record when changes were applied.
+        """
+        now = time.monotonic() if now is None else now
+        scan = file_signatures(self.data_dir)
+        if scan != self._last_scan:
+            self._last_scan = scan
+            self._last_change = now
+        changes = self.pending(scan)
+        if not changes:
+            self._burst_started = None
+            return None
+        if self._burst_started is None:
+            self._burst_started = now
+        quiet = now - self._last_change >= self.debounce_s
+        overdue = now - self._burst_started >= self.max_delay_s
+        if not (quiet or overdue):
+            return None
+        self._burst_started = None
+        return self.apply()
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        if self.store is None:
+            self.load()
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                # Keep watching; the base is reloaded so a half-applied update is dropped.
+                logger.exception("Applying directory changes failed; reloading the index")
+                self.load()
+            stop.wait(self.poll_s)
+
+    def apply(self) -> Optional[Dict[str, Any]]:
+        """
+        Apply pending changes to the index and publish a new generation.
+        """
+        with index_swap_lock():
+            on_disk = self.fs.read_manifest()
+            if on_disk.get("generation_id") != self.manifest.get("generation_id"):
+                # Rebuilt (or updated) by someone else: that is the new base.
+                self.load()
+            scan = file_signatures(self.data_dir)
+            changes = self.pending(scan)
+            if not changes:
+                return None
+            with usage_scope("ingestion"):
+                return self._apply(changes, scan)
+
+    def _apply(self, changes: FileChanges, scan: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        from app.ingestion.splitter import split_documents
+        from app.retriever.quantization import VectorFormat
+
+        t0 = time.perf_counter()
+        detected_at = time.time()
+        manifest = self.manifest
+        fmt = VectorFormat.from_manifest(manifest)
+        generation_id = uuid.uuid4().hex[:12]
+
+        removed_chunks = self._delete(set(changes.stale))
+
+        files = {p: sig for p, sig in manifest["files"].items() if p not in set(changes.stale)}
+        docs: List[Document] = []
+        for path in changes.fresh:
+            sig = scan[path]
+            try:
+                loaded = load_file(Path(path), sig["corpus"])
+            except Exception as e:  # e.g. a file still being written; retried when it changes
+                logger.warning("Cannot parse %s, skipping until it changes: %s", path, e)
+                self._failed[path] = (sig["size"], sig["mtime_ns"])
+                continue
+            self._failed.pop(path, None)
+            docs.extend(self._dedup(loaded, sig["corpus"]))
+            files[path] = sig
+        if files == manifest["files"]:
+            return None  # only unparseable files
+
+        chunking = manifest.get("chunking") or {}
+        next_chunk_id = int(manifest.get("next_chunk_id", manifest.get("total_chunks", 0)))
+        chunks = split_documents(
+            docs,
+            chunk_size=chunking.get("chunk_size", 900),
+            chunk_overlap=chunking.get("chunk_overlap", 150),
+            first_chunk_id=next_chunk_id,
+        )
+        self._add(chunks, fmt)
+
+        paths = staging_paths(generation_id)
+        try:
+            touched = {scan.get(p, manifest["files"].get(p, {})).get("corpus") for p in changes.stale + changes.fresh}
+            summaries = self._summaries(manifest, files, generation_id, paths["summaries"]) if BUG_CORPUS in touched else None
+
+            indexes = list(self.store.shards.values()) if isinstance(self.store, ShardedFAISS) else [self.store]
+            changed_at = {p: scan[p]["mtime_ns"] / 1e9 for p in changes.fresh if p in files}
+            changed_at.update({p: detected_at for p in changes.removed})
+            update = {
+                "base_generation_id": manifest.get("generation_id"),
+                "updated_at_utc": _utc_now_iso(),
+                "updated_at_ts": time.time(),
+                "added": changes.added,
+                "changed": changes.changed,
+                "removed": changes.removed,
+                "chunks_added": len(chunks),
+                "chunks_removed": removed_chunks,
+                # File write (or removal seen) -> published; the API adds load time.
+                "changed_at_ts": changed_at,
+            }
+            new_manifest = {
+                **manifest,
+                "generation_id": generation_id,
+                "files": files,
+                "total_files": len(files),
+                "total_chunks": sum(ix.index.ntotal for ix in indexes),
+                "next_chunk_id": next_chunk_id + len(chunks),
+                "vectors": fmt.to_manifest([ix.index for ix in indexes]),
+                "incremental": {"updates": int((manifest.get("incremental") or {}).get("updates", 0)) + 1, "last": update},
+            }
+            if isinstance(self.store, ShardedFAISS):
+                new_manifest["sharding"] = self._sharding_manifest(manifest["sharding"])
+            if summaries is not None:
+                new_manifest["issue_summaries"] = summaries
+
+            paths["index_dir"].mkdir(parents=True, exist_ok=True)
+            self.store.save_local(str(paths["index_dir"]))
+            promote_build(paths, new_manifest)
+        except BaseException:
+            cleanup_build(paths)
+            raise
+
+        self.manifest = new_manifest
+        self.updates += 1
+        lag = max((update["updated_at_ts"] - t for t in changed_at.values()), default=0.0)
+        logger.info(
+            "Index generation %s: +%d files, ~%d, -%d; %d chunks embedded, %d removed in %.2f s (oldest change %.1f s ago)",
+            generation_id,
+            len(changes.added),
+            len(changes.changed),
+            len(changes.removed),
+            len(chunks),
+            removed_chunks,
+            time.perf_counter() - t0,
+            lag,
+        )
+        return update
+
+    def _delete(self, paths: Set[str]) -> int:
+        if not paths:
+            return 0
+        if isinstance(self.store, ShardedFAISS):
+            return sum(_delete_files(shard, paths) for shard in self.store.shards.values())
+        return _delete_files(self.store, paths)
+
+    def _dedup(self, docs: List[Document], corpus: str) -> List[Document]:
+        """
+        Feedback of a deduplicated index is clustered within the new file.
+        Near-duplicates across files are merged, and cluster member lists of
+        representatives from other files refreshed, by the next full rebuild.
+        """
+        dedup = self.manifest.get("feedback_dedup")
+        if corpus != FEEDBACK_CORPUS or not dedup:
+            return docs
+        from app.ingestion.dedup import deduplicate_feedback
+
+        deduped, _ = deduplicate_feedback(docs, threshold=dedup.get("threshold", get_settings().FEEDBACK_DEDUP_THRESHOLD))
+        return deduped
+
+    def _add(self, chunks: List[Document], fmt: VectorFormat) -> None:
+        from app.retriever.quantization import add_documents, build_vectorstore
+        from app.retriever.sharded import partition
+
+        if not chunks:
+            return
+        if not isinstance(self.store, ShardedFAISS):
+            add_documents(self.store, chunks, self.embeddings, fmt)
+            return
+        sharding = self.manifest["sharding"]
+        num_shards = sharding.get("num_shards") or len(sharding["shards"])
+        for name, docs in partition(chunks, sharding["mode"], num_shards).items():
+            shard = self.store.shards.get(name)
+            if shard is None:
+                self.store.shards[name] = build_vectorstore(docs, self.embeddings, fmt)
+                self.store.sources[name] = name if sharding["mode"] == "source" else None
+            else:
+                add_documents(shard, docs, self.embeddings, fmt)
+
+    def _sharding_manifest(self, previous: Dict[str, Any]) -> Dict[str, Any]:
+        from app.retriever.quantization import index_bytes
+
+        return {
+            **previous,
+            "shards": [
+                {
+                    "name": name,
+                    "source": self.store.sources.get(name),
+                    "chunks": shard.index.ntotal,
+                    "index_bytes": index_bytes(shard.index),
+                }
+                for name, shard in sorted(self.store.shards.items())
+            ],
+        }
+
+    def _summaries(
+        self, manifest: Dict[str, Any], files: Dict[str, Dict[str, Any]], generation_id: str, out_path: Path
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the summary store from the bug-report files, reusing the
+        summary of every record whose text did not change.
+        """
+        previous = manifest.get("issue_summaries")
+        if not previous:
+            return None
+        from app.ingestion.build_summaries import build_issue_summaries
+        from app.retriever.summary_store import IssueSummaryStore, summary_store_path
+
+        bug_docs: List[Document] = []
+        for path, sig in sorted(files.items()):
+            if sig["corpus"] == BUG_CORPUS:
+                bug_docs.extend(load_file(Path(path), BUG_CORPUS))
+        live = summary_store_path()
+        reuse = IssueSummaryStore.load(live) if live.exists() else None
+        return build_issue_summaries(
+            bug_docs, mode=previous["mode"], out_path=out_path, generation_id=generation_id, reuse=reuse
+        )
+
+
+def watch(stop: Optional[threading.Event] = None, **kwargs: Any) -> None:
+    """
+    Run the directory watcher until `stop` is set (or forever).
+    """
+    IndexWatcher(**kwargs).run(stop)
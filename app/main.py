@@ -1,52 +1,49 @@
 from __future__ import annotations
 
-import uuid
-from datetime import datetime, timezone
-from typing import Literal, Optional, List, Any, Dict
-
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-
-
-# Pydantic Schemas
-ToolName = Literal["internal_qa", "issue_summary"]
-
-
-class AskRequest(BaseModel):
-    query: str = Field(..., min_length=1, description="User question to the internal AI assistant")
-    top_k: int = Field(5, ge=1, le=20, description="How many chunks to retrieve from vector search (internal_qa only)")
-
-
-class SummarizeRequest(BaseModel):
-    issue_text: str = Field(..., min_length=1, description="Raw issue text to summarize")
+import time
 
+_MODULE_T0 = time.perf_counter()  # first line of the app: import + warm-up = cold start
 
-class Citation(BaseModel):
-    source: str = Field(..., description="Document source name, e.g., ai_test_bug_report")
-    doc_id: Optional[str] = Field(None, description="Document identifier (if available)")
-    chunk_id: Optional[str] = Field(None, description="Chunk identifier (if available)")
-    snippet: Optional[str] = Field(None, description="Short excerpt from retrieved text")
-
+import hmac
+import logging
+import math
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
 
-class ToolOutputInternalQA(BaseModel):
-    answer: str
-    citations: List[Citation] = Field(default_factory=list)
-    confidence: Literal["low", "medium", "high"] = "medium"
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.core.config import get_settings
+from app.core.container import ServiceContainer, build_container, preloaded_container
+from app.core.limiter import OverloadedError, Priority, request_priority
+from app.core.logging import setup_logging
+from app.schemas.requests import AskRequest, ReindexRequest, SummarizeRequest
+from app.schemas.responses import AgentResponse
+from app.utils.metrics import DEGRADATIONS, REGISTRY
+from app.utils.request_log import log_request
+from app.utils.trace import TraceRecord, annotate, current_trace, request_trace
+from app.utils.usage_ledger import BudgetExceeded, charge, get_usage_ledger
 
-class ToolOutputIssueSummary(BaseModel):
-    reported_issues: List[str] = Field(default_factory=list)
-    affected_components: List[str] = Field(default_factory=list)
-    severity: Literal["Low", "Medium", "High", "Critical", "Unknown"] = "Unknown"
-    notes: Optional[str] = None
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
 
 
-class AgentResponse(BaseModel):
-    request_id: str
-    timestamp: str
-    tool_selected: ToolName
-    reasoning: str
-    tool_output: Dict[str, Any]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build and pre-warm shared services before the server accepts traffic.
+    Under gunicorn with preload the master already built them before fork.
+    """
+    setup_logging()
+    container = preloaded_container() or build_container()
+    app.state.container = container
+    logger.info(
+        "Cold start: %.1f ms (imports + warm-up), warm-up %.1f ms",
+        (time.perf_counter() - _MODULE_T0) * 1000.0,
+        container.cold_start_ms,
+    )
+    yield
 
 
 # App
@@ -57,100 +54,236 @@ app = FastAPI(
         "Provides document Q&A (vector search + LLM) and issue summarization."
     ),
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
-# Dependency placeholders
-def route_tool(query: str) -> tuple[ToolName, str]:
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Bind a TraceRecord to each request; stages timed with app.utils.trace.span
+    (router, embedding, FAISS search, LLM) are reported in Server-Timing.
+    Upstream calls run at interactive priority unless the caller sends
+    `X-Request-Priority: batch`. Token usage is charged to the caller's
+    tenant and the tool that served the request.
+    """
+    priority = Priority.BATCH if request.headers.get("x-request-priority") == "batch" else Priority.INTERACTIVE
+    tenant = _tenant(request)
+    with request_trace() as record, request_priority(priority):
+        annotate(tenant=tenant)
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = record.request_id
+    response.headers["Server-Timing"] = record.server_timing()
+    tool = record.fields.get("tool")
+    charge(tenant, tool or "other", record.fields, requests=1 if tool else 0)
+    _log_request_summary(request, response.status_code, record)
+    return response
+
+
+def _tenant(request: Request) -> str:
     """
-    Minimal router (placeholder).
-    Replace with LLM router later (gpt-4o-mini) that outputs JSON:
-    { tool_selected: ..., reasoning: ... }
+    Tenant for usage accounting and budgets: the tenant API_KEY_TENANTS maps
+    the caller's X-API-Key to, else the shared "anonymous" tenant. Caller-sent
+    tenant names are not trusted.
     """
-    q = query.lower()
-    if any(k in q for k in ["summarize", "summary", "สรุป", "สรุปให้", "issue text"]):
-        return "issue_summary", "Detected summarization intent based on keywords."
-    return "internal_qa", "Defaulted to document Q&A intent for informational query."
+    key = request.headers.get("x-api-key")
+    if key:
+        for known, tenant in get_settings().API_KEY_TENANTS.items():
+            if hmac.compare_digest(key.encode("utf-8"), known.encode("utf-8")):
+                return tenant
+    return "anonymous"
 
 
-def internal_qa_tool(query: str, top_k: int) -> ToolOutputInternalQA:
+def _budget_downgrade(request: Request, *, can_downgrade: bool = True) -> bool:
     """
-    Placeholder for: FAISS vector search + LLM answer.
-    Replace with your retriever + gpt-4o-mini answerer.
+    True when the tenant is over its daily budget and the request should take
+    its cheap path; raises BudgetExceeded when it should be rejected.
     """
-    # Example placeholder answer
-    return ToolOutputInternalQA(
-        answer=f"(stub) Answer for: {query}",
-        citations=[
-            Citation(
-                source="ai_test_bug_report",
-                doc_id="bug_report_001",
-                chunk_id="c12",
-                snippet="(stub) relevant chunk snippet..."
-            )
-        ],
-        confidence="medium",
-    )
+    ledger = get_usage_ledger()
+    return ledger is not None and ledger.check(_tenant(request), can_downgrade=can_downgrade)
 
 
-def issue_summary_tool(issue_text: str) -> ToolOutputIssueSummary:
+def _log_request_summary(request: Request, status: int, record: TraceRecord) -> None:
+    """
+    One structured line per request: status, duration, stage timings and
+    the fields the request annotated (tool, token counts).
     """
-    Placeholder for: LLM summarization (gpt-4o-mini) to structured JSON.
+    level = logging.WARNING if status >= 500 else logging.INFO
+    if not access_logger.isEnabledFor(level):
+        return
+    fields = {
+        "method": request.method,
+        "path": request.url.path,
+        "status": status,
+        "duration_ms": round(record.duration_ms or 0.0, 1),
+        "stages_ms": {name: round(ms, 1) for name, ms in record.spans.items()},
+        **record.fields,
+    }
+    access_logger.log(level, "request", extra={"request_id": record.request_id, "fields": fields})
+
+
+@app.exception_handler(OverloadedError)
+async def overloaded(request: Request, exc: OverloadedError) -> JSONResponse:
     """
-    return ToolOutputIssueSummary(
-        reported_issues=["(stub) Issue 1", "(stub) Issue 2"],
-        affected_components=["(stub) Component A"],
-        severity="Unknown",
-        notes="Replace this stub with LLM summarization output.",
+    Shed load fast: 503 with Retry-After instead of queueing until timeout.
+    """
+    return JSONResponse(
+        {"detail": str(exc), "reason": exc.reason},
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
     )
 
 
+@app.exception_handler(BudgetExceeded)
+async def budget_exceeded(request: Request, exc: BudgetExceeded) -> JSONResponse:
+    return JSONResponse(
+        {"detail": str(exc), "tenant": exc.tenant, "spent_usd": round(exc.spent_usd, 8), "budget_usd": exc.budget_usd},
+        status_code=429,
+        headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
+    )
+
+
+def _request_id() -> str:
+    record = current_trace()
+    return record.request_id if record is not None else str(uuid.uuid4())
+
+
+def _container(request: Request) -> ServiceContainer:
+    return request.app.state.container
+
+
 # Routes
 @app.get("/health")
+@app.get("/health/live")
 def health() -> dict:
+    """
+    Liveness: the process is up and serving HTTP.
+    """
     return {"status": "ok"}
 
 
-@app.post("/ask", response_model=AgentResponse)
-def ask(payload: AskRequest) -> AgentResponse:
-    request_id = str(uuid.uuid4())
-    ts = datetime.now(timezone.utc).isoformat()
+@app.get("/health/ready")
+def ready(request: Request) -> JSONResponse:
+    """
+    Readiness: index loaded and clients warmed. 503 until then.
+    """
+    state = _container(request).readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 
+@app.post("/ask", response_model=AgentResponse)
+def ask(payload: AskRequest, request: Request) -> AgentResponse:
+    request_id = _request_id()
+    log_request("/ask", payload.model_dump(), request_id)
+    answer_mode, retrieval_mode = payload.answer_mode, payload.retrieval_mode
+    downgrade = _budget_downgrade(request)
+    if downgrade:
+        # Over budget: no routing or generation LLM calls, one query embedding.
+        answer_mode, retrieval_mode = "extractive", "single"
     try:
-        tool_selected, reasoning = route_tool(payload.query)
-        if tool_selected == "internal_qa":
-            tool_out = internal_qa_tool(payload.query, payload.top_k).model_dump()
-        else:
-            # If user hits /ask with a summarization query, we still handle gracefully.
-            tool_out = issue_summary_tool(payload.query).model_dump()
-
-        return AgentResponse(
+        response = _container(request).agent.run(
+            user_text=payload.query,
+            top_k=payload.top_k,
             request_id=request_id,
-            timestamp=ts,
-            tool_selected=tool_selected,
-            reasoning=reasoning,
-            tool_output=tool_out,
+            deadline_ms=payload.deadline_ms,
+            answer_mode=answer_mode,
+            expand_clusters=payload.expand_clusters,
+            retrieval_mode=retrieval_mode,
+            session_id=payload.session_id,
         )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=f"Index not available: {e}")
+    except OverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unhandled error: {e}")
+    if downgrade:
+        response.degradations.append("budget_extractive")
+        DEGRADATIONS.inc(kind="budget_extractive")
+    return response
 
 
 @app.post("/summarize", response_model=AgentResponse)
-def summarize(payload: SummarizeRequest) -> AgentResponse:
-    request_id = str(uuid.uuid4())
-    ts = datetime.now(timezone.utc).isoformat()
-
+def summarize(payload: SummarizeRequest, request: Request) -> AgentResponse:
+    request_id = _request_id()
+    log_request("/summarize", payload.model_dump(), request_id)
+    # Summaries have no LLM-free path: over budget is always a 429.
+    _budget_downgrade(request, can_downgrade=False)
     try:
-        tool_selected: ToolName = "issue_summary"
-        reasoning = "Explicit summarize endpoint."
-        tool_out = issue_summary_tool(payload.issue_text).model_dump()
-
-        return AgentResponse(
+        return _container(request).agent.run_issue_summary(
+            issue_text=payload.issue_text,
             request_id=request_id,
-            timestamp=ts,
-            tool_selected=tool_selected,
-            reasoning=reasoning,
-            tool_output=tool_out,
+            deadline_ms=payload.deadline_ms,
         )
+    except OverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unhandled error: {e}")
+
+
+def _require_admin(request: Request) -> None:
+    """
+    /admin/* requires X-Admin-Token; without ADMIN_TOKEN configured the
+    admin routes are disabled.
+    """
+    token = _container(request).settings.ADMIN_TOKEN
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode("utf-8"), token.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Admin token required (X-Admin-Token)")
+
+
+@app.post("/admin/reindex", status_code=202, dependencies=[Depends(_require_admin)])
+def start_reindex(payload: ReindexRequest) -> JSONResponse:
+    """
+    Rebuild the index in a background process; the new generation is swapped
+    in on success. 409 while another reindex is running.
+    """
+    from app.ingestion.jobs import ReindexConflict, start_reindex as start_job
+
+    try:
+        return JSONResponse(start_job(payload.model_dump()), status_code=202)
+    except ReindexConflict as e:
+        return JSONResponse({"detail": str(e), "job_id": e.job_id}, status_code=409)
+
+
+@app.get("/admin/reindex/{job_id}", dependencies=[Depends(_require_admin)])
+def reindex_status(job_id: str) -> JSONResponse:
+    """
+    Job status with per-stage progress (files parsed, chunks embedded,
+    throughput, ETA).
+    """
+    from app.ingestion.jobs import get_job
+
+    status = get_job(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown reindex job: {job_id}")
+    return JSONResponse(status)
+
+
+@app.post("/admin/reindex/{job_id}/cancel", status_code=202, dependencies=[Depends(_require_admin)])
+def cancel_reindex(job_id: str) -> JSONResponse:
+    from app.ingestion.jobs import cancel_job
+
+    status = cancel_job(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown reindex job: {job_id}")
+    return JSONResponse(status, status_code=202)
+
+
+@app.get("/admin/usage", dependencies=[Depends(_require_admin)])
+def usage(day: Optional[str] = Query(default=None, pattern=r"^\d{4}-\d{2}-\d{2}$")) -> JSONResponse:
+    """
+    Token and cost rollup of one UTC day (default today) per tenant and tool,
+    across workers.
+    """
+    ledger = get_usage_ledger()
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="Usage accounting is disabled (USAGE_ENABLED=0)")
+    ledger.flush()
+    return JSONResponse(ledger.rollup(day))
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.retriever.sharded import ShardedFAISS, search_matrix
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+
+    from app.retriever.faiss_store import VectorStore
+
+# Query rows per index.search call: bounds the (rows, k) result buffers and
+# the per-call latency while keeping FAISS's batched BLAS path.
+BATCH_ROWS = 4096
+# Texts per embeddings request in search_texts.
+EMBED_BATCH = 256
+
+
+@dataclass(frozen=True)
+class BatchSearchResult:
+    """
+    Result of BatchSearcher.search for n queries.
+
+    ids: (n, k) int64 searcher-wide ids (-1 where fewer than k hits).
+    distances: (n, k) float32 squared L2 distances, ascending per row.
+    Documents are only built on request (documents / hits).
+    """
+    ids: np.ndarray
+    distances: np.ndarray
+    searcher: "BatchSearcher"
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def similarities(self) -> np.ndarray:
+        """
+        Cosine similarities for unit-length embeddings (rerank.faiss_distance_to_similarity).
+        """
+        return np.clip(1.0 - self.distances / 2.0, -1.0, 1.0)
+
+    def documents(self, row: int) -> List[Document]:
+        return [self.searcher.document(int(i)) for i in self.ids[row] if i >= 0]
+
+    def hits(self, row: int) -> List[tuple]:
+        """
+        [(Document, distance)] for one query, like similarity_search_with_score_by_vector.
+        """
+        return [
+            (self.searcher.document(int(i)), float(d)) for i, d in zip(self.ids[row], self.distances[row]) if i >= 0
+        ]
+
+
+class BatchSearcher:
+    """
+    Vectorised search over a loaded index (single or sharded) for
+    evaluation and batch jobs.
+
+    A matrix of query vectors goes to FAISS in one `index.search` call per
+    BATCH_ROWS rows (per shard), and results come back as NumPy arrays of
+    ids and distances. Ids are positions in the index, offset per shard, so
+    looking a document up costs a dict access only when it is asked for.
+
+    The searcher holds the index object it was created with; create a new
+    one after the index is reloaded.
+    """
+
+    def __init__(self, vectorstore: VectorStore, *, sources: Optional[Iterable[str]] = None):
+        if isinstance(vectorstore, ShardedFAISS):
+            self.stores: List[FAISS] = vectorstore._selected(sources)
+        else:
+            self.stores = [vectorstore]
+        sizes = [s.index.ntotal for s in self.stores]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.offsets[-1])
+
+    def search(self, vectors: Any, k: int, *, batch_rows: int = BATCH_ROWS) -> BatchSearchResult:
+        """
+        Top k per query row of `vectors` ((n, d) array or list of lists).
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError(f"Expected a (n, d) matrix of query vectors, got shape {matrix.shape}")
+        n = len(matrix)
+        ids = np.full((n, k), -1, dtype=np.int64)
+        distances = np.full((n, k), np.inf, dtype=np.float32)
+        for start in range(0, n, batch_rows):
+            rows = slice(start, min(start + batch_rows, n))
+            ids[rows], distances[rows] = self._search_rows(matrix[rows], k)
+        return BatchSearchResult(ids=ids, distances=distances, searcher=self)
+
+    def _search_rows(self, matrix: np.ndarray, k: int):
+        n = len(matrix)
+        parts_d, parts_i = [], []
+        for store, offset in zip(self.stores, self.offsets[:-1]):
+            d, i = search_matrix(store, matrix, k)
+            parts_d.append(d)
+            parts_i.append(np.where(i >= 0, i + offset, -1))
+        if not parts_d:
+            return np.full((n, k), -1, dtype=np.int64), np.full((n, k), np.inf, dtype=np.float32)
+
+        d = np.concatenate(parts_d, axis=1)
+        i = np.concatenate(parts_i, axis=1)
+        d = np.where(i >= 0, d, np.inf).astype(np.float32)
+        if len(parts_d) > 1:
+            # Merge shards: k smallest of the concatenated per-shard top k.
+            top = np.argsort(d, axis=1, kind="stable")[:, :k]
+            d = np.take_along_axis(d, top, axis=1)
+            i = np.take_along_axis(i, top, axis=1)
+        if d.shape[1] < k:
+            pad = k - d.shape[1]
+            d = np.pad(d, ((0, 0), (0, pad)), constant_values=np.inf)
+            i = np.pad(i, ((0, 0), (0, pad)), constant_values=-1)
+        return i, d
+
+    def search_texts(
+        self, texts: Sequence[str], k: int, embeddings: Embeddings, *, embed_batch: int = EMBED_BATCH
+    ) -> BatchSearchResult:
+        """
+        Embed `texts` (embed_batch per request) and search them.
+        """
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), embed_batch):
+            vectors.extend(embeddings.embed_documents(list(texts[start : start + embed_batch])))
+        return self.search(vectors, k)
+
+    def document(self, id_: int) -> Document:
+        """
+        Document for a searcher-wide id.
+        """
+        shard = int(np.searchsorted(self.offsets, id_, side="right")) - 1
+        if id_ < 0 or shard >= len(self.stores):
+            raise IndexError(f"No document with id {id_}")
+        store = self.stores[shard]
+        return store.docstore.search(store.index_to_docstore_id[id_ - int(self.offsets[shard])])
+
+    def metadata(self, ids: np.ndarray, key: str) -> np.ndarray:
+        """
+        Object array of one metadata field for an array of ids (None for -1),
+        e.g. metadata(result.ids, "chunk_id") for evaluation.
+        """
+        flat = [
+            (self.document(int(i)).metadata or {}).get(key) if i >= 0 else None for i in np.asarray(ids).ravel()
+        ]
+        return np.array(flat, dtype=object).reshape(np.shape(ids))
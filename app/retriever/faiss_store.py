@@ -1,12 +1,34 @@
 from __future__ import annotations
 
+import json
+import logging
+import threading
+import time
 from pathlib import Path
-from typing import Optional
-
-from langchain_community.vectorstores import FAISS
-from langchain_core.embeddings import Embeddings
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
 
 from app.core.config import get_settings
+from app.retriever.sharded import SHARDS_DIRNAME, ShardedFAISS
+from app.utils.metrics import INDEX_FRESHNESS
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+
+    from app.retriever.quantization import VectorFormat
+
+    VectorStore = Union[FAISS, ShardedFAISS]
+
+
+logger = logging.getLogger(__name__)
+
+# Process-wide cache of loaded indexes: resolved index_dir -> (vectorstore, generation id)
+_cache: Dict[str, Tuple[VectorStore, Optional[str]]] = {}
+_cache_lock = threading.Lock()
+
+# Generation watch: last manifest check (monotonic) and background reloads in flight, per index_dir
+_last_check: Dict[str, float] = {}
+_reloading: Set[str] = set()
 
 
 class FAISSStore:
@@ -15,21 +37,55 @@ class FAISSStore:
     Expects the index to be built via app/ingestion/build_index.py (save_local()).
     """
 
-    def __init__(self, index_dir: Optional[Path] = None):
+    def __init__(self, index_dir: Optional[Path] = None, manifest_path: Optional[Path] = None):
         s = get_settings()
         self.index_dir: Path = index_dir or s.FAISS_INDEX_DIR
+        self.manifest_path: Path = manifest_path or (s.STORAGE_DIR / "manifest.json")
 
     def exists(self) -> bool:
         """
         FAISS save_local produces files like:
           - index.faiss
           - index.pkl
+        Sharded builds have one such pair per shard under shards/<name>/.
         """
+        shards = self.shards()
+        if shards:
+            root = self.index_dir / SHARDS_DIRNAME
+            return all((root / s["name"] / "index.faiss").exists() for s in shards)
         return (self.index_dir / "index.faiss").exists() and (self.index_dir / "index.pkl").exists()
 
-    def load(self, embeddings: Embeddings) -> FAISS:
+    def read_manifest(self) -> Dict:
+        if not self.manifest_path.exists():
+            return {}
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+    def generation_id(self) -> Optional[str]:
+        """
+        Identifier of the index build currently on disk (from manifest.json).
+        Older manifests without generation_id fall back to built_at_utc.
+        """
+        manifest = self.read_manifest()
+        return manifest.get("generation_id") or manifest.get("built_at_utc")
+
+    def vector_format(self) -> VectorFormat:
+        """
+        Storage format of the index on disk (dtype / truncated dimensions).
+        """
+        from app.retriever.quantization import VectorFormat
+
+        return VectorFormat.from_manifest(self.read_manifest())
+
+    def shards(self) -> List[Dict[str, Any]]:
+        """
+        Shards of a sharded build (name, source, chunks); empty for a single index.
         """
-        Load the FAISS index from disk.
+        return (self.read_manifest().get("sharding") or {}).get("shards") or []
+
+    def load(self, embeddings: Embeddings) -> VectorStore:
+        """
+        Load the FAISS index from disk (a ShardedFAISS for sharded builds).
+        Indexes built with truncated dimensions truncate query vectors the same way.
         NOTE: allow_dangerous_deserialization=True is required due to pickle usage in FAISS docstore.
         Only use with trusted local files you created.
         """
@@ -39,8 +95,102 @@ class FAISSStore:
                 f"Build it first: python -m app.ingestion.build_index"
             )
 
-        return FAISS.load_local(
-            folder_path=str(self.index_dir),
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True,
-        )
+        from app.retriever.quantization import load_vectorstore
+
+        shards = self.shards()
+        if shards:
+            return ShardedFAISS.load_local(
+                str(self.index_dir),
+                embeddings,
+                shards,
+                self.vector_format(),
+                max_workers=get_settings().SHARD_SEARCH_THREADS,
+            )
+        return load_vectorstore(str(self.index_dir), embeddings, self.vector_format())
+
+    def load_cached(self, embeddings: Embeddings) -> VectorStore:
+        """
+        Load once per process and reuse across requests.
+
+        A rebuilt index (new generation in manifest.json, e.g. from a reindex
+        job) is noticed within INDEX_RELOAD_CHECK_S and loaded on a background
+        thread; requests keep using the current copy until it is swapped in.
+        """
+        key = str(self.index_dir.resolve())
+        cached = _cache.get(key)
+        if cached is not None:
+            self._watch_generation(key, cached[1], embeddings)
+            return cached[0]
+
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is None:
+                generation = self.generation_id()
+                cached = (self.load(embeddings), generation)
+                _cache[key] = cached
+        return cached[0]
+
+    def _watch_generation(self, key: str, loaded: Optional[str], embeddings: Embeddings) -> None:
+        interval = get_settings().INDEX_RELOAD_CHECK_S
+        now = time.monotonic()
+        if interval <= 0 or now - _last_check.get(key, 0.0) < interval:
+            return
+        _last_check[key] = now
+        try:
+            current = self.generation_id()
+        except (OSError, ValueError):
+            return  # manifest being replaced; next check
+        if current is None or current == loaded:
+            return
+        with _cache_lock:
+            if key in _reloading:
+                return
+            _reloading.add(key)
+
+        def _reload() -> None:
+            try:
+                self.reload(embeddings)
+                logger.info("Index generation %s -> %s loaded from %s", loaded, current, key)
+                self._observe_freshness(current)
+            except Exception as e:  # keep serving the old generation
+                logger.warning("Reloading index %s failed: %s", key, e)
+            finally:
+                with _cache_lock:
+                    _reloading.discard(key)
+
+        threading.Thread(target=_reload, name="index-reload", daemon=True).start()
+
+    def _observe_freshness(self, generation: Optional[str]) -> None:
+        """
+        For generations published by the directory watcher: time from each
+        changed file's write to it being searchable here.
+        """
+        manifest = self.read_manifest()
+        last = (manifest.get("incremental") or {}).get("last")
+        if not last or manifest.get("generation_id") != generation:
+            return
+        now = time.time()
+        for changed_at in (last.get("changed_at_ts") or {}).values():
+            INDEX_FRESHNESS.observe(max(0.0, now - changed_at))
+
+    def reload(self, embeddings: Embeddings) -> VectorStore:
+        """
+        Load the index from disk and atomically replace the cached copy.
+        In-flight requests keep using the previous object.
+        """
+        key = str(self.index_dir.resolve())
+        generation = self.generation_id()
+        fresh = (self.load(embeddings), generation)
+        with _cache_lock:
+            _cache[key] = fresh
+        return fresh[0]
+
+    def cached_generation_id(self) -> Optional[str]:
+        """
+        Generation id of the index loaded in this process (None if not loaded).
+        """
+        cached = _cache.get(str(self.index_dir.resolve()))
+        return cached[1] if cached is not None else None
+
+    def is_loaded(self) -> bool:
+        return str(self.index_dir.resolve()) in _cache
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+# FAISS scalar quantizer per stored dtype (float32 keeps the exact IndexFlatL2).
+_QUANTIZERS = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,  # per-dimension min/max, trained on the corpus
+}
+
+
+@dataclass(frozen=True)
+class VectorFormat:
+    """
+    How index vectors are stored.
+
+    dimensions: keep the leading N components and re-normalise (Matryoshka
+    truncation; text-embedding-3-* are trained for it, and this is what the
+    API's `dimensions` parameter does server-side). None = full vectors.
+    dtype: float32 (exact), float16 or int8 scalar quantization.
+    """
+    dtype: str = "float32"
+    dimensions: Optional[int] = None
+
+    def __post_init__(self):
+        if self.dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype '{self.dtype}' (expected one of {VECTOR_DTYPES})")
+        if self.dimensions is not None and self.dimensions < 1:
+            raise ValueError("dimensions must be >= 1")
+
+    @property
+    def is_default(self) -> bool:
+        return self.dtype == "float32" and self.dimensions is None
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict[str, Any]) -> "VectorFormat":
+        """
+        Older manifests (no "vectors" entry) describe full float32 indexes.
+        """
+        raw = manifest.get("vectors") or {}
+        return cls(dtype=raw.get("dtype", "float32"), dimensions=raw.get("dimensions"))
+
+    def to_manifest(self, indexes: Sequence[faiss.Index] = ()) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"dtype": self.dtype, "dimensions": self.dimensions}
+        if indexes:
+            out["stored_dimensions"] = indexes[0].d
+            out["index_bytes"] = sum(index_bytes(index) for index in indexes)
+        return out
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Apply the truncation to a (n, d) float32 batch; quantization happens
+        inside the index.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dimensions is None or self.dimensions >= vectors.shape[1]:
+            return vectors
+        out = np.ascontiguousarray(vectors[:, : self.dimensions])
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        return out / norms
+
+    def make_index(self, vectors: np.ndarray) -> faiss.Index:
+        """
+        Empty L2 index for `vectors` (already transformed), trained if the
+        quantizer needs it.
+        """
+        d = vectors.shape[1]
+        if self.dtype == "float32":
+            return faiss.IndexFlatL2(d)
+        index = faiss.IndexScalarQuantizer(d, _QUANTIZERS[self.dtype], faiss.METRIC_L2)
+        if not index.is_trained:
+            index.train(vectors)
+        return index
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """
+    Serialized (and, for flat/SQ indexes, in-memory) size of the vectors.
+    """
+    return int(faiss.serialize_index(index).nbytes)
+
+
+class TruncatedFAISS(FAISS):
+    """
+    FAISS store over truncated vectors: full-size query vectors from the
+    embeddings client are cut down to the index format before searching.
+    """
+
+    vector_format: VectorFormat = VectorFormat()
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Any = None, fetch_k: int = 20, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        vector = self.vector_format.transform(np.asarray([embedding], dtype=np.float32))[0]
+        return super().similarity_search_with_score_by_vector(
+            vector.tolist(), k=k, filter=filter, fetch_k=fetch_k, **kwargs
+        )
+
+
+def build_vectorstore(documents: Sequence[Document], embeddings: Embeddings, fmt: VectorFormat) -> FAISS:
+    """
+    FAISS.from_documents, with vectors stored in `fmt`.
+    """
+    if fmt.is_default:
+        return FAISS.from_documents(list(documents), embeddings)
+
+    texts = [d.page_content for d in documents]
+    vectors = fmt.transform(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+    cls = TruncatedFAISS if fmt.dimensions is not None else FAISS
+    store = cls(
+        embedding_function=embeddings,
+        index=fmt.make_index(vectors),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    if isinstance(store, TruncatedFAISS):
+        store.vector_format = fmt
+    store.add_embeddings(zip(texts, vectors.tolist()), metadatas=[dict(d.metadata or {}) for d in documents])
+    return store
+
+
+def add_documents(store: FAISS, documents: Sequence[Document], embeddings: Embeddings, fmt: VectorFormat) -> List[str]:
+    """
+    Embed and append `documents` to an existing store in its format
+    (quantized indexes keep the ranges they were trained on). Returns the
+    new docstore ids.
+    """
+    texts = [d.page_content for d in documents]
+    if not texts:
+        return []
+    vectors = fmt.transform(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+    return store.add_embeddings(zip(texts, vectors.tolist()), metadatas=[dict(d.metadata or {}) for d in documents])
+
+
+def load_vectorstore(folder_path: str, embeddings: Embeddings, fmt: VectorFormat) -> FAISS:
+    """
+    FAISS.load_local for an index written in `fmt` (read from the manifest).
+    """
+    cls = TruncatedFAISS if fmt.dimensions is not None else FAISS
+    store = cls.load_local(folder_path=folder_path, embeddings=embeddings, allow_dangerous_deserialization=True)
+    if isinstance(store, TruncatedFAISS):
+        store.vector_format = fmt
+    return store
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import Dict, List, Tuple
+
+from app.retriever.rerank import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Share of the remaining deadline an LLM expansion may use before falling
+# back to the local one.
+EXPANSION_BUDGET_FRACTION = 0.2
+
+# Everyday wording -> the product / bug-report vocabulary the corpora use.
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "bug": ("issue", "problem"),
+    "broken": ("not working", "failing"),
+    "fail": ("failing", "fails"),
+    "fails": ("failing", "not working"),
+    "crash": ("crashing", "crashes"),
+    "crashes": ("crashing", "freeze"),
+    "freeze": ("freezes", "unresponsive"),
+    "hang": ("stuck", "never completes"),
+    "hangs": ("stuck", "never completes"),
+    "stuck": ("never completes", "hangs"),
+    "slow": ("loading times", "performance"),
+    "wrong": ("incorrect", "not correct"),
+    "missing": ("not displaying", "not appearing"),
+    "email": ("email notifications",),
+    "emails": ("email notifications",),
+    "alerts": ("push notifications",),
+    "picture": ("image",),
+    "pictures": ("images",),
+    "phone": ("mobile",),
+    "tablet": ("mobile",),
+    "login": ("sign in", "password"),
+    "delete": ("deletion",),
+    "remove": ("deletion",),
+    "db": ("database",),
+    "sync": ("syncing", "real-time collaboration"),
+    "install": ("installation",),
+    "rotate": ("orientation",),
+    "docs": ("documents",),
+    "files": ("documents",),
+    "share": ("sharing",),
+    "page": ("pagination",),
+    "pages": ("pagination",),
+    "upload": ("uploading",),
+    "contrast": ("color contrast", "accessibility"),
+}
+
+
+def _dedup(queries: List[str], count: int) -> List[str]:
+    seen = set()
+    out: List[str] = []
+    for q in queries:
+        q = " ".join(q.split())
+        key = q.lower()
+        if q and key not in seen:
+            seen.add(key)
+            out.append(q)
+        if len(out) >= count:
+            break
+    return out
+
+
+def expand_local(question: str, count: int) -> List[str]:
+    """
+    Up to `count` queries: the question, its wording mapped to corpus
+    vocabulary (SYNONYMS), its keywords with every synonym, and a record-shaped
+    template ("Title: ... Description: ..."). No network.
+    """
+    words = re.findall(r"\w+|\W+", question)
+    substituted = "".join(SYNONYMS[w.lower()][0] if w.lower() in SYNONYMS else w for w in words)
+    keywords = tokenize(question)
+    expanded = []
+    for w in keywords:
+        expanded.append(w)
+        expanded.extend(SYNONYMS.get(w, ()))
+    candidates = [
+        question,
+        substituted,
+        " ".join(expanded),
+        f"Title: {' '.join(keywords)}\nDescription: {substituted}",
+    ]
+    return _dedup(candidates, count)
+
+
+def _llm_text(prompt: str, **values: str) -> str:
+    from app.agent.prompt_builder import build_messages
+    from app.core.config import get_settings
+    from app.core.limiter import upstream_slot
+    from app.core.llm import get_chat_llm
+    from app.utils.llm_usage import record_usage
+    from app.utils.trace import span
+
+    s = get_settings()
+    llm = get_chat_llm(s.chat_model(s.QUERY_EXPANSION_TIER))
+    with upstream_slot("chat"), span(f"retrieval.{prompt}"):
+        msg = llm.invoke(build_messages(prompt, **values))
+    record_usage(prompt, msg)
+    return msg.content.strip()
+
+
+def expand_llm(question: str, count: int) -> List[str]:
+    """
+    The question plus up to count-1 LLM rephrasings.
+    """
+    from app.utils.json_guard import parse_json_object
+
+    data = parse_json_object(_llm_text("query_expansion", count=str(count - 1), question=question.strip()))
+    rewrites = [q for q in data.get("queries") or [] if isinstance(q, str)]
+    if not rewrites:
+        raise ValueError("Query expansion returned no queries.")
+    return _dedup([question, *rewrites], count)
+
+
+def expand_hyde(question: str) -> List[str]:
+    """
+    The question plus a hypothetical record answering it (HyDE): the record
+    is phrased like the indexed bug reports, so it lands near them.
+    """
+    passage = _llm_text("hyde", question=question.strip())
+    if not passage:
+        raise ValueError("HyDE returned an empty passage.")
+    return _dedup([question, passage], 2)
+
+
+def expand_queries(question: str, mode: str, count: int) -> List[str]:
+    """
+    Queries to embed for a retrieval mode. LLM modes run within their share
+    of the request deadline and fall back to the local expansion (noted as
+    the `local_query_expansion` degradation) on timeout, overload or an
+    unusable response.
+    """
+    if mode == "single":
+        return [question]
+    if mode == "multi_query":
+        return expand_local(question, count)
+
+    from app.core.deadline import DeadlineExceeded, note_degradation, run_within, stage_budget
+    from app.core.limiter import OverloadedError
+
+    def _expand() -> List[str]:
+        return expand_hyde(question) if mode == "hyde" else expand_llm(question, count)
+
+    try:
+        return run_within(_expand, stage_budget(fraction=EXPANSION_BUDGET_FRACTION), stage=f"retrieval.{mode}")
+    except (DeadlineExceeded, OverloadedError, ValueError) as e:
+        logger.info("Query expansion (%s) fell back to local: %s", mode, e)
+        note_degradation("local_query_expansion")
+        return expand_local(question, count)
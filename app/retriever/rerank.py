@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import math
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Protocol, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+ScoreKind = Literal["similarity", "relevance"]
+Confidence = Literal["low", "medium", "high"]
+
+_TOKEN_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+# Small English stopword list; enough to stop "the"/"is" from dominating overlap.
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be but by can do does for from has have how i in is it its
+    me my of on or our so that the their them they this to was we were what when
+    where which who why will with you your
+    """.split()
+)
+
+# Confidence thresholds per score scale (top score, runner-up score).
+_CONFIDENCE_THRESHOLDS = {
+    # cosine similarity derived from FAISS L2 distance on unit vectors
+    "similarity": {"high": (0.55, 0.45), "medium": 0.35},
+    # reranker relevance in [0, 1]
+    "relevance": {"high": (0.6, 0.4), "medium": 0.3},
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens without stopwords.
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class Scorer(Protocol):
+    name: str
+    # Texts scored per call; None means all candidates in one call.
+    batch_size: Optional[int]
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        """
+        Return one relevance score in [0, 1] per text (higher is better).
+        """
+        ...
+
+
+class LexicalOverlapScorer:
+    """
+    Cheap BM25-style overlap scorer.
+
+    IDF is computed over the candidate set itself, so no corpus statistics are
+    needed at query time. Scores are normalised by the total query IDF mass,
+    which keeps them in [0, 1] and comparable across queries.
+    """
+
+    name = "lexical"
+    batch_size = None
+
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        q_terms = set(tokenize(query))
+        if not q_terms or not texts:
+            return [0.0] * len(texts)
+
+        docs = [Counter(tokenize(t)) for t in texts]
+        n = len(docs)
+        avg_len = (sum(sum(d.values()) for d in docs) / n) or 1.0
+
+        idf = {}
+        for term in q_terms:
+            df = sum(1 for d in docs if term in d)
+            idf[term] = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        total_idf = sum(idf.values()) or 1.0
+
+        scores: List[float] = []
+        for d in docs:
+            length_norm = 1.0 - self.b + self.b * (sum(d.values()) / avg_len)
+            s = 0.0
+            for term in q_terms:
+                tf = d.get(term, 0)
+                if tf:
+                    # Saturating tf in [0, 1)
+                    s += idf[term] * tf / (tf + self.k1 * length_norm)
+            scores.append(s / total_idf)
+        return scores
+
+
+class CrossEncoderScorer:
+    """
+    CPU-only local cross-encoder (sentence-transformers).
+
+    Optional dependency: pip install sentence-transformers
+    Logits are squashed with a sigmoid to land in [0, 1].
+    """
+
+    name = "cross_encoder"
+    batch_size = 8
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = _load_cross_encoder(model_name)
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        if not texts:
+            return []
+        logits = self._model.predict([(query, t) for t in texts], show_progress_bar=False)
+        return [1.0 / (1.0 + math.exp(-float(x))) for x in logits]
+
+
+@lru_cache(maxsize=4)
+def _load_cross_encoder(model_name: str):
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError as e:
+        raise RuntimeError(
+            "RERANK_SCORER=cross_encoder requires sentence-transformers. "
+            "Install it or use RERANK_SCORER=lexical."
+        ) from e
+    return CrossEncoder(model_name, device="cpu")
+
+
+def get_scorer(name: str, *, model_name: Optional[str] = None) -> Scorer:
+    """
+    Scorer factory. Cross-encoder models are cached per process.
+    """
+    if name == "lexical":
+        return LexicalOverlapScorer()
+    if name == "cross_encoder":
+        if not model_name:
+            raise ValueError("cross_encoder scorer requires a model name.")
+        return CrossEncoderScorer(model_name)
+    raise ValueError(f"Unknown rerank scorer: {name}")
+
+
+def faiss_distance_to_similarity(distance: float) -> float:
+    """
+    LangChain's FAISS store returns squared L2 distances. For unit-length
+    embeddings (OpenAI embeddings are normalised) cosine = 1 - d / 2.
+    """
+    return max(-1.0, min(1.0, 1.0 - float(distance) / 2.0))
+
+
+@dataclass
+class RerankResult:
+    documents: List[Document]
+    scores: List[float]
+    score_kind: ScoreKind
+    reranked: bool = False
+    fallback_reason: Optional[str] = None
+    elapsed_ms: float = 0.0
+    candidates: int = 0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def faiss_order(
+    candidates: Sequence[Tuple[Document, float]],
+    *,
+    top_k: int,
+    fallback_reason: Optional[str] = None,
+    elapsed_ms: float = 0.0,
+) -> RerankResult:
+    """
+    Keep FAISS order; scores are converted to cosine similarity.
+    """
+    kept = list(candidates[:top_k])
+    return RerankResult(
+        documents=[d for d, _ in kept],
+        scores=[faiss_distance_to_similarity(dist) for _, dist in kept],
+        score_kind="similarity",
+        reranked=False,
+        fallback_reason=fallback_reason,
+        elapsed_ms=elapsed_ms,
+        candidates=len(candidates),
+    )
+
+
+def rerank(
+    query: str,
+    candidates: Sequence[Tuple[Document, float]],
+    *,
+    top_k: int,
+    scorer: Optional[Scorer],
+    budget_ms: float,
+    min_score: float = 0.0,
+) -> RerankResult:
+    """
+    Re-score FAISS candidates and return the best top_k.
+
+    Scoring runs in scorer-sized batches and checks the time budget between batches.
+    If the budget is exceeded (or the scorer fails), FAISS order is returned
+    unchanged so the request never waits on the re-ranker.
+
+    min_score drops weak candidates after re-ranking (at least one is kept).
+    """
+    t0 = time.perf_counter()
+
+    def _elapsed_ms() -> float:
+        return (time.perf_counter() - t0) * 1000.0
+
+    if scorer is None or len(candidates) <= 1:
+        return faiss_order(candidates, top_k=top_k, fallback_reason="disabled")
+
+    texts = [d.page_content for d, _ in candidates]
+    batch_size = scorer.batch_size or len(texts)
+    scores: List[float] = []
+    try:
+        for start in range(0, len(texts), batch_size):
+            if _elapsed_ms() > budget_ms:
+                return faiss_order(
+                    candidates, top_k=top_k, fallback_reason="budget_exceeded", elapsed_ms=_elapsed_ms()
+                )
+            scores.extend(scorer.score(query, texts[start : start + batch_size]))
+    except Exception as e:
+        return faiss_order(
+            candidates, top_k=top_k, fallback_reason=f"scorer_error: {e}", elapsed_ms=_elapsed_ms()
+        )
+
+    if _elapsed_ms() > budget_ms:
+        return faiss_order(
+            candidates, top_k=top_k, fallback_reason="budget_exceeded", elapsed_ms=_elapsed_ms()
+        )
+
+    # Stable sort: ties keep FAISS order.
+    order = sorted(range(len(candidates)), key=lambda i: -scores[i])[:top_k]
+    kept = [i for i in order if scores[i] >= min_score] or order[:1]
+
+    return RerankResult(
+        documents=[candidates[i][0] for i in kept],
+        scores=[scores[i] for i in kept],
+        score_kind="relevance",
+        reranked=True,
+        elapsed_ms=_elapsed_ms(),
+        candidates=len(candidates),
+        metadata={"scorer": scorer.name},
+    )
+
+
+def confidence_from_scores(scores: Sequence[float], kind: ScoreKind) -> Confidence:
+    """
+    Map retrieval scores to a coarse confidence level.
+
+    high:   strong top hit backed by a second good hit
+    medium: top hit above the medium threshold
+    low:    nothing retrieved or only weak matches
+    """
+    if not scores:
+        return "low"
+
+    th = _CONFIDENCE_THRESHOLDS[kind]
+    ranked = sorted(scores, reverse=True)
+    top = ranked[0]
+    runner_up = ranked[1] if len(ranked) > 1 else 0.0
+
+    high_top, high_second = th["high"]
+    if top >= high_top and runner_up >= high_second:
+        return "high"
+    if top >= th["medium"]:
+        return "medium"
+    return "low"
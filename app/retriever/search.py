@@ -1,9 +1,15 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
 
-from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
+from app.retriever.sharded import ShardedFAISS, batch_search
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+    from app.retriever.faiss_store import VectorStore
 
 
 def _metadata_matches(doc: Document, filters: Dict[str, Any]) -> bool:
@@ -14,8 +20,17 @@ def _metadata_matches(doc: Document, filters: Dict[str, Any]) -> bool:
     return True
 
 
+def _shard_scope(vectorstore: VectorStore, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sharded stores skip shards of other corpora when filtering on `source`.
+    """
+    if isinstance(vectorstore, ShardedFAISS) and "source" in filters:
+        return {"sources": [filters["source"]]}
+    return {}
+
+
 def similarity_search(
-    vectorstore: FAISS,
+    vectorstore: VectorStore,
     query: str,
     *,
     top_k: int = 5,
@@ -36,7 +51,7 @@ def similarity_search(
     fetch_k = max(top_k * 4, top_k)
 
     # Grab candidates
-    candidates = vectorstore.similarity_search(query, k=fetch_k)
+    candidates = vectorstore.similarity_search(query, k=fetch_k, **_shard_scope(vectorstore, filters))
 
     if not filters:
         return candidates[:top_k]
@@ -52,7 +67,7 @@ def similarity_search(
 
 
 def similarity_search_with_scores(
-    vectorstore: FAISS,
+    vectorstore: VectorStore,
     query: str,
     *,
     top_k: int = 5,
@@ -70,8 +85,83 @@ def similarity_search_with_scores(
     filters = filters or {}
     fetch_k = max(top_k * 4, top_k)
 
-    candidates = vectorstore.similarity_search_with_score(query, k=fetch_k)
+    candidates = vectorstore.similarity_search_with_score(query, k=fetch_k, **_shard_scope(vectorstore, filters))
+    return _filter_scored(candidates, top_k=top_k, filters=filters)
+
+
+def similarity_search_with_scores_by_vector(
+    vectorstore: VectorStore,
+    embedding: List[float],
+    *,
+    top_k: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Same as similarity_search_with_scores, for an already embedded query.
+    Lets callers time/cache the embedding call separately from the FAISS search.
+    """
+    filters = filters or {}
+    fetch_k = max(top_k * 4, top_k)
+
+    candidates = vectorstore.similarity_search_with_score_by_vector(
+        embedding, k=fetch_k, **_shard_scope(vectorstore, filters)
+    )
+    return _filter_scored(candidates, top_k=top_k, filters=filters)
+
+
+def similarity_search_with_scores_by_vectors(
+    vectorstore: VectorStore,
+    embeddings: List[List[float]],
+    *,
+    top_k: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[List[Tuple[Document, float]]]:
+    """
+    similarity_search_with_scores_by_vector for several query vectors at
+    once: a single batched FAISS search (per shard) on the query matrix.
+    """
+    filters = filters or {}
+    fetch_k = max(top_k * 4, top_k)
+
+    if isinstance(vectorstore, ShardedFAISS):
+        rows = vectorstore.similarity_search_with_score_by_vectors(
+            embeddings, k=fetch_k, **_shard_scope(vectorstore, filters)
+        )
+    else:
+        rows = batch_search(vectorstore, embeddings, fetch_k)
+    return [_filter_scored(candidates, top_k=top_k, filters=filters) for candidates in rows]
 
+
+# Reciprocal rank fusion constant (Cormack et al.); damps the weight of top ranks.
+RRF_K = 60
+
+
+def fuse_rankings(rankings: List[List[Tuple[Document, float]]], *, top_k: int) -> List[Tuple[Document, float]]:
+    """
+    Reciprocal rank fusion of per-query results. Each fused document keeps
+    its best (smallest) distance, so callers can still turn it into a
+    similarity; the order is by fused rank.
+    """
+    fused: Dict[Any, List[Any]] = {}
+    for hits in rankings:
+        for rank, (doc, dist) in enumerate(hits):
+            key = (doc.metadata or {}).get("chunk_id") or doc.page_content
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [1.0 / (RRF_K + rank + 1), dist, doc]
+            else:
+                entry[0] += 1.0 / (RRF_K + rank + 1)
+                entry[1] = min(entry[1], dist)
+    ordered = sorted(fused.values(), key=lambda e: (-e[0], e[1]))
+    return [(doc, dist) for _, dist, doc in ordered[:top_k]]
+
+
+def _filter_scored(
+    candidates: List[Tuple[Document, float]],
+    *,
+    top_k: int,
+    filters: Dict[str, Any],
+) -> List[Tuple[Document, float]]:
     if not filters:
         return candidates[:top_k]
 
@@ -83,3 +173,37 @@ def similarity_search_with_scores(
             break
 
     return filtered
+
+
+# chunk_id -> Document per loaded index object; a reload is a new object, so
+# a stale map is never consulted and goes away with the old index.
+_chunk_maps: "weakref.WeakKeyDictionary[Any, Dict[str, Document]]" = weakref.WeakKeyDictionary()
+_chunk_maps_lock = threading.Lock()
+
+
+def _chunk_map(vectorstore: VectorStore) -> Dict[str, Document]:
+    with _chunk_maps_lock:
+        mapping = _chunk_maps.get(vectorstore)
+        if mapping is None:
+            shards = vectorstore.shards.values() if isinstance(vectorstore, ShardedFAISS) else [vectorstore]
+            mapping = {}
+            for shard in shards:
+                for doc_id in shard.index_to_docstore_id.values():
+                    doc = shard.docstore.search(doc_id)
+                    chunk_id = (getattr(doc, "metadata", None) or {}).get("chunk_id")
+                    if chunk_id is not None:
+                        mapping[str(chunk_id)] = doc
+            _chunk_maps[vectorstore] = mapping
+        return mapping
+
+
+def documents_by_chunk_id(vectorstore: VectorStore, chunk_ids: Iterable[str]) -> Optional[List[Document]]:
+    """
+    Documents for previously retrieved chunk_ids, in the given order, or None
+    if any of them is no longer in the index (e.g. removed by the watcher).
+    """
+    mapping = _chunk_map(vectorstore)
+    docs = [mapping.get(c) for c in chunk_ids]
+    if any(d is None for d in docs):
+        return None
+    return docs
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+
+    from app.retriever.quantization import VectorFormat
+
+SHARDS_DIRNAME = "shards"
+
+# Fan-out pools shared by all sharded stores of the process, by size
+# (a reloaded index reuses the pool instead of leaking threads).
+_executors: Dict[int, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    pool = _executors.get(max_workers)
+    if pool is None:
+        with _executor_lock:
+            pool = _executors.get(max_workers)
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard-search")
+                _executors[max_workers] = pool
+    return pool
+
+
+def shard_key(doc: Document, mode: str, num_shards: int) -> str:
+    """
+    Shard name of a chunk: its corpus (`source`) or a stable hash bucket
+    of file path + chunk offset.
+    """
+    md = doc.metadata or {}
+    if mode == "source":
+        return str(md.get("source", "unknown"))
+    if mode == "hash":
+        key = f"{md.get('file_path', '')}:{md.get('start_index', '')}:{md.get('chunk_id', '')}"
+        return f"part_{zlib.crc32(key.encode('utf-8')) % num_shards:03d}"
+    raise ValueError(f"Unknown sharding mode: {mode}")
+
+
+def partition(documents: Sequence[Document], mode: str, num_shards: int) -> Dict[str, List[Document]]:
+    shards: Dict[str, List[Document]] = {}
+    for d in documents:
+        shards.setdefault(shard_key(d, mode, num_shards), []).append(d)
+    return dict(sorted(shards.items()))
+
+
+def search_matrix(store: FAISS, vectors: Any, k: int) -> Tuple[Any, Any]:
+    """
+    One `index.search` call for an (n, d) query matrix: (distances, positions)
+    arrays of shape (n, k'), k' = min(k, ntotal); position -1 = no hit.
+    Applies the store's query-side transforms (truncation, L2 normalisation).
+    """
+    import faiss
+    import numpy as np
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    fmt = getattr(store, "vector_format", None)  # truncated indexes (TruncatedFAISS)
+    if fmt is not None:
+        matrix = fmt.transform(matrix)
+    matrix = np.ascontiguousarray(matrix)
+    if getattr(store, "_normalize_L2", False):
+        faiss.normalize_L2(matrix)
+    k = min(k, store.index.ntotal)
+    if k <= 0:
+        return np.empty((len(matrix), 0), dtype=np.float32), np.empty((len(matrix), 0), dtype=np.int64)
+    return store.index.search(matrix, k)
+
+
+def batch_search(store: FAISS, vectors: Sequence[Sequence[float]], k: int) -> List[List[Tuple[Document, float]]]:
+    """
+    Top k (doc, L2 distance) for each query vector, with one `index.search`
+    call on the (n, d) query matrix instead of n single-row searches.
+    """
+    distances, indices = search_matrix(store, vectors, k)
+    out: List[List[Tuple[Document, float]]] = []
+    for row_d, row_i in zip(distances, indices):
+        hits = []
+        for dist, i in zip(row_d, row_i):
+            if i == -1:
+                continue
+            hits.append((store.docstore.search(store.index_to_docstore_id[int(i)]), float(dist)))
+        out.append(hits)
+    return out
+
+
+class ShardedFAISS:
+    """
+    Several FAISS indexes searched as one.
+
+    Queries fan out to the shards on a shared thread pool (FAISS releases
+    the GIL while searching) and the per-shard top k are merged by L2
+    distance, which is comparable because every shard uses the same
+    embeddings and vector format. Shards whose `source` is known are
+    skipped when the caller filters on another source.
+    """
+
+    def __init__(
+        self,
+        shards: Dict[str, FAISS],
+        *,
+        sources: Optional[Dict[str, Optional[str]]] = None,
+        max_workers: int = 8,
+    ):
+        self.shards = shards
+        self.sources = sources or {}
+        self.max_workers = max_workers
+
+    @property
+    def ntotal(self) -> int:
+        return sum(s.index.ntotal for s in self.shards.values())
+
+    def _selected(self, sources: Optional[Iterable[str]]) -> List[FAISS]:
+        if sources is None:
+            return list(self.shards.values())
+        wanted = set(sources)
+        # Shards without a single known source (hash partitions) are always searched.
+        return [s for name, s in self.shards.items() if self.sources.get(name) is None or self.sources[name] in wanted]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, *, sources: Optional[Iterable[str]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        shards = self._selected(sources)
+        if not shards:
+            return []
+
+        def _one(shard: FAISS) -> List[Tuple[Document, float]]:
+            return shard.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+        if len(shards) == 1:
+            results = [_one(shards[0])]
+        else:
+            results = list(_get_executor(self.max_workers).map(_one, shards))
+        return heapq.nsmallest(k, (hit for hits in results for hit in hits), key=lambda hit: hit[1])
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 4, *, sources: Optional[Iterable[str]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        batch_search over the shards: one batched search per shard, merged per query.
+        """
+        shards = self._selected(sources)
+        if not shards:
+            return [[] for _ in embeddings]
+        per_shard = list(_get_executor(self.max_workers).map(lambda shard: batch_search(shard, embeddings, k), shards))
+        return [
+            heapq.nsmallest(k, (hit for hits in rows for hit in hits), key=lambda hit: hit[1])
+            for rows in zip(*per_shard)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = next(iter(self.shards.values())).embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def save_local(self, folder_path: str) -> None:
+        root = Path(folder_path) / SHARDS_DIRNAME
+        for name, shard in self.shards.items():
+            shard.save_local(str(root / name))
+
+    @classmethod
+    def load_local(
+        cls,
+        folder_path: str,
+        embeddings: Embeddings,
+        shards: Sequence[Dict[str, Any]],
+        fmt: VectorFormat,
+        *,
+        max_workers: int = 8,
+    ) -> "ShardedFAISS":
+        """
+        Load the shards listed in the manifest (name, source).
+        """
+        from app.retriever.quantization import load_vectorstore
+
+        root = Path(folder_path) / SHARDS_DIRNAME
+        loaded = {s["name"]: load_vectorstore(str(root / s["name"]), embeddings, fmt) for s in shards}
+        return cls(loaded, sources={s["name"]: s.get("source") for s in shards}, max_workers=max_workers)
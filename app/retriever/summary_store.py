@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.ingestion.records import content_hash, word_shingles
+from app.retriever.rerank import tokenize
+from app.schemas.responses import IssueSummaryOutput
+
+
+# Process-wide cache of loaded stores: resolved path -> (mtime, store)
+_cache: Dict[str, Tuple[float, "IssueSummaryStore"]] = {}
+_cache_lock = threading.Lock()
+
+
+def summary_store_path() -> Path:
+    return get_settings().STORAGE_DIR / "issue_summaries.json"
+
+
+@dataclass(frozen=True)
+class SummaryEntry:
+    """
+    Precomputed summary of one bug record, plus the record fields used
+    to answer aggregate queries.
+    """
+    record_id: str
+    number: int
+    content_hash: str
+    title: str
+    severity: str
+    environment: str
+    summary: IssueSummaryOutput
+    text: str = ""
+
+    @property
+    def component_terms(self) -> Set[str]:
+        """
+        Words naming what the issue affects: title, environment and the
+        summary's affected components.
+        """
+        return set(tokenize(" ".join([self.title, self.environment, *self.summary.affected_components])))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "record_id": self.record_id,
+            "number": self.number,
+            "content_hash": self.content_hash,
+            "title": self.title,
+            "severity": self.severity,
+            "environment": self.environment,
+            "summary": self.summary.model_dump(),
+            "text": self.text,
+        }
+
+
+@dataclass(frozen=True)
+class SummaryMatch:
+    entry: SummaryEntry
+    similarity: float
+
+    @property
+    def exact(self) -> bool:
+        return self.similarity >= 1.0
+
+
+def make_entry(
+    *, record_id: str, number: int, text: str, title: str, severity: str, environment: str, summary: IssueSummaryOutput
+) -> SummaryEntry:
+    return SummaryEntry(
+        record_id=record_id,
+        number=number,
+        content_hash=content_hash(text),
+        title=title,
+        severity=severity,
+        environment=environment,
+        summary=summary,
+        text=text,
+    )
+
+
+class IssueSummaryStore:
+    """
+    Issue summaries precomputed at ingestion time (app/ingestion/build_summaries.py),
+    keyed by content hash of the normalised record text.
+
+    lookup() matches pasted issue text exactly (same hash) or near-exactly
+    (word-shingle Jaccard >= min_similarity); query() filters records by
+    severity and affected component.
+    """
+
+    def __init__(self, entries: Iterable[SummaryEntry], *, meta: Optional[Dict[str, Any]] = None):
+        self.entries: List[SummaryEntry] = sorted(entries, key=lambda e: e.number)
+        self.meta: Dict[str, Any] = meta or {}
+        self._by_hash: Dict[str, SummaryEntry] = {e.content_hash: e for e in self.entries}
+        # Every component term of any record; aggregate queries only filter on these.
+        self.component_vocabulary: Set[str] = set().union(*(e.component_terms for e in self.entries))
+        self._shingles: List[Set[str]] = [word_shingles(e.text) for e in self.entries]
+        self._by_shingle: Dict[str, List[int]] = {}
+        for i, shingles in enumerate(self._shingles):
+            for sh in shingles:
+                self._by_shingle.setdefault(sh, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, text: str, *, min_similarity: float) -> Optional[SummaryMatch]:
+        exact = self._by_hash.get(content_hash(text))
+        if exact is not None:
+            return SummaryMatch(exact, 1.0)
+
+        query = word_shingles(text)
+        if not query:
+            return None
+        overlap: Dict[int, int] = {}
+        for sh in query:
+            for i in self._by_shingle.get(sh, ()):
+                overlap[i] = overlap.get(i, 0) + 1
+
+        best: Optional[SummaryMatch] = None
+        for i, shared in overlap.items():
+            jaccard = shared / (len(query) + len(self._shingles[i]) - shared)
+            if jaccard >= min_similarity and (best is None or jaccard > best.similarity):
+                best = SummaryMatch(self.entries[i], round(jaccard, 4))
+        return best
+
+    def query(self, *, severities: Optional[Set[str]] = None, components: Optional[Set[str]] = None) -> List[SummaryEntry]:
+        """
+        Records whose severity is one of `severities` and whose component
+        terms include every term in `components` (None = no filter).
+        """
+        wanted = {s.lower() for s in severities} if severities else None
+        out = []
+        for e in self.entries:
+            if wanted is not None and e.severity.lower() not in wanted:
+                continue
+            if components and not components <= e.component_terms:
+                continue
+            out.append(e)
+        return out
+
+    def to_json(self) -> Dict[str, Any]:
+        return {**self.meta, "entries": [e.to_json() for e in self.entries]}
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_json(), ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IssueSummaryStore":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        entries = []
+        for raw in data.pop("entries", []):
+            entries.append(
+                SummaryEntry(
+                    record_id=raw["record_id"],
+                    number=int(raw["number"]),
+                    content_hash=raw["content_hash"],
+                    title=raw.get("title", ""),
+                    severity=raw.get("severity", ""),
+                    environment=raw.get("environment", ""),
+                    summary=IssueSummaryOutput(**raw["summary"]),
+                    text=raw.get("text", ""),
+                )
+            )
+        return cls(entries, meta=data)
+
+
+def get_summary_store(path: Optional[Path] = None) -> Optional[IssueSummaryStore]:
+    """
+    The store on disk, loaded once per process and reloaded when the file
+    changes. None when SUMMARY_STORE_ENABLED is off or nothing was precomputed.
+    """
+    if not get_settings().SUMMARY_STORE_ENABLED:
+        return None
+    path = path or summary_store_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    key = str(path.resolve())
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, IssueSummaryStore.load(path))
+            _cache[key] = cached
+    return cached[1]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -21,6 +23,41 @@ class AskRequest(BaseModel):
         description="Number of chunks to retrieve from FAISS vector search",
         examples=[5],
     )
+    deadline_ms: Optional[int] = Field(
+        default=None,
+        ge=100,
+        le=120000,
+        description="Time budget for the whole request; slow stages degrade to keep within it "
+        "(default: REQUEST_DEADLINE_MS)",
+        examples=[5000],
+    )
+    answer_mode: Optional[Literal["auto", "generate", "extractive"]] = Field(
+        default=None,
+        description="Q&A answer synthesis: LLM generation, extractive (no LLM; also skips routing) "
+        "or auto (extractive when confident). Default: QA_ANSWER_MODE",
+        examples=["auto"],
+    )
+    expand_clusters: bool = Field(
+        default=False,
+        description="Return every member of a retrieved near-duplicate feedback cluster, "
+        "not just its indexed representative",
+        examples=[False],
+    )
+    retrieval_mode: Optional[Literal["single", "multi_query", "llm_multi_query", "hyde"]] = Field(
+        default=None,
+        description="single query, or sub-queries searched together and fused: multi_query (local "
+        "rewrites), llm_multi_query (LLM rewrites) or hyde (LLM hypothetical record). Default: RETRIEVAL_MODE",
+        examples=["multi_query"],
+    )
+    session_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        pattern=r"^[A-Za-z0-9._:-]+$",
+        description="Conversation id chosen by the client; follow-up questions in the same session "
+        "reuse the previous turn's retrieved context and see the recent conversation",
+        examples=["3f2b8c1e-chat"],
+    )
 
 
 class SummarizeRequest(BaseModel):
@@ -37,3 +74,37 @@ class SummarizeRequest(BaseModel):
             "and sometimes not sent at all."
         ],
     )
+    deadline_ms: Optional[int] = Field(
+        default=None,
+        ge=100,
+        le=120000,
+        description="Time budget for the whole request (default: REQUEST_DEADLINE_MS)",
+        examples=[5000],
+    )
+
+
+class ReindexRequest(BaseModel):
+    """
+    Options of a background index rebuild; unset fields use the ingestion
+    settings (same as scripts/ingest.py flags).
+    """
+    chunk_size: int = Field(default=900, ge=100, le=8000, description="Chunk size for text splitting")
+    chunk_overlap: int = Field(default=150, ge=0, le=2000, description="Chunk overlap for text splitting")
+    summaries: Optional[Literal["off", "llm", "fields"]] = Field(
+        default=None, description="Precompute bug-report summaries (default: SUMMARY_PRECOMPUTE)"
+    )
+    dedup_feedback: Optional[bool] = Field(
+        default=None, description="Collapse near-duplicate feedback lines (default: FEEDBACK_DEDUP_ENABLED)"
+    )
+    vector_dtype: Optional[Literal["float32", "float16", "int8"]] = Field(
+        default=None, description="Index vector storage (default: INDEX_VECTOR_DTYPE)"
+    )
+    dimensions: Optional[int] = Field(
+        default=None, ge=1, description="Matryoshka truncation of embeddings (default: INDEX_DIMENSIONS)"
+    )
+    sharding: Optional[Literal["none", "source", "hash"]] = Field(
+        default=None, description="Index sharding (default: INDEX_SHARDING)"
+    )
+    num_shards: Optional[int] = Field(
+        default=None, ge=1, le=256, description="Hash partitions for sharding=hash (default: INDEX_HASH_SHARDS)"
+    )
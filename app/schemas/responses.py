@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional, Dict, Any, Literal
+from typing import List, Optional, Dict, Any, Literal, Union
 from pydantic import BaseModel, Field
 
 
@@ -99,3 +99,18 @@ class AgentResponse(BaseModel):
         ...,
         description="Structured output returned by the selected tool",
     )
+    degradations: List[str] = Field(
+        default_factory=list,
+        description="Fallbacks applied to stay within the deadline or under overload "
+        "(e.g. keyword_routing, extractive_answer)",
+        examples=[["keyword_routing"]],
+    )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Conversation session the turn was recorded in (echoes AskRequest.session_id)",
+    )
+    usage: Dict[str, Union[int, float]] = Field(
+        default_factory=dict,
+        description="Tokens used by the LLM and embedding calls of this request and their estimated cost",
+        examples=[{"prompt_tokens": 812, "completion_tokens": 96, "cached_tokens": 0, "embedding_tokens": 9, "cost_usd": 0.000180}],
+    )
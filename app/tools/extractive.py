@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Sequence, Set, Tuple
+
+from app.ingestion.records import BugRecord, parse_bug_records
+from app.retriever.rerank import tokenize
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_BUG_REF = re.compile(r"\bbug\s*#?\s*(\d+)\b", flags=re.IGNORECASE)
+
+NO_ANSWER = "No relevant information was found in the internal documents."
+
+# Query words that ask for one field of a bug record.
+FIELD_CUES: Dict[str, Tuple[str, ...]] = {
+    "Severity": ("severity", "severe", "priority", "critical", "serious"),
+    "Environment": ("environment", "platform", "platforms", "browser", "browsers", "version", "versions", "os", "device"),
+    "Proposed Fix": ("fix", "fixed", "proposed", "solution", "resolve", "resolved", "remedy", "workaround"),
+    "Steps to Reproduce": ("reproduce", "repro", "steps"),
+}
+_CUE_WORDS = frozenset(w for cues in FIELD_CUES.values() for w in cues)
+# Words that name the record type rather than identify a record.
+_GENERIC = frozenset({"bug", "bugs", "issue", "issues", "problem", "report", "reported", "affect", "affected"})
+
+
+@dataclass
+class Extraction:
+    """
+    LLM-free answer with a confidence in [0, 1] and the 1-based ranks of
+    the chunks it quotes.
+    """
+    answer: str
+    confidence: float
+    kind: Literal["field", "sentences", "none"]
+    ranks: List[int] = field(default_factory=list)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if len(s.strip()) > 3]
+
+
+def _weights(q_terms: Set[str], docs_terms: List[Set[str]]) -> Dict[str, float]:
+    # IDF over the candidate units; query terms found nowhere get the maximum
+    # weight, so unmatched terms lower coverage.
+    n = len(docs_terms)
+    df = Counter(t for terms in docs_terms for t in terms & q_terms)
+    return {t: math.log(1.0 + n / df[t]) if df[t] else math.log(1.0 + n) for t in q_terms}
+
+
+def extract_sentences(query: str, docs: Sequence[Document], *, max_sentences: int = 3) -> Extraction:
+    """
+    The retrieved sentences that best overlap the query (IDF-weighted over
+    the retrieved sentences), each tagged with the [n] of its source chunk,
+    in retrieval order. Confidence is half the query-term coverage: good
+    enough to return, never good enough to skip generation on its own.
+    """
+    sentences: List[Tuple[int, int, str]] = []  # (doc rank, position, text)
+    for rank, d in enumerate(docs, start=1):
+        for pos, sent in enumerate(split_sentences(d.page_content)):
+            sentences.append((rank, pos, sent))
+    if not sentences:
+        return Extraction(NO_ANSWER, 0.0, "none")
+
+    q_terms = set(tokenize(query))
+    sent_terms = [set(tokenize(s)) for _, _, s in sentences]
+    weights = _weights(q_terms, sent_terms)
+
+    scored = []
+    for i, terms in enumerate(sent_terms):
+        score = sum(weights[t] for t in terms & q_terms)
+        # Tie-break towards higher-ranked chunks and earlier sentences.
+        scored.append((score, -sentences[i][0], -sentences[i][1], i))
+    scored.sort(reverse=True)
+
+    picked = [i for score, _, _, i in scored[:max_sentences] if score > 0] or [scored[0][3]]
+    picked.sort(key=lambda i: (sentences[i][0], sentences[i][1]))
+
+    covered = set().union(*(sent_terms[i] for i in picked)) & q_terms
+    total = sum(weights.values())
+    coverage = sum(weights[t] for t in covered) / total if total else 0.0
+    return Extraction(
+        answer=" ".join(f"{sentences[i][2]} [{sentences[i][0]}]" for i in picked),
+        confidence=0.5 * coverage,
+        kind="sentences",
+        ranks=sorted({sentences[i][0] for i in picked}),
+    )
+
+
+def requested_fields(query: str) -> List[str]:
+    words = set(re.findall(r"\w+", query.lower()))
+    return [name for name, cues in FIELD_CUES.items() if words.intersection(cues)]
+
+
+def _records_by_rank(docs: Sequence[Document]) -> List[Tuple[int, BugRecord]]:
+    """
+    Bug records in the retrieved chunks, first (best-ranked) occurrence of
+    each number; fields of a record split across chunks are merged.
+    """
+    found: Dict[int, Tuple[int, Dict[str, str]]] = {}
+    for rank, d in enumerate(docs, start=1):
+        for rec in parse_bug_records(d.page_content):
+            if rec.number not in found:
+                found[rec.number] = (rank, dict(rec.fields))
+            else:
+                merged = found[rec.number][1]
+                for k, v in rec.fields.items():
+                    merged.setdefault(k, v)
+    ordered = sorted(found.items(), key=lambda kv: kv[1][0])
+    return [(rank, BugRecord(number=num, fields=fields)) for num, (rank, fields) in ordered]
+
+
+def extract_record_fields(query: str, docs: Sequence[Document]) -> Optional[Extraction]:
+    """
+    Answer "what is the <field> of <bug>" from the structured fields of a
+    retrieved `Bug #N` record. None when the query names no field or no
+    retrieved record has it.
+
+    Confidence = how much of the query's identifying terms the record's
+    title/description covers, discounted when a runner-up record matches
+    almost as well. An explicit "Bug #N" that was retrieved scores 1.0.
+    """
+    wanted = requested_fields(query)
+    if not wanted:
+        return None
+    records = [(rank, r) for rank, r in _records_by_rank(docs) if any(r.get(f) for f in wanted)]
+    if not records:
+        return None
+
+    ref = _BUG_REF.search(query)
+    best: Optional[Tuple[int, BugRecord]] = None
+    confidence = 0.0
+    if ref:
+        best = next(((rank, r) for rank, r in records if r.number == int(ref.group(1))), None)
+        confidence = 1.0 if best else 0.0
+
+    if best is None:
+        q_terms = set(tokenize(query)) - _CUE_WORDS - _GENERIC
+        if not q_terms:
+            return None
+        rec_terms = [set(tokenize(f"{r.title} {r.get('Description')}")) for _, r in records]
+        weights = _weights(q_terms, rec_terms)
+        total = sum(weights.values())
+        scores = sorted(
+            ((sum(weights[t] for t in terms & q_terms), -i) for i, terms in enumerate(rec_terms)),
+            reverse=True,
+        )
+        top, idx = scores[0][0], -scores[0][1]
+        if top <= 0:
+            return None
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        margin = (top - runner_up) / top
+        best = records[idx]
+        confidence = (top / total) * (0.6 + 0.4 * margin)
+
+    rank, rec = best
+    parts = [f"{name}: {' '.join(rec.get(name).split())}" for name in wanted if rec.get(name)]
+    answer = f"Bug #{rec.number} ({rec.title or 'untitled'}) - " + "; ".join(parts) + f" [{rank}]"
+    return Extraction(answer=answer, confidence=round(confidence, 3), kind="field", ranks=[rank])
+
+
+def extract_answer(query: str, docs: Sequence[Document]) -> Extraction:
+    """
+    Best LLM-free answer: a record field when the query asks for one,
+    otherwise quoted sentences.
+    """
+    if not docs:
+        return Extraction(NO_ANSWER, 0.0, "none")
+    return extract_record_fields(query, docs) or extract_sentences(query, docs)
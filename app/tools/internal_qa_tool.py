@@ -1,15 +1,48 @@
 from __future__ import annotations
 
-from typing import List
-
-from langchain_openai import ChatOpenAI
-from langchain_core.documents import Document
+from functools import partial
+from typing import TYPE_CHECKING, Callable, List, Optional
 
+from app.agent.prompt_builder import build_messages
+from app.agent.session import RetrievedContext
+from app.agent.tiering import TierPolicy
 from app.core.config import get_settings
-from app.ingestion.embeddings import get_embeddings
+from app.core.deadline import DeadlineExceeded, note_degradation, run_within, stage_budget
+from app.core.limiter import OverloadedError, upstream_slot
+from app.core.llm import get_chat_llm
+from app.ingestion.dedup import expand_clusters as expand_cluster_members
 from app.retriever.faiss_store import FAISSStore
-from app.retriever.search import similarity_search
+from app.retriever.rerank import RerankResult, confidence_from_scores, faiss_order, get_scorer, rerank
+from app.retriever.query_expansion import expand_queries
+from app.retriever.search import (
+    documents_by_chunk_id,
+    fuse_rankings,
+    similarity_search_with_scores_by_vector,
+    similarity_search_with_scores_by_vectors,
+)
 from app.schemas.responses import InternalQAOutput, Citation
+from app.tools.extractive import Extraction, extract_answer
+from app.utils.llm_usage import record_usage
+from app.utils.metrics import MODEL_ESCALATIONS
+from app.utils.trace import annotate, span
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+    from app.retriever.faiss_store import VectorStore
+
+
+# Share of the remaining deadline the query embedding may use; generation gets
+# whatever is left minus DEADLINE_RESERVE_MS.
+EMBED_BUDGET_FRACTION = 0.3
+
+_CONFIDENCE_ORDER = ("low", "medium", "high")
+
+
+def _extraction_confidence(extraction: Extraction, threshold: float) -> str:
+    if extraction.confidence >= threshold:
+        return "high"
+    return "medium" if extraction.confidence >= 0.5 else "low"
 
 
 def _build_context(docs: List[Document]) -> str:
@@ -22,26 +55,156 @@ def _build_context(docs: List[Document]) -> str:
         source = meta.get("source", "unknown")
         chunk_id = meta.get("chunk_id", f"chunk_{i}")
         text = d.page_content.strip()
-        blocks.append(f"[{i}] ({source}:{chunk_id})\n{text}")
+        size = meta.get("cluster_size") or 1
+        similar = f", {size - 1} similar reports" if size > 1 else ""
+        blocks.append(f"[{i}] ({source}:{chunk_id}{similar})\n{text}")
     return "\n\n".join(blocks)
 
 
-def internal_qa_tool(query: str, top_k: int = 5) -> InternalQAOutput:
+def _reuse(vectorstore: VectorStore, context: RetrievedContext, generation: Optional[str]) -> Optional[RerankResult]:
+    if context.generation != generation:
+        # Reindexed since: the same chunk_ids may now name other chunks.
+        return None
+    docs = documents_by_chunk_id(vectorstore, context.chunk_ids)
+    if docs is None:
+        return None
+    return RerankResult(documents=docs, scores=list(context.scores), score_kind=context.score_kind)  # type: ignore[arg-type]
+
+
+def internal_qa_tool(
+    query: str,
+    top_k: int = 5,
+    *,
+    answer_mode: Optional[str] = None,
+    expand_clusters: bool = False,
+    retrieval_mode: Optional[str] = None,
+    search_query: Optional[str] = None,
+    context: Optional[RetrievedContext] = None,
+    history: str = "",
+    on_retrieved: Optional[Callable[[RetrievedContext], None]] = None,
+    tiers: Optional[TierPolicy] = None,
+) -> InternalQAOutput:
     """
     Perform:
       1) FAISS similarity search
-      2) LLM answer grounded in retrieved context
-      3) Return structured output
+      2) Optional re-ranking of over-fetched candidates (RERANK_ENABLED)
+      3) Answer: extractive (record fields / sentences, no LLM) or LLM
+         generation grounded in retrieved context, per answer_mode
+         (default QA_ANSWER_MODE; "auto" extracts when confidence is high)
+      4) Return structured output
+
+    Near-duplicate feedback is indexed as one representative per cluster
+    (FEEDBACK_DEDUP_ENABLED); expand_clusters=True adds the other members
+    after their representative (they do not count towards top_k).
+
+    retrieval_mode (default RETRIEVAL_MODE) other than "single" expands the
+    query into sub-queries that are embedded in one request, searched in one
+    batched FAISS call and fused by reciprocal rank.
+
+    Session follow-ups: `context` reuses the chunks retrieved for the
+    previous turn (no embedding or search; falls back to retrieval when a
+    chunk has left the index), `search_query` retrieves for a rewritten
+    query instead of `query`, and `history` is added to the generation
+    prompt. `on_retrieved` receives the chunks used, for the next turn.
+
+    Generation model: per `tiers` (default from settings, QA_TIER). With
+    "escalate" the small model answers unless retrieval confidence is low,
+    and a small-model answer that says it does not know is asked again of
+    the large model when the deadline leaves room (otherwise it is kept).
+
+    Under a request deadline, an embedding that runs out of budget returns
+    no answer, and a generation that runs out of budget is replaced by an
+    extractive answer over the retrieved chunks.
     """
+    from app.ingestion.embeddings import get_embeddings
+
     s = get_settings()
+    reserve_s = s.DEADLINE_RESERVE_MS / 1000.0
 
     # Load FAISS
-    embeddings = get_embeddings()
-    store = FAISSStore()
-    vectorstore = store.load(embeddings)
+    with span("internal_qa.load_index"):
+        embeddings = get_embeddings()
+        store = FAISSStore()
+        vectorstore = store.load_cached(embeddings)
+        generation = store.cached_generation_id()
+
+    search_query = search_query or query
+    ranked: Optional[RerankResult] = None
+    if context is not None:
+        with span("internal_qa.reuse_context"):
+            ranked = _reuse(vectorstore, context, generation)
+        if ranked is None:
+            # Index rebuilt or chunks gone since the previous turn; search for the follow-up instead.
+            note_degradation("session_context_stale")
+
+    if ranked is None:
+        if not search_query.strip():
+            candidates = []
+        else:
+            mode = retrieval_mode or s.RETRIEVAL_MODE
+            with span("internal_qa.expand"):
+                queries = expand_queries(search_query, mode, s.MULTI_QUERY_COUNT)
+
+            def _embed() -> List[List[float]]:
+                client = get_embeddings()  # the stage's no-retry client
+                with upstream_slot("embeddings"), span("internal_qa.embed"):
+                    if len(queries) == 1:
+                        return [client.embed_query(queries[0])]
+                    return client.embed_documents(queries)
 
-    # Retrieve documents
-    docs = similarity_search(vectorstore, query, top_k=top_k)
+            try:
+                query_vectors = run_within(
+                    _embed,
+                    stage_budget(fraction=EMBED_BUDGET_FRACTION, reserve_s=reserve_s),
+                    stage="internal_qa.embed",
+                )
+            except DeadlineExceeded:
+                note_degradation("retrieval_skipped")
+                return InternalQAOutput(
+                    answer="The request deadline was reached before the documents could be searched.",
+                    citations=[],
+                    confidence="low",
+                )
+
+            # Retrieve documents
+            fetch_k = max(s.RERANK_CANDIDATES, top_k) if s.RERANK_ENABLED else top_k
+            with span("internal_qa.search"):
+                if len(query_vectors) == 1:
+                    candidates = similarity_search_with_scores_by_vector(
+                        vectorstore, query_vectors[0], top_k=fetch_k
+                    )
+                else:
+                    candidates = fuse_rankings(
+                        similarity_search_with_scores_by_vectors(vectorstore, query_vectors, top_k=fetch_k),
+                        top_k=fetch_k,
+                    )
+
+        if s.RERANK_ENABLED:
+            with span("internal_qa.rerank"):
+                ranked = rerank(
+                    search_query,
+                    candidates,
+                    top_k=top_k,
+                    scorer=get_scorer(s.RERANK_SCORER, model_name=s.RERANK_MODEL),
+                    budget_ms=s.RERANK_BUDGET_MS,
+                    min_score=s.RERANK_MIN_SCORE,
+                )
+        else:
+            ranked = faiss_order(candidates, top_k=top_k)
+
+    if on_retrieved is not None and ranked.documents:
+        on_retrieved(
+            RetrievedContext(
+                chunk_ids=tuple(str((d.metadata or {}).get("chunk_id")) for d in ranked.documents),
+                scores=tuple(float(x) for x in ranked.scores),
+                score_kind=ranked.score_kind,
+                generation=generation,
+            )
+        )
+
+    docs = ranked.documents
+    if expand_clusters:
+        docs = expand_cluster_members(docs)
 
     if not docs:
         return InternalQAOutput(
@@ -50,29 +213,63 @@ def internal_qa_tool(query: str, top_k: int = 5) -> InternalQAOutput:
             confidence="low",
         )
 
-    context = _build_context(docs)
-
-    llm = ChatOpenAI(
-        model=s.OPENAI_CHAT_MODEL,
-        api_key=s.OPENAI_API_KEY,
-        temperature=0,
-    )
+    mode = answer_mode or s.QA_ANSWER_MODE
+    extraction: Optional[Extraction] = None
+    if mode != "generate":
+        with span("internal_qa.extract"):
+            extraction = extract_answer(search_query, docs)
 
-    prompt = f"""
-You are an internal AI assistant.
-Answer the question ONLY using the context below.
-If the answer is not in the context, say you do not know.
-
-Context:
-{context}
+    degraded = False
+    if extraction is not None and (
+        mode == "extractive" or extraction.confidence >= s.QA_EXTRACTIVE_MIN_CONFIDENCE
+    ):
+        answer = extraction.answer
+        annotate(qa_tier="extractive")
+    else:
+        context_text = _build_context(docs)
+        if history:
+            messages = build_messages(
+                "internal_qa_followup", context=context_text, history=history, question=query.strip()
+            )
+        else:
+            messages = build_messages("internal_qa", context=context_text, question=query.strip())
 
-Question:
-{query}
+        tiers = tiers or TierPolicy.from_settings(s)
+        tier = tiers.qa_first_tier(confidence_from_scores(ranked.scores, ranked.score_kind))
+        escalation: Optional[str] = None
+        if tier == "large" and tiers.qa == "escalate" and tiers.tiered:
+            escalation = "weak_retrieval"
 
-Answer concisely and clearly.
-"""
+        def _generate(tier: str) -> str:
+            llm = get_chat_llm(tiers.model(tier))
+            with upstream_slot("chat"), span("internal_qa.llm"):
+                msg = llm.invoke(messages)
+            record_usage("internal_qa", msg)
+            return msg.content.strip()
 
-    answer = llm.invoke(prompt).content.strip()
+        try:
+            answer = run_within(partial(_generate, tier), stage_budget(reserve_s=reserve_s), stage="internal_qa.llm")
+        except DeadlineExceeded:
+            note_degradation("extractive_answer")
+            degraded = True
+            with span("internal_qa.extract"):
+                extraction = extraction or extract_answer(search_query, docs)
+            answer = extraction.answer
+            tier, escalation = "extractive", None
+        else:
+            if tiers.qa_escalates(tier, answer):
+                try:
+                    answer = run_within(
+                        partial(_generate, "large"), stage_budget(reserve_s=reserve_s), stage="internal_qa.llm"
+                    )
+                    tier, escalation = "large", "dont_know"
+                except (DeadlineExceeded, OverloadedError):
+                    # The small model's answer still stands.
+                    note_degradation("escalation_skipped")
+        if escalation:
+            MODEL_ESCALATIONS.inc(reason=escalation)
+            annotate(escalation=escalation)
+        annotate(qa_tier=tier, **({"qa_model": tiers.model(tier)} if tier != "extractive" else {}))
 
     citations = []
     for d in docs:
@@ -86,7 +283,16 @@ Answer concisely and clearly.
             )
         )
 
-    confidence = "high" if len(docs) >= 3 else "medium"
+    confidence = confidence_from_scores(ranked.scores, ranked.score_kind)
+    if extraction is not None and answer == extraction.answer:
+        # Quoted answers are only as good as both the retrieval and the extraction.
+        confidence = min(
+            confidence,
+            _extraction_confidence(extraction, s.QA_EXTRACTIVE_MIN_CONFIDENCE),
+            key=_CONFIDENCE_ORDER.index,
+        )
+    if degraded and confidence == "high":
+        confidence = "medium"
 
     return InternalQAOutput(
         answer=answer,
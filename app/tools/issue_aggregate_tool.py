@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from app.retriever.rerank import tokenize
+from app.retriever.summary_store import SummaryEntry, get_summary_store
+from app.schemas.responses import Citation, InternalQAOutput
+from app.utils.trace import span
+
+_SEVERITY = r"(low|medium|high|critical)"
+# Aggregates are about issues in the plural ("High issues", "bugs affecting search").
+_ISSUES = r"(?:issues|bugs|problems|defects|reports)"
+_SEVERITY_BEFORE = re.compile(
+    r"\b" + _SEVERITY + r"(?:[- ](?:severity|priority))?\s+(?:\w+\s+)?" + _ISSUES + r"\b", flags=re.IGNORECASE
+)
+_SEVERITY_AFTER = re.compile(
+    r"\b" + _ISSUES + r"\s+(?:with|of|at)\s+(?:a\s+)?(?:(?:severity|priority)\s*(?:of|=|:)?\s*" + _SEVERITY
+    + r"|" + _SEVERITY + r"\s+(?:severity|priority))\b",
+    flags=re.IGNORECASE,
+)
+# "which ..." is how most ordinary questions start; it is not list intent on its own.
+_LIST_INTENT = re.compile(r"\b(all|list|how many|every|show|count|number of)\b", flags=re.IGNORECASE)
+_COUNT_INTENT = re.compile(r"\bhow many\b|\bcount\b|\bnumber of\b", flags=re.IGNORECASE)
+_COMPONENT = re.compile(
+    r"\b" + _ISSUES + r"\s+(?:\w+\s+)?(?:affecting|affect|impacting|involving|concerning|related to|in|on|for|about|with)"
+    r"\s+(?:the\s+)?([^?.!;]+)",
+    flags=re.IGNORECASE,
+)
+# A question about one record ("the login bug", "Bug #7") is not an aggregate.
+_SINGLE_RECORD = re.compile(r"#\s*\d+|\b(?:issue|bug|problem|defect)\b", flags=re.IGNORECASE)
+# Longer input is pasted issue text, not a question about the corpus.
+MAX_QUERY_CHARS = 300
+# Words in the component phrase that do not name a component.
+_NOT_COMPONENT = frozenset(
+    {
+        "issue", "issues", "bug", "bugs", "problem", "problems", "defect", "defects", "report", "reports",
+        "reported", "severity", "priority", "low", "medium", "high", "critical", "component", "components",
+        "module", "feature", "features", "area", "corpus", "documents", "list", "open", "known",
+    }
+)
+
+
+@dataclass
+class IssueQuery:
+    """
+    Filter parsed from an aggregate question such as
+    "all Critical issues affecting Search".
+    """
+    severities: Set[str] = field(default_factory=set)
+    components: Set[str] = field(default_factory=set)
+    count_only: bool = False
+
+    def describe(self) -> str:
+        sev = "/".join(sorted(s.capitalize() for s in self.severities))
+        comp = " ".join(sorted(self.components))
+        return " ".join(p for p in (sev, "issues", f"affecting '{comp}'" if comp else "") if p)
+
+
+def parse_aggregate_query(text: str) -> Optional[IssueQuery]:
+    """
+    None unless the text asks to list/count issues, with a severity or an
+    affected component next to a plural issue noun ("all High issues",
+    "how many bugs affecting search"), and names no single record.
+    """
+    if len(text) > MAX_QUERY_CHARS or not _LIST_INTENT.search(text) or _SINGLE_RECORD.search(text):
+        return None
+
+    severities = {(m.group(1) or m.group(2) or "").lower() for m in _SEVERITY_AFTER.finditer(text)}
+    severities |= {m.group(1).lower() for m in _SEVERITY_BEFORE.finditer(text)}
+    severities.discard("")
+
+    components: Set[str] = set()
+    for m in _COMPONENT.finditer(text):
+        components |= set(tokenize(m.group(1))) - _NOT_COMPONENT
+
+    if not severities and not components:
+        return None
+    return IssueQuery(severities=severities, components=components, count_only=bool(_COUNT_INTENT.search(text)))
+
+
+def _answer(query: IssueQuery, matches: List[SummaryEntry]) -> str:
+    head = f"{len(matches)} {query.describe()} in the bug reports"
+    if query.count_only:
+        return head + "."
+    items = "; ".join(f"Bug #{e.number} {e.title} ({e.severity}) [{i}]" for i, e in enumerate(matches, start=1))
+    return f"{head}: {items}."
+
+
+def issue_aggregate_tool(text: str) -> Optional[InternalQAOutput]:
+    """
+    Answer "list/count <severity> issues affecting <component>" from the
+    precomputed issue-summary store: no retrieval, no LLM.
+    None (routing and retrieval answer instead) when the text is not an
+    aggregate query, names words that are not component terms of any record,
+    no store was built, or no record matches.
+    """
+    query = parse_aggregate_query(text)
+    if query is None:
+        return None
+    store = get_summary_store()
+    if store is None or not query.components <= store.component_vocabulary:
+        return None
+
+    with span("issue_aggregate.query"):
+        matches = store.query(severities=query.severities or None, components=query.components or None)
+    if not matches:
+        return None
+
+    return InternalQAOutput(
+        answer=_answer(query, matches),
+        citations=[
+            Citation(
+                source="ai_test_bug_report",
+                doc_id=e.record_id,
+                snippet=f"{e.title} | Severity: {e.severity} | Environment: {e.environment}"[:200],
+            )
+            for e in matches
+        ],
+        confidence="high",
+    )
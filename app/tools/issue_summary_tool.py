@@ -1,57 +1,199 @@
 from __future__ import annotations
 
-from langchain_openai import ChatOpenAI
+import logging
+from contextlib import closing
+from typing import Any, Dict, List, Optional
 
+from app.agent.prompt_builder import build_messages
 from app.core.config import get_settings
+from app.core.deadline import DeadlineExceeded, note_degradation, run_within, stage_budget, stage_expired
+from app.core.limiter import upstream_slot
+from app.core.llm import get_chat_llm
+from app.retriever.summary_store import get_summary_store
 from app.schemas.responses import IssueSummaryOutput
+from app.tools.extractive import split_sentences
+from app.utils.json_guard import JSONGuardError, parse_json_object
+from app.utils.json_stream import IncrementalJSONObjectParser
+from app.utils.llm_usage import estimate_usage, record_usage
+from app.utils.metrics import CACHE_HITS, CACHE_MISSES
+from app.utils.trace import span
 
+logger = logging.getLogger(__name__)
 
-def issue_summary_tool(issue_text: str) -> IssueSummaryOutput:
+_SEVERITIES = {s.lower(): s for s in ("Low", "Medium", "High", "Critical", "Unknown")}
+
+
+def _as_str_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [str(value)]
+
+
+def _coerce_summary(data: Dict[str, Any]) -> IssueSummaryOutput:
     """
-    Use LLM to summarize an issue into structured fields.
+    Build IssueSummaryOutput from loosely-typed model output.
+    Keeps every usable field instead of discarding the whole response.
     """
-    s = get_settings()
-
-    llm = ChatOpenAI(
-        model=s.OPENAI_CHAT_MODEL,
-        api_key=s.OPENAI_API_KEY,
-        temperature=0,
+    severity = _SEVERITIES.get(str(data.get("severity") or "").strip().lower(), "Unknown")
+    notes = data.get("notes")
+    if isinstance(notes, list):
+        notes = "; ".join(str(n) for n in notes)
+    return IssueSummaryOutput(
+        reported_issues=_as_str_list(data.get("reported_issues")),
+        affected_components=_as_str_list(data.get("affected_components")),
+        severity=severity,
+        notes=str(notes) if notes is not None else None,
     )
 
-    prompt = f"""
-You are an AI assistant for product and engineering teams.
 
-Summarize the issue text into the following JSON format ONLY:
+def _parse_failure() -> IssueSummaryOutput:
+    return IssueSummaryOutput(
+        reported_issues=[],
+        affected_components=[],
+        severity="Unknown",
+        notes="Failed to parse structured summary from LLM.",
+    )
 
-{{
-  "reported_issues": [string],
-  "affected_components": [string],
-  "severity": "Low | Medium | High | Critical | Unknown",
-  "notes": string
-}}
 
-Issue text:
-{issue_text}
-"""
+def _extractive_summary(issue_text: str) -> IssueSummaryOutput:
+    """
+    LLM-free fallback: the leading sentences of the issue text as the reported issues.
+    """
+    return IssueSummaryOutput(
+        reported_issues=[sent[:200] for sent in split_sentences(issue_text)[:3]],
+        affected_components=[],
+        severity="Unknown",
+        notes="LLM summary skipped: request deadline reached. Issues are quoted from the input.",
+    )
+
 
-    response = llm.invoke(prompt).content.strip()
+def _summarize_structured(llm: Any, messages: List[Dict[str, str]]) -> Optional[IssueSummaryOutput]:
+    """
+    Schema-constrained generation (OpenAI json_schema response format).
+    Returns None when the model/client does not support it.
+    """
+    import openai
 
-    # Minimal safe parse
     try:
-        import json
-        data = json.loads(response)
-    except Exception:
-        # Fallback if LLM response is malformed
-        return IssueSummaryOutput(
-            reported_issues=[],
-            affected_components=[],
-            severity="Unknown",
-            notes="Failed to parse structured summary from LLM.",
+        structured = llm.with_structured_output(
+            IssueSummaryOutput, method="json_schema", include_raw=True
         )
+    except (AttributeError, NotImplementedError, TypeError, ValueError):
+        return None
 
-    return IssueSummaryOutput(
-        reported_issues=data.get("reported_issues", []),
-        affected_components=data.get("affected_components", []),
-        severity=data.get("severity", "Unknown"),
-        notes=data.get("notes"),
-    )
+    try:
+        with upstream_slot("chat"), span("issue_summary.llm"):
+            out = structured.invoke(messages)
+    except openai.BadRequestError as e:
+        # e.g. model without json_schema response_format support
+        logger.warning("Structured output rejected, falling back to streaming: %s", e)
+        return None
+    record_usage("issue_summary", out.get("raw"))
+
+    parsed = out.get("parsed")
+    if isinstance(parsed, IssueSummaryOutput):
+        return parsed
+
+    # Schema parse failed: fall back to the tolerant extractor on the raw text.
+    raw = getattr(out.get("raw"), "content", "") or ""
+    try:
+        return _coerce_summary(parse_json_object(raw))
+    except JSONGuardError:
+        return _parse_failure()
+
+
+def _summarize_streaming(llm: Any, messages: List[Dict[str, str]]) -> IssueSummaryOutput:
+    """
+    Stream the completion through an incremental JSON parser and close the
+    stream as soon as the object closes, so trailing chatter is not
+    generated. The usage chunk only comes at the end of a stream, so the
+    tokens of a stream closed early are estimated from the text.
+    """
+    parser = IncrementalJSONObjectParser()
+    aggregate = None
+    with upstream_slot("chat"), span("issue_summary.llm"), closing(llm.stream(messages, stream_usage=True)) as stream:
+        for chunk in stream:
+            aggregate = chunk if aggregate is None else aggregate + chunk
+            if parser.feed(chunk.content or ""):
+                break
+            if stage_expired():
+                raise DeadlineExceeded("issue_summary.llm")
+
+    if aggregate is not None:
+        completion = getattr(aggregate, "content", "") or ""
+        prompt = "\n".join(m["content"] for m in messages)
+        record_usage("issue_summary", aggregate, estimate=estimate_usage(prompt, completion))
+
+    with span("issue_summary.parse"):
+        try:
+            data = parser.result()
+        except ValueError:
+            # Object never closed or is malformed: try the tolerant extractor.
+            try:
+                data = parse_json_object(getattr(aggregate, "content", "") or "")
+            except JSONGuardError:
+                return _parse_failure()
+
+        return _coerce_summary(data)
+
+
+def _stored_summary(issue_text: str) -> Optional[IssueSummaryOutput]:
+    """
+    Summary precomputed at ingestion for this record (exact or near-exact
+    text match), or None.
+    """
+    store = get_summary_store()
+    if store is None:
+        return None
+    with span("issue_summary.store"):
+        match = store.lookup(issue_text, min_similarity=get_settings().SUMMARY_STORE_MIN_SIMILARITY)
+    (CACHE_HITS if match else CACHE_MISSES).inc(cache="issue_summary_store")
+    if match is None:
+        return None
+    logger.debug("Issue summary from store: %s (similarity %.3f)", match.entry.record_id, match.similarity)
+    return match.entry.summary.model_copy(deep=True)
+
+
+def issue_summary_tool(
+    issue_text: str, *, llm: Any = None, model: Optional[str] = None, use_store: bool = True
+) -> IssueSummaryOutput:
+    """
+    Use LLM to summarize an issue into structured fields (default model:
+    the ISSUE_SUMMARY_TIER model).
+    Text matching a record of the precomputed summary store is answered
+    from the store without an LLM call (use_store=False to force generation).
+
+    ISSUE_SUMMARY_OUTPUT_MODE:
+      - json_schema: schema-constrained output where supported, streaming otherwise
+      - stream: streamed JSON, read up to the closing brace and then closed
+
+    Past the request deadline the leading sentences of the input are returned instead.
+    """
+    s = get_settings()
+    if use_store:
+        stored = _stored_summary(issue_text)
+        if stored is not None:
+            return stored
+
+    messages = build_messages("issue_summary", issue_text=issue_text.strip())
+
+    def _generate() -> IssueSummaryOutput:
+        # Resolved inside the stage so the deadline-aware client is used.
+        chat = llm or get_chat_llm(model or s.chat_model(s.ISSUE_SUMMARY_TIER))
+        if s.ISSUE_SUMMARY_OUTPUT_MODE == "json_schema":
+            out = _summarize_structured(chat, messages)
+            if out is not None:
+                return out
+        return _summarize_streaming(chat, messages)
+
+    try:
+        return run_within(
+            _generate, stage_budget(reserve_s=s.DEADLINE_RESERVE_MS / 1000.0), stage="issue_summary.llm"
+        )
+    except DeadlineExceeded:
+        note_degradation("extractive_summary")
+        return _extractive_summary(issue_text)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List
+
+
+class IncrementalJSONObjectParser:
+    """
+    Incremental parser for a single JSON object arriving in chunks (LLM streaming).
+
+    - Skips any preamble before the first '{' (markdown fences, "Here is the JSON:")
+    - Tracks string/escape state and brace depth char by char
+    - Reports completion the moment the outer object closes, so the caller can
+      close the stream instead of paying for trailing text
+
+    Usage:
+        p = IncrementalJSONObjectParser()
+        for chunk in stream:
+            if p.feed(chunk):
+                break
+        data = p.result()
+    """
+
+    def __init__(self):
+        self.chars_seen = 0
+
+        self._buf: List[str] = []
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, text: str) -> bool:
+        """
+        Consume a chunk. Returns True once the top-level object is closed;
+        anything after the closing brace is ignored.
+        """
+        for ch in text:
+            if self._done:
+                break
+            self.chars_seen += 1
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._buf.append(ch)
+                continue
+
+            self._buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._done = True
+                    break
+
+        return self._done
+
+    @property
+    def text(self) -> str:
+        """
+        The JSON object text consumed so far.
+        """
+        return "".join(self._buf)
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Parsed object. Raises ValueError if the object has not closed or is invalid.
+        """
+        if not self._done:
+            raise ValueError("JSON object is incomplete.")
+        data = json.loads(self.text)
+        if not isinstance(data, dict):
+            raise ValueError("Parsed JSON is not an object (dict).")
+        return data
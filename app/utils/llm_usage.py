@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+from app.utils.metrics import CACHE_HITS, CACHE_MISSES, LLM_CALLS, LLM_TOKENS, LLM_USAGE_ESTIMATED
+from app.utils.trace import add_counts, annotate, current_trace
+from app.utils.usage_ledger import INTERNAL_TENANT, USAGE_FIELDS, charge, current_scope
+
+logger = logging.getLogger(__name__)
+
+
+# USD per 1M tokens (list prices when written; MODEL_PRICES overrides or extends).
+# "cached" is the price of prompt tokens served from the provider's prefix cache.
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4o-mini": {"prompt": 0.15, "cached": 0.075, "completion": 0.60},
+    "gpt-4o": {"prompt": 2.50, "cached": 1.25, "completion": 10.00},
+    "gpt-4.1-nano": {"prompt": 0.10, "cached": 0.025, "completion": 0.40},
+    "gpt-4.1-mini": {"prompt": 0.40, "cached": 0.10, "completion": 1.60},
+    "gpt-4.1": {"prompt": 2.00, "cached": 0.50, "completion": 8.00},
+    "text-embedding-3-small": {"prompt": 0.02},
+    "text-embedding-3-large": {"prompt": 0.13},
+    "text-embedding-ada-002": {"prompt": 0.10},
+}
+
+
+# Rough chars per token for English text, used when a response has no usage.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    def add(self, other: "TokenUsage") -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+
+
+def usage_from_message(message: Any) -> TokenUsage:
+    """
+    Extract token usage from a LangChain chat response.
+
+    Reads OpenAI's raw token_usage (prompt_tokens_details.cached_tokens) and
+    falls back to LangChain's normalised usage_metadata (input_token_details.cache_read).
+    Missing fields count as 0.
+    """
+    meta = getattr(message, "response_metadata", None) or {}
+    raw = meta.get("token_usage") or meta.get("usage") or {}
+    if raw:
+        details = raw.get("prompt_tokens_details") or {}
+        return TokenUsage(
+            prompt_tokens=int(raw.get("prompt_tokens") or 0),
+            completion_tokens=int(raw.get("completion_tokens") or 0),
+            cached_tokens=int(details.get("cached_tokens") or 0),
+        )
+
+    um = getattr(message, "usage_metadata", None) or {}
+    details = um.get("input_token_details") or {}
+    return TokenUsage(
+        prompt_tokens=int(um.get("input_tokens") or 0),
+        completion_tokens=int(um.get("output_tokens") or 0),
+        cached_tokens=int(details.get("cache_read") or 0),
+    )
+
+
+def estimate_usage(prompt: str, completion: str) -> TokenUsage:
+    """
+    Token counts from text length, for responses that carry no usage
+    (e.g. a stream closed before its final usage chunk).
+    """
+    return TokenUsage(
+        prompt_tokens=len(prompt) // CHARS_PER_TOKEN + 1,
+        completion_tokens=len(completion) // CHARS_PER_TOKEN + 1,
+    )
+
+
+def model_prices(model: Optional[str]) -> Dict[str, float]:
+    """
+    Prices for a model name; dated snapshots ("gpt-4o-mini-2024-07-18") use
+    the longest listed prefix. Unknown models cost 0.
+    """
+    if not model:
+        return {}
+    prices = {**DEFAULT_PRICES, **get_settings().MODEL_PRICES}
+    if model in prices:
+        return prices[model]
+    prefix = max((name for name in prices if model.startswith(name)), key=len, default=None)
+    return prices[prefix] if prefix else {}
+
+
+def cost_usd(model: Optional[str], usage: TokenUsage) -> float:
+    p = model_prices(model)
+    uncached = max(0, usage.prompt_tokens - usage.cached_tokens)
+    return (
+        uncached * p.get("prompt", 0.0)
+        + usage.cached_tokens * p.get("cached", p.get("prompt", 0.0))
+        + usage.completion_tokens * p.get("completion", 0.0)
+    ) / 1e6
+
+
+def _charge(default_tool: str, counts: Dict[str, Any]) -> None:
+    """
+    Inside a request: add to the request's counts (charged to its tenant
+    and tool when it ends). Outside: charge the usage scope directly.
+    """
+    if current_trace() is not None:
+        add_counts(**counts)
+        return
+    tenant, tool = current_scope() or (INTERNAL_TENANT, default_tool)
+    charge(tenant, tool, counts)
+
+
+def request_usage() -> Dict[str, float]:
+    """
+    Token counts and estimated cost of the current request so far.
+    """
+    record = current_trace()
+    fields = record.fields if record is not None else {}
+    out = {f: fields.get(f, 0) for f in USAGE_FIELDS}
+    out["cost_usd"] = round(out["cost_usd"], 8)
+    return out
+
+
+_lock = threading.Lock()
+_totals: Dict[str, TokenUsage] = {}
+
+
+def record_usage(prompt_name: str, message: Any, *, estimate: Optional[TokenUsage] = None) -> TokenUsage:
+    """
+    Record usage for one chat response under its prompt name.
+    `estimate` is recorded instead when the response carries no usage; such
+    calls are counted in assistant_llm_usage_estimated_total and the request
+    is annotated usage_estimated=True.
+    Returns the recorded usage.
+    """
+    usage = usage_from_message(message)
+    if estimate is not None and not (usage.prompt_tokens or usage.completion_tokens):
+        usage = estimate
+        LLM_USAGE_ESTIMATED.inc(prompt=prompt_name)
+        annotate(usage_estimated=True)
+    with _lock:
+        _totals.setdefault(prompt_name, TokenUsage()).add(usage)
+
+    LLM_TOKENS.inc(usage.prompt_tokens, prompt=prompt_name, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens, prompt=prompt_name, kind="completion")
+    LLM_TOKENS.inc(usage.cached_tokens, prompt=prompt_name, kind="cached")
+    meta = getattr(message, "response_metadata", None) or {}
+    model = meta.get("model_name") or meta.get("model") or get_settings().OPENAI_CHAT_MODEL
+    LLM_CALLS.inc(prompt=prompt_name, model=model)
+    _charge(
+        prompt_name,
+        {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": usage.cached_tokens,
+            "cost_usd": cost_usd(model, usage),
+        },
+    )
+    if usage.prompt_tokens:
+        # Provider-side prompt prefix cache
+        (CACHE_HITS if usage.cached_tokens else CACHE_MISSES).inc(cache="prompt_prefix")
+    logger.debug(
+        "LLM usage | prompt=%s prompt_tokens=%d cached_tokens=%d completion_tokens=%d",
+        prompt_name,
+        usage.prompt_tokens,
+        usage.cached_tokens,
+        usage.completion_tokens,
+    )
+    return usage
+
+
+def record_embedding_usage(model: str, tokens: int) -> None:
+    """
+    Record the input tokens of one embeddings request (prompt name "embeddings").
+    """
+    if tokens <= 0:
+        return
+    with _lock:
+        _totals.setdefault("embeddings", TokenUsage()).prompt_tokens += tokens
+    LLM_TOKENS.inc(tokens, prompt="embeddings", kind="prompt")
+    _charge(
+        "embeddings",
+        {"embedding_tokens": tokens, "cost_usd": cost_usd(model, TokenUsage(prompt_tokens=tokens))},
+    )
+
+
+def usage_totals() -> Dict[str, Dict[str, int]]:
+    """
+    Snapshot of process-wide usage per prompt name.
+    """
+    with _lock:
+        return {name: asdict(u) for name, u in _totals.items()}
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds: 1ms .. 60s (LLM calls dominate the upper range).
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        # Hot path (called per observation): avoid generator overhead.
+        return tuple([labels.get(n, "") for n in self.labelnames])
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, key)} {v:g}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, key)} {v:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[idx] += 1
+            self._sums[key] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            snapshot = [(k, list(c), self._sums[k]) for k, c in sorted(self._counts.items())]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = _label_str(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            inf = _label_str(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Minimal in-process metrics registry rendered in Prometheus text format.
+    Values are per process; with multiple workers, scrape each worker.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets=buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "assistant_stage_latency_seconds", "Latency of request stages", ("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "assistant_stage_errors_total", "Exceptions raised inside request stages", ("stage",)
+)
+REQUESTS = REGISTRY.counter(
+    "assistant_requests_total", "Agent requests by selected tool", ("tool",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "assistant_llm_tokens_total", "LLM tokens by prompt and kind (prompt/completion/cached)", ("prompt", "kind")
+)
+CACHE_HITS = REGISTRY.counter(
+    "assistant_cache_hits_total", "Cache hits by cache name", ("cache",)
+)
+CACHE_MISSES = REGISTRY.counter(
+    "assistant_cache_misses_total", "Cache misses by cache name", ("cache",)
+)
+LIMITER_LIMIT = REGISTRY.gauge(
+    "assistant_limiter_limit", "Current adaptive concurrency limit", ("limiter",)
+)
+LIMITER_IN_FLIGHT = REGISTRY.gauge(
+    "assistant_limiter_in_flight", "Upstream calls currently holding a slot", ("limiter",)
+)
+LIMITER_QUEUED = REGISTRY.gauge(
+    "assistant_limiter_queued", "Calls waiting for a slot", ("limiter",)
+)
+LIMITER_SHED = REGISTRY.counter(
+    "assistant_limiter_shed_total", "Calls rejected by the limiter (queue_full/queue_timeout/evicted)", ("limiter", "reason")
+)
+LIMITER_OVERLOAD_SIGNALS = REGISTRY.counter(
+    "assistant_limiter_overload_signals_total", "Upstream 429s/timeouts seen by the limiter", ("limiter",)
+)
+DEGRADATIONS = REGISTRY.counter(
+    "assistant_degradations_total", "Responses served with a degraded stage (deadline/overload fallbacks)", ("kind",)
+)
+INDEX_FRESHNESS = REGISTRY.histogram(
+    "assistant_index_freshness_seconds",
+    "Corpus file written (or removed) to searchable in this process, for directory watcher updates",
+    buckets=(1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+SESSIONS = REGISTRY.gauge("assistant_sessions", "Live conversation sessions in this process")
+SESSION_BYTES = REGISTRY.gauge("assistant_session_bytes", "Memory held by conversation sessions in this process")
+SESSION_EVICTIONS = REGISTRY.counter(
+    "assistant_session_evictions_total", "Sessions dropped (ttl/capacity)", ("reason",)
+)
+FOLLOW_UPS = REGISTRY.counter(
+    "assistant_follow_ups_total", "Session follow-up questions by handling (reuse/rewrite)", ("kind",)
+)
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "assistant_log_records_dropped_total", "Log records not written (sampled/queue_full)", ("reason",)
+)
+USAGE_TOKENS = REGISTRY.counter(
+    "assistant_usage_tokens_total",
+    "LLM and embedding tokens by tenant, tool and kind (prompt/completion/cached/embedding)",
+    ("tenant", "tool", "kind"),
+)
+USAGE_COST = REGISTRY.counter(
+    "assistant_usage_cost_usd_total", "Estimated LLM and embedding cost (USD) by tenant and tool", ("tenant", "tool")
+)
+BUDGET_ACTIONS = REGISTRY.counter(
+    "assistant_budget_actions_total", "Requests downgraded or rejected by a tenant's daily budget", ("tenant", "action")
+)
+LLM_CALLS = REGISTRY.counter(
+    "assistant_llm_calls_total", "Chat completions by prompt and model", ("prompt", "model")
+)
+LLM_USAGE_ESTIMATED = REGISTRY.counter(
+    "assistant_llm_usage_estimated_total",
+    "Chat completions whose token usage was estimated from text (stream closed before its usage chunk)",
+    ("prompt",),
+)
+MODEL_ESCALATIONS = REGISTRY.counter(
+    "assistant_model_escalations_total",
+    "Q&A answers generated on the large tier (weak_retrieval/dont_know)",
+    ("reason",),
+)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLog:
+    """
+    Append-only JSONL log of API payloads, one line per request:
+      {"ts": <unix seconds>, "endpoint": "/ask", "request_id": "...", "payload": {...}}
+
+    This is the input format of benchmarks/replay.py.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._fh = self.path.open("a", encoding="utf-8")
+
+    def write(self, endpoint: str, payload: Dict[str, Any], request_id: str) -> None:
+        line = json.dumps(
+            {"ts": round(time.time(), 3), "endpoint": endpoint, "request_id": request_id, "payload": payload},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._fh.write(line + "\n")
+            self._fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+_request_log: Optional[RequestLog] = None
+_disabled = False
+_lock = threading.Lock()
+
+
+def get_request_log() -> Optional[RequestLog]:
+    """
+    Shared request log, or None when REQUEST_LOG_PATH is not set or cannot be
+    opened (the failure is logged once and request logging stays off).
+    """
+    global _request_log, _disabled
+    path = get_settings().REQUEST_LOG_PATH
+    if path is None or _disabled:
+        return None
+    if _request_log is None:
+        with _lock:
+            if _request_log is None and not _disabled:
+                try:
+                    _request_log = RequestLog(path)
+                except OSError as e:
+                    _disabled = True
+                    logger.warning("Request log disabled, cannot open %s: %s", path, e)
+                    return None
+                logger.info("Logging request payloads to %s", path)
+    return _request_log
+
+
+def log_request(endpoint: str, payload: Dict[str, Any], request_id: str) -> None:
+    """
+    Record one request payload if request logging is enabled.
+    Never raises: logging must not fail the request.
+    """
+    log = get_request_log()
+    if log is None:
+        return
+    try:
+        log.write(endpoint, payload, request_id)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Request log write failed: %s", e)
@@ -3,8 +3,11 @@ from __future__ import annotations
 import time
 import uuid
 from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Dict, Iterator, Optional
+from typing import Any, Dict, Iterator, Optional
+
+from app.utils.metrics import STAGE_ERRORS, STAGE_LATENCY
 
 
 @dataclass
@@ -13,10 +16,14 @@ class TraceRecord:
     start_ts: float
     end_ts: Optional[float] = None
     spans: Dict[str, float] = None
+    # Request attributes for the per-request log line (tool, token counts, ...).
+    fields: Dict[str, Any] = None
 
     def __post_init__(self):
         if self.spans is None:
             self.spans = {}
+        if self.fields is None:
+            self.fields = {}
 
     @property
     def duration_ms(self) -> Optional[float]:
@@ -24,6 +31,18 @@ class TraceRecord:
             return None
         return (self.end_ts - self.start_ts) * 1000.0
 
+    def server_timing(self) -> str:
+        """
+        Spans formatted for the Server-Timing response header.
+        """
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.spans.items()]
+        if self.duration_ms is not None:
+            parts.append(f"total;dur={self.duration_ms:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[TraceRecord]] = ContextVar("current_trace", default=None)
+
 
 def new_request_id() -> str:
     return str(uuid.uuid4())
@@ -45,6 +64,62 @@ def trace_span(record: TraceRecord, name: str) -> Iterator[None]:
         record.spans[name] = (time.time() - t0) * 1000.0  # ms
 
 
+class span:
+    """
+    Time a stage of the current request.
+      - adds the duration to the active TraceRecord (if any)
+      - observes the stage latency histogram
+      - counts the stage error on exception
+    Repeated spans with the same name within a request are summed.
+
+    A plain class rather than @contextmanager: this runs several times per
+    request, and generator-based context managers cost noticeably more.
+    """
+
+    __slots__ = ("name", "_t0")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._t0 = 0.0
+
+    def __enter__(self) -> "span":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._t0
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.name)
+        STAGE_LATENCY.observe(elapsed, stage=self.name)
+        record = _current_trace.get()
+        if record is not None:
+            record.spans[self.name] = record.spans.get(self.name, 0.0) + elapsed * 1000.0
+
+
+def current_trace() -> Optional[TraceRecord]:
+    return _current_trace.get()
+
+
+def annotate(**fields: Any) -> None:
+    """
+    Set fields on the current request's TraceRecord (no-op outside a request).
+    """
+    record = _current_trace.get()
+    if record is not None:
+        record.fields.update(fields)
+
+
+def add_counts(**counts: int) -> None:
+    """
+    Add to numeric fields of the current request, e.g. token counts summed
+    over the LLM calls of one request.
+    """
+    record = _current_trace.get()
+    if record is not None:
+        for name, n in counts.items():
+            record.fields[name] = record.fields.get(name, 0) + n
+
+
 def start_trace(request_id: Optional[str] = None) -> TraceRecord:
     return TraceRecord(request_id=request_id or new_request_id(), start_ts=time.time())
 
@@ -52,3 +127,23 @@ def start_trace(request_id: Optional[str] = None) -> TraceRecord:
 def end_trace(record: TraceRecord) -> TraceRecord:
     record.end_ts = time.time()
     return record
+
+
+@contextmanager
+def request_trace(request_id: Optional[str] = None) -> Iterator[TraceRecord]:
+    """
+    Bind a TraceRecord to the current context for the duration of a request.
+    Nested calls reuse the outer record (e.g. API middleware -> AIAgent.run).
+    """
+    existing = _current_trace.get()
+    if existing is not None:
+        yield existing
+        return
+
+    record = start_trace(request_id)
+    token = _current_trace.set(record)
+    try:
+        yield record
+    finally:
+        end_trace(record)
+        _current_trace.reset(token)
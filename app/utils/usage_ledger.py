@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.config import get_settings
+from app.utils.metrics import BUDGET_ACTIONS, USAGE_COST, USAGE_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Per-request / per-tool counters, in the order they are stored.
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "embedding_tokens", "cost_usd")
+# Tenant charged for calls made outside an API request (ingestion, warm-up, scripts).
+INTERNAL_TENANT = "internal"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    tenant TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    embedding_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, tenant, tool)
+)
+"""
+
+Key = Tuple[str, str, str]  # (day, tenant, tool)
+
+# Who calls made outside a request are charged to, e.g. ("internal", "ingestion").
+_scope: ContextVar[Optional[Tuple[str, str]]] = ContextVar("usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope(tool: str, tenant: str = INTERNAL_TENANT) -> Iterator[None]:
+    """
+    Charge LLM/embedding calls made outside an API request to `tool`
+    (default: the prompt name, or "embeddings").
+    """
+    token = _scope.set((tenant, tool))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> Optional[Tuple[str, str]]:
+    return _scope.get()
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _seconds_to_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return max(1.0, (midnight - now).total_seconds())
+
+
+class BudgetExceeded(RuntimeError):
+    """
+    A tenant has spent its daily budget (BUDGET_ACTION=reject, or the
+    request has no cheaper path).
+    """
+
+    def __init__(self, tenant: str, spent_usd: float, budget_usd: float):
+        super().__init__(f"Daily budget of {budget_usd:g} USD used up for tenant {tenant!r} ({spent_usd:.4f} USD)")
+        self.tenant = tenant
+        self.spent_usd = spent_usd
+        self.budget_usd = budget_usd
+        self.retry_after_s = _seconds_to_midnight()
+
+
+class UsageLedger:
+    """
+    Token and cost totals per (UTC day, tenant, tool).
+
+    Charges accumulate in memory and a background thread adds them to a
+    SQLite file every flush_s (workers share the file, so budgets see the
+    spend of all of them, at most flush_s late) and rewrites the day's
+    rollup <dir>/<YYYY-MM-DD>.json.
+    """
+
+    def __init__(self, directory: Path, *, flush_s: float = 5.0):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.dir / "usage.sqlite"
+        self.flush_s = flush_s
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Key, Dict[str, float]] = {}
+        self._inflight: Dict[Key, Dict[str, float]] = {}
+        self._spent: Dict[Tuple[str, str], float] = {}  # (day, tenant) -> flushed cost
+        self._stop = threading.Event()
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+        self._refresh_spent(_today())
+        self._thread = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(str(self.db_path), timeout=10.0)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db:  # commit on success
+                yield db
+        finally:
+            db.close()
+
+    def charge(self, tenant: str, tool: str, counts: Dict[str, Any], *, requests: int = 0) -> None:
+        """
+        Add one request's (or one call's) counts; keys outside USAGE_FIELDS are ignored.
+        """
+        values = {f: counts.get(f) or 0 for f in USAGE_FIELDS}
+        if not requests and not any(values.values()):
+            return
+        key = (_today(), tenant, tool)
+        with self._lock:
+            row = self._pending.get(key)
+            if row is None:
+                row = self._pending[key] = dict.fromkeys(("requests",) + USAGE_FIELDS, 0)
+            row["requests"] += requests
+            for f, v in values.items():
+                row[f] += v
+        for f in ("prompt_tokens", "completion_tokens", "cached_tokens", "embedding_tokens"):
+            if values[f]:
+                USAGE_TOKENS.inc(values[f], tenant=tenant, tool=tool, kind=f[: -len("_tokens")])
+        if values["cost_usd"]:
+            USAGE_COST.inc(values["cost_usd"], tenant=tenant, tool=tool)
+
+    def spent(self, tenant: str, day: Optional[str] = None) -> float:
+        """
+        Cost charged to `tenant` on `day` (default today) by all workers.
+        """
+        day = day or _today()
+        with self._lock:
+            total = self._spent.get((day, tenant), 0.0)
+            for rows in (self._pending, self._inflight):
+                total += sum(r["cost_usd"] for (d, t, _), r in rows.items() if d == day and t == tenant)
+        return total
+
+    def check(self, tenant: str, *, can_downgrade: bool = True) -> bool:
+        """
+        True when the request should take its cheap path (tenant over budget,
+        BUDGET_ACTION=downgrade); raises BudgetExceeded when it should be
+        rejected; False otherwise.
+        """
+        s = get_settings()
+        budget = s.TENANT_BUDGETS_USD.get(tenant, s.TENANT_DAILY_BUDGET_USD)
+        if budget is None:
+            return False
+        spent = self.spent(tenant)
+        if spent < budget:
+            return False
+        if s.BUDGET_ACTION == "downgrade" and can_downgrade:
+            BUDGET_ACTIONS.inc(tenant=tenant, action="downgrade")
+            return True
+        BUDGET_ACTIONS.inc(tenant=tenant, action="reject")
+        raise BudgetExceeded(tenant, spent, budget)
+
+    def flush(self) -> None:
+        """
+        Add pending charges to the SQLite file and rewrite the rollups of the
+        days they touch.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+            try:
+                if pending:
+                    cols = ("requests",) + USAGE_FIELDS
+                    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in cols)
+                    with self._connect() as db:
+                        db.executemany(
+                            f"INSERT INTO usage (day, tenant, tool, {', '.join(cols)}) "
+                            f"VALUES (?, ?, ?, {', '.join('?' * len(cols))}) "
+                            f"ON CONFLICT (day, tenant, tool) DO UPDATE SET {updates}",
+                            [key + tuple(row[c] for c in cols) for key, row in pending.items()],
+                        )
+            except sqlite3.Error as e:
+                logger.warning("Usage ledger flush failed, keeping %d row(s) for the next one: %s", len(pending), e)
+                with self._lock:
+                    for key, row in pending.items():
+                        merged = self._pending.setdefault(key, dict.fromkeys(row, 0))
+                        for c, v in row.items():
+                            merged[c] += v
+                    self._inflight = {}
+                return
+            try:
+                for day in sorted({d for d, _, _ in pending}):
+                    self._write_rollup(day)
+                self._refresh_spent(_today())
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Usage rollup update failed: %s", e)
+            finally:
+                with self._lock:
+                    self._inflight = {}
+
+    def _refresh_spent(self, day: str) -> None:
+        with self._connect() as db:
+            rows = db.execute("SELECT tenant, SUM(cost_usd) FROM usage WHERE day = ? GROUP BY tenant", (day,)).fetchall()
+        with self._lock:
+            self._spent = {(day, tenant): float(cost) for tenant, cost in rows}
+
+    def rollup(self, day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Flushed totals of one day: per tenant, with a per-tool breakdown.
+        """
+        day = day or _today()
+        cols = ("requests",) + USAGE_FIELDS
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT tenant, tool, {', '.join(cols)} FROM usage WHERE day = ? ORDER BY tenant, tool", (day,)
+            ).fetchall()
+        tenants: Dict[str, Any] = {}
+        for tenant, tool, *values in rows:
+            entry = tenants.setdefault(tenant, {"total": dict.fromkeys(cols, 0), "tools": {}})
+            entry["tools"][tool] = dict(zip(cols, values))
+            for c, v in zip(cols, values):
+                entry["total"][c] += v
+        for entry in tenants.values():
+            for row in (entry["total"], *entry["tools"].values()):
+                row["cost_usd"] = round(row["cost_usd"], 8)
+        return {"day": day, "tenants": tenants}
+
+    def _write_rollup(self, day: str) -> None:
+        path = self.dir / f"{day}.json"
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.rollup(day), indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_s):
+            self.flush()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+_ledger: Optional[UsageLedger] = None
+_lock = threading.Lock()
+
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    """
+    Process-wide ledger, or None when USAGE_ENABLED is off.
+    """
+    global _ledger
+    s = get_settings()
+    if not s.USAGE_ENABLED:
+        return None
+    if _ledger is None:
+        with _lock:
+            if _ledger is None:
+                _ledger = UsageLedger(s.USAGE_DIR, flush_s=s.USAGE_FLUSH_S)
+                atexit.register(_ledger.close)
+    return _ledger
+
+
+def _forget_after_fork() -> None:
+    # The parent keeps (and flushes) its own pending charges; the child
+    # starts an empty ledger with its own flush thread on first use.
+    global _ledger, _lock
+    if _ledger is not None:
+        # The inherited copy must not flush the parent's charges again at exit.
+        _ledger._pending = {}
+        _ledger._stop.set()
+    _ledger = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+def charge(tenant: str, tool: str, counts: Dict[str, Any], *, requests: int = 0) -> None:
+    """
+    Charge counts to (tenant, tool) if usage accounting is on. Never raises.
+    """
+    try:
+        ledger = get_usage_ledger()
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Usage ledger unavailable: %s", e)
+        return
+    if ledger is not None:
+        ledger.charge(tenant, tool, counts, requests=requests)
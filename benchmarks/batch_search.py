@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import run_metadata, save_results
+from benchmarks.run import _synthetic_store
+
+
+def _qps(fn: Callable[[], Any], queries: int, repeat: int) -> float:
+    fn()  # warm up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round(queries * repeat / (time.perf_counter() - t0), 1)
+
+
+def _compare(store, queries: List[List[float]], k: int, repeat: int) -> Dict[str, Any]:
+    import numpy as np
+
+    from app.retriever.batch import BatchSearcher
+
+    matrix = np.asarray(queries, dtype=np.float32)
+    searcher = BatchSearcher(store)
+    n = len(queries)
+
+    def _loop():
+        return [store.similarity_search_with_score_by_vector(q, k=k) for q in queries]
+
+    def _batch_ids():
+        return searcher.search(matrix, k)
+
+    def _batch_docs():
+        result = searcher.search(matrix, k)
+        return [result.hits(row) for row in range(n)]
+
+    # Same neighbours as the per-query path (ties aside).
+    looped = _loop()
+    result = searcher.search(matrix, k)
+    agree = float(
+        np.mean([
+            [d.metadata["chunk_id"] for d, _ in hits] == [d.metadata["chunk_id"] for d, _ in result.hits(row)]
+            for row, hits in enumerate(looped)
+        ])
+    )
+    out = {
+        "queries": n,
+        "loop_qps": _qps(_loop, n, repeat),
+        "batch_ids_qps": _qps(_batch_ids, n, repeat),
+        "batch_with_documents_qps": _qps(_batch_docs, n, repeat),
+        "same_results": round(agree, 4),
+    }
+    out["speedup_ids"] = round(out["batch_ids_qps"] / out["loop_qps"], 1)
+    out["speedup_documents"] = round(out["batch_with_documents_qps"] / out["loop_qps"], 1)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch search (BatchSearcher) vs the per-query LangChain path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--shards", type=int, default=4, help="also measure a hash-sharded store of this many shards (0 = skip)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from app.retriever.sharded import ShardedFAISS
+
+    results: Dict[str, Any] = {"meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()})}
+    rng = np.random.default_rng(1)
+    for n in args.sizes:
+        store, base = _synthetic_store(n, args.dim)
+        # More queries than the helper's 256, jittered around them.
+        q = np.asarray(base, dtype=np.float32)[rng.integers(0, len(base), args.queries)]
+        q += 0.05 * rng.standard_normal(q.shape).astype(np.float32)
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+        queries = q.tolist()
+
+        row: Dict[str, Any] = {"flat": _compare(store, queries, args.top_k, args.repeat)}
+        if args.shards > 1:
+            parts = {f"part_{i:03d}": _synthetic_store(n // args.shards, args.dim, seed=i)[0] for i in range(args.shards)}
+            row["sharded"] = _compare(ShardedFAISS(parts), queries, args.top_k, args.repeat)
+        results[str(n)] = row
+        for kind, r in row.items():
+            print(
+                f"  n={n} {kind:<8} loop {r['loop_qps']} QPS | batch ids {r['batch_ids_qps']} QPS ({r['speedup_ids']}x) | "
+                f"batch + documents {r['batch_with_documents_qps']} QPS ({r['speedup_documents']}x) | same results {r['same_results']}"
+            )
+        del store
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    ok = all(r["speedup_ids"] > 1.0 and r["same_results"] >= 0.99 for row in results.values() if isinstance(row, dict) and "flat" in row for r in row.values())
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import uvicorn
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99/mean/max of latency samples (ms), nearest-rank.
+    """
+    if not samples_ms:
+        return {"count": 0}
+    xs = sorted(samples_ms)
+    n = len(xs)
+
+    def _p(q: float) -> float:
+        return xs[min(n - 1, max(0, int(round(q * n + 0.5)) - 1))]
+
+    return {
+        "count": n,
+        "p50_ms": round(_p(0.50), 3),
+        "p95_ms": round(_p(0.95), 3),
+        "p99_ms": round(_p(0.99), 3),
+        "mean_ms": round(sum(xs) / n, 3),
+        "max_ms": round(xs[-1], 3),
+    }
+
+
+def rss_mb(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Resident memory of a process from /proc (Linux). PSS counts shared pages
+    proportionally, which is the honest number for forked workers.
+    """
+    base = Path(f"/proc/{pid or 'self'}")
+    out: Dict[str, float] = {}
+    try:
+        for line in (base / "status").read_text().splitlines():
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, val = line.split(":", 1)
+                out[key.lower() + "_mb"] = round(int(val.split()[0]) / 1024.0, 1)
+        rollup = base / "smaps_rollup"
+        if rollup.exists():
+            for line in rollup.read_text().splitlines():
+                if line.startswith("Pss:"):
+                    out["pss_mb"] = round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return out
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerThread:
+    """
+    Run an ASGI app with uvicorn in a background thread (context manager).
+    """
+
+    def __init__(self, app: Any, *, host: str = "127.0.0.1", port: Optional[int] = None):
+        self.host = host
+        self.port = port or free_port()
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=self.port, log_level="warning", access_log=False)
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self) -> "ServerThread":
+        self._thread.start()
+        deadline = time.time() + 30
+        while not self._server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def git_sha() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_metadata(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "git_sha": git_sha(),
+        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": args,
+    }
+
+
+def save_results(results: Dict[str, Any], out: Optional[Path] = None) -> Path:
+    if out is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out = RESULTS_DIR / f"{stamp}-{results['meta']['git_sha']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    return out
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Leaf metric name -> True when higher is better.
+HIGHER_IS_BETTER = {
+    "chunks_per_s": True,
+    "qps_serial": True,
+    "qps_threads": True,
+    "throughput_rps": True,
+    "seconds": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "mean_ms": False,
+    "vmrss_mb": False,
+    "vmhwm_mb": False,
+    "pss_mb": False,
+}
+
+
+def _flatten(obj: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from _flatten(v, f"{prefix}.{k}" if prefix else str(k))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix, float(obj)
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Rows for every tracked metric present in both runs.
+    `regression` is set when head is worse than base by more than `threshold` (fraction).
+    """
+    a = dict(_flatten(base.get("scenarios", {})))
+    b = dict(_flatten(head.get("scenarios", {})))
+    rows: List[Dict[str, Any]] = []
+    for key in sorted(a.keys() & b.keys()):
+        leaf = key.rsplit(".", 1)[-1]
+        if leaf not in HIGHER_IS_BETTER:
+            continue
+        old, new = a[key], b[key]
+        change = (new - old) / old if old else 0.0
+        worse = -change if HIGHER_IS_BETTER[leaf] else change
+        rows.append(
+            {
+                "metric": key,
+                "base": old,
+                "head": new,
+                "change_pct": round(change * 100.0, 1),
+                "regression": worse > threshold,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (fraction), default 0.10")
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    head = json.loads(args.head.read_text(encoding="utf-8"))
+    rows = compare(base, head, args.threshold)
+
+    print(f"base {base['meta']['git_sha']}  ->  head {head['meta']['git_sha']}  (threshold {args.threshold:.0%})")
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:<45} {r['base']:>12.2f} {r['head']:>12.2f} {r['change_pct']:>+8.1f}%  {flag}")
+
+    regressions = [r for r in rows if r["regression"]]
+    print(f"\n{len(rows)} metrics compared, {len(regressions)} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import ServerThread, percentiles, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import ASK_QUERIES, SUMMARIZE_TEXTS, _configure_env, _ensure_index, _prepare_workspace
+
+
+def _drive(url: str, path: str, concurrency: int, total: int, deadline_ms: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    degradations: Counter = Counter()
+    lock = threading.Lock()
+
+    def _payload(i: int) -> Dict[str, Any]:
+        if path == "/ask":
+            return {"query": ASK_QUERIES[i % len(ASK_QUERIES)], "top_k": 5, "deadline_ms": deadline_ms}
+        return {"issue_text": SUMMARIZE_TEXTS[i % len(SUMMARIZE_TEXTS)], "deadline_ms": deadline_ms}
+
+    def _worker(worker_id: int) -> None:
+        with httpx.Client(base_url=url, timeout=60.0) as client:
+            for i in range(worker_id, total, concurrency):
+                t = time.perf_counter()
+                r = client.post(path, json=_payload(i))
+                ms = (time.perf_counter() - t) * 1000.0
+                with lock:
+                    latencies.append(ms)
+                    statuses[str(r.status_code)] += 1
+                    if r.status_code == 200:
+                        applied = r.json().get("degradations") or ["none"]
+                        degradations.update(applied)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_worker, range(concurrency)))
+    return {
+        "latency": percentiles(latencies),
+        "status_counts": dict(statuses),
+        "degradations": dict(degradations),
+    }
+
+
+def _in_flight() -> Dict[str, int]:
+    """
+    Upstream calls still holding a limiter slot. Every response has been
+    sent, so anything left is a call that outlived its request.
+    """
+    from app.core.limiter import get_limiter
+
+    return {name: int(get_limiter(name).snapshot()["in_flight"]) for name in ("chat", "embeddings")}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that /ask and /summarize latency stays within the request deadline under upstream spikes"
+    )
+    parser.add_argument("--deadline-ms", type=int, default=1500)
+    parser.add_argument("--slack-ms", type=float, default=300.0, help="allowed p99 overrun (HTTP + serialisation)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--spike-prob", type=float, default=0.3)
+    parser.add_argument("--spike-ms", type=float, default=5000.0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+        "scenarios": {},
+    }
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-deadline-"))
+    try:
+        _prepare_workspace(workspace, 1)
+        fake_app = create_app(FakeOpenAIConfig())
+        with ServerThread(fake_app) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            _ensure_index()
+            fake_app.state.config = FakeOpenAIConfig(spike_prob=args.spike_prob, spike_ms=args.spike_ms)
+
+            from app.main import app
+
+            with ServerThread(app) as api:
+                for path in ("/ask", "/summarize"):
+                    run = _drive(api.url, path, args.concurrency, args.requests, args.deadline_ms)
+                    run["in_flight_after"] = _in_flight()
+                    results["scenarios"][path.strip("/")] = run
+                    print(
+                        f"[{path}] {run['latency']} status={run['status_counts']} "
+                        f"degradations={run['degradations']} in-flight after={run['in_flight_after']}"
+                    )
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+    bound = args.deadline_ms + args.slack_ms
+    over = {k: v["latency"]["p99_ms"] for k, v in results["scenarios"].items() if v["latency"]["p99_ms"] > bound}
+    leaked = {k: v["in_flight_after"] for k, v in results["scenarios"].items() if any(v["in_flight_after"].values())}
+    if over:
+        print(f"FAIL: p99 above deadline + slack ({bound:.0f} ms): {over}")
+    if leaked:
+        print(f"FAIL: upstream calls still in flight after their requests returned: {leaked}")
+    if over or leaked:
+        sys.exit(1)
+    print(f"OK: p99 within deadline + slack ({bound:.0f} ms), no upstream call outlived its request")
+
+
+if __name__ == "__main__":
+    main()
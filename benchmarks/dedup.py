@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.ingestion.records import parse_feedback_records
+from benchmarks.common import ServerThread, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import REPO_ROOT, _configure_env
+
+# Feedback-style questions; each should surface several distinct complaints.
+FEEDBACK_QUERIES = [
+    "upload gets stuck at 99%",
+    "search results for acronyms are wrong",
+    "images broken in document preview",
+    "search results pagination goes back to page 1",
+    "not receiving email notifications",
+    "annotations are not saved",
+    "sharing documents with external users fails",
+    "app crashes on my phone",
+    "offline mode does not work",
+    "deleting a document",
+    "the app is slow with many documents",
+    "error messages are not helpful",
+]
+
+_PREFIXES = ["Again: ", "Honestly, ", "Ugh. ", "FYI - "]
+_SUFFIXES = [" Please fix.", " Still happening.", " Same here!", " :("]
+
+
+def _variant(text: str, rng: random.Random) -> str:
+    """
+    Near-duplicate of a complaint: the kind of edits users make when they
+    report the same problem again.
+    """
+    kind = rng.choice(["prefix", "suffix", "typo", "case"])
+    if kind == "prefix":
+        return rng.choice(_PREFIXES) + text
+    if kind == "suffix":
+        return text + rng.choice(_SUFFIXES)
+    if kind == "typo":
+        i = rng.randrange(1, max(2, len(text) - 1))
+        return text[:i] + text[i + 1 :]
+    return text.lower().rstrip(".!?")
+
+
+def _write_corpus(data_dir: Path, dup_share: float, max_copies: int, seed: int) -> Dict[int, int]:
+    """
+    Bug reports as shipped; feedback with near-duplicates of `dup_share` of the
+    lines (1..max_copies each), shuffled. Returns feedback number -> original number.
+    """
+    rng = random.Random(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(REPO_ROOT / "data" / "ai_test_bug_report.txt", data_dir / "ai_test_bug_report.txt")
+
+    src = (REPO_ROOT / "data" / "ai_test_user_feedback.txt").read_text(encoding="utf-8")
+    originals = [(rec.number, rec.text) for rec in parse_feedback_records(src)]
+    lines = list(originals)
+    for number, text in originals:
+        if rng.random() < dup_share:
+            lines.extend((number, _variant(text, rng)) for _ in range(rng.randint(1, max_copies)))
+    rng.shuffle(lines)
+
+    origin: Dict[int, int] = {}
+    out = []
+    for i, (number, text) in enumerate(lines, start=1):
+        origin[i] = number
+        out.append(f"Feedback #{i}: {text}")
+    (data_dir / "ai_test_user_feedback.txt").write_text("\n".join(out) + "\n", encoding="utf-8")
+    return origin
+
+
+def _build(threshold: Optional[float], index_dir: Path) -> Dict[str, Any]:
+    """
+    Feedback index as the repo builds it: 900-char chunks (threshold None)
+    or one document per line with near-duplicates collapsed at `threshold`.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    from app.core.config import get_settings
+    from app.ingestion.dedup import deduplicate_feedback
+    from app.ingestion.embeddings import get_embeddings
+    from app.ingestion.loader import load_corpus
+    from app.ingestion.splitter import split_documents
+
+    corpus = load_corpus(get_settings().DATA_DIR, "ai_test_user_feedback")
+    docs = corpus.documents
+    stats: Dict[str, Any] = {}
+    if threshold is not None:
+        docs, stats = deduplicate_feedback(docs, threshold=threshold)
+    chunks = split_documents(docs)
+    store = FAISS.from_documents(chunks, get_embeddings())
+    store.save_local(str(index_dir))
+    return {
+        "store": store,
+        "vectors": store.index.ntotal,
+        "index_bytes": sum(p.stat().st_size for p in index_dir.iterdir()),
+        **{k: v for k, v in stats.items() if k != "threshold"},
+    }
+
+
+def _lines_shown(doc, origin: Dict[int, int]) -> List[int]:
+    """
+    Original complaint numbers of the feedback lines a retrieved document shows.
+    """
+    md = doc.metadata or {}
+    if md.get("record_id"):
+        return [origin[int(md["record_id"].split("_")[1])]]
+    return [origin[int(n)] for n in re.findall(r"Feedback #(\d+):", doc.page_content)]
+
+
+def _diversity(store, origin: Dict[int, int], queries: Sequence[str], top_k: int) -> Dict[str, float]:
+    """
+    Per query: distinct complaints among the feedback lines in top_k, and the
+    share of returned lines that repeat a complaint already shown.
+    """
+    distinct, shown = 0, 0
+    for q in queries:
+        lines = [n for doc in store.similarity_search(q, k=top_k) for n in _lines_shown(doc, origin)]
+        distinct += len(set(lines))
+        shown += len(lines)
+    n = len(queries)
+    return {
+        "lines_per_query": round(shown / n, 2),
+        "distinct_complaints_per_query": round(distinct / n, 2),
+        "duplicate_line_share": round(1 - distinct / shown, 3) if shown else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Feedback near-duplicate clustering: index size and top_k diversity before/after"
+    )
+    parser.add_argument("--dup-share", type=float, default=0.6, help="share of complaints that get near-duplicates")
+    parser.add_argument("--max-copies", type=int, default=4)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+        "scenarios": {},
+    }
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-dedup-"))
+    try:
+        origin = _write_corpus(workspace / "data", args.dup_share, args.max_copies, args.seed)
+        results["corpus"] = {"feedback_lines": len(origin), "distinct_complaints": len(set(origin.values()))}
+        with ServerThread(create_app(FakeOpenAIConfig())) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            configs = {
+                "chunked": None,  # what ingestion does without FEEDBACK_DEDUP_ENABLED
+                "per_line": 1.0,  # one document per line, exact duplicates only
+                "deduplicated": args.threshold,
+            }
+            for label, threshold in configs.items():
+                built = _build(threshold, workspace / f"index_{label}")
+                run = {k: v for k, v in built.items() if k != "store"}
+                run.update(_diversity(built["store"], origin, FEEDBACK_QUERIES, args.top_k))
+                results["scenarios"][label] = run
+                print(f"[{label}] {run}")
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    per_line, dedup = results["scenarios"]["per_line"], results["scenarios"]["deduplicated"]
+    results["index_size_reduction"] = round(1 - dedup["vectors"] / per_line["vectors"], 3)
+    print(f"Index size reduction vs one vector per line: {results['index_size_reduction']:.1%}")
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
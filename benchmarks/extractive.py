@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import percentiles, run_metadata, save_results
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# (field, question templates); {title} is the record title in lower case.
+FIELD_QUESTIONS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("Severity", ("What is the severity of the {title} bug?", "How severe is the {title} issue?")),
+    ("Environment", ("Which environment is affected by {title}?", "What platform and version show {title}?")),
+    ("Proposed Fix", ("What is the proposed fix for {title}?", "How should we fix {title}?")),
+]
+OPEN_QUESTIONS = [
+    "What do users say about mobile buttons?",
+    "Why are customers unhappy with search?",
+    "What problems do people have with notifications?",
+    "Is the app slow for anyone?",
+    "What feedback mentions security?",
+]
+
+
+def _index():
+    from langchain_community.vectorstores import FAISS
+
+    from app.ingestion.hash_embeddings import HashEmbeddings
+    from app.ingestion.loader import flatten_documents, load_all_corpora
+    from app.ingestion.splitter import split_documents
+
+    chunks = split_documents(flatten_documents(load_all_corpora(REPO_ROOT / "data")))
+    return FAISS.from_documents(chunks, HashEmbeddings())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and latency of extractive (no-LLM) Q&A answers")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.8, help="QA_EXTRACTIVE_MIN_CONFIDENCE")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    from app.ingestion.records import parse_bug_records
+    from app.tools.extractive import extract_answer
+
+    store = _index()
+    records = parse_bug_records((REPO_ROOT / "data" / "ai_test_bug_report.txt").read_text(encoding="utf-8"))
+
+    cases: List[Tuple[str, str, Any]] = []  # (question, field, record)
+    for rec in records:
+        for field, templates in FIELD_QUESTIONS:
+            for tpl in templates:
+                cases.append((tpl.format(title=rec.title.lower()), field, rec))
+
+    extract_ms: List[float] = []
+    total_ms: List[float] = []
+    correct = auto = auto_correct = 0
+    for question, field, rec in cases:
+        t0 = time.perf_counter()
+        docs = store.similarity_search(question, k=args.top_k)
+        t1 = time.perf_counter()
+        ext = extract_answer(question, docs)
+        t2 = time.perf_counter()
+        extract_ms.append((t2 - t1) * 1000.0)
+        total_ms.append((t2 - t0) * 1000.0)
+
+        value = " ".join(rec.get(field).split())
+        ok = ext.kind == "field" and f"Bug #{rec.number} " in ext.answer and value in ext.answer
+        correct += ok
+        if ext.confidence >= args.threshold:
+            auto += 1
+            auto_correct += ok
+
+    open_auto = 0
+    for question in OPEN_QUESTIONS:
+        docs = store.similarity_search(question, k=args.top_k)
+        open_auto += extract_answer(question, docs).confidence >= args.threshold
+
+    report: Dict[str, Any] = {
+        "field_questions": len(cases),
+        "field_accuracy": round(correct / len(cases), 3),
+        "auto_rate": round(auto / len(cases), 3),
+        "auto_precision": round(auto_correct / auto, 3) if auto else None,
+        "open_questions_auto": f"{open_auto}/{len(OPEN_QUESTIONS)}",
+        "extract_latency": percentiles(extract_ms),
+        "search_plus_extract_latency": percentiles(total_ms),
+    }
+    for k, v in report.items():
+        print(f"{k:<30} {v}")
+
+    path = save_results({"meta": run_metadata(vars(args) | {"out": str(args.out)}), "scenarios": {"extractive": report}}, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
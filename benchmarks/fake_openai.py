@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import time
+import uuid
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.ingestion.hash_embeddings import hash_embedding
+
+
+@dataclass
+class FakeOpenAIConfig:
+    """
+    Latency model of the stand-in:
+      embeddings: embed_latency_ms per request
+      chat:       ttft_ms + completion_tokens / tokens_per_s
+
+    Model tiers: model_latency_scale multiplies the chat latency of a model
+    (by requested name), and model_dont_know_rate is the share of Q&A
+    questions it declines ("I do not know ..."), picked by a hash of the
+    question so a replay sees the same ones each run.
+
+    Fault injection (both endpoints):
+      max_concurrency: requests beyond this many in flight get 429 (0 = unlimited)
+      rate_limit_prob: extra random 429s
+      spike_prob/spike_ms: random added latency
+    """
+    embed_latency_ms: float = 20.0
+    embed_dim: int = 1536
+    ttft_ms: float = 150.0
+    tokens_per_s: float = 100.0
+    answer_tokens: int = 60
+    max_concurrency: int = 0
+    rate_limit_prob: float = 0.0
+    spike_prob: float = 0.0
+    spike_ms: float = 0.0
+    retry_after_ms: int = 200
+    seed: int = 0
+    model_latency_scale: Dict[str, float] = field(default_factory=dict)
+    model_dont_know_rate: Dict[str, float] = field(default_factory=dict)
+
+
+def count_tokens(text: str) -> int:
+    # ~4 chars per token is close enough for English text and load modelling.
+    return max(1, len(text) // 4)
+
+
+def _content(message: Dict[str, Any]) -> str:
+    c = message.get("content") or ""
+    if isinstance(c, list):
+        return " ".join(p.get("text", "") for p in c if isinstance(p, dict))
+    return str(c)
+
+
+def _section(text: str, header: str) -> str:
+    m = re.search(rf"{re.escape(header)}:\n(.*?)(?:\n\n[A-Z][\w ]*:\n|\Z)", text, flags=re.S)
+    return m.group(1).strip() if m else text.strip()
+
+
+DONT_KNOW_ANSWER = "I do not know; the provided context does not contain the answer."
+
+
+def declines(model: str, question: str, rate: float) -> bool:
+    return rate > 0 and zlib.crc32(f"{model}\0{question}".encode()) / 0x100000000 < rate
+
+
+def fake_completion(
+    messages: List[Dict[str, Any]], answer_tokens: int, dont_know_rate: float = 0.0, model: str = ""
+) -> str:
+    """
+    Deterministic completion shaped like the real prompts expect.
+    """
+    system = next((_content(m) for m in messages if m.get("role") == "system"), "")
+    user = next((_content(m) for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if "routing agent" in system:
+        request = _section(user, "User request").lower()
+        tool = "issue_summary" if ("summar" in request or "สรุป" in request) else "internal_qa"
+        return json.dumps({"tool_selected": tool, "reasoning": f"Fake router picked {tool}."})
+
+    if "structured issue summary" in system:
+        issue = _section(user, "Issue text")
+        first = re.split(r"(?<=[.!?])\s", issue, maxsplit=1)[0][:200]
+        return json.dumps(
+            {
+                "reported_issues": [first],
+                "affected_components": ["Unknown component"],
+                "severity": "Medium",
+                "notes": "Generated by the fake OpenAI server.",
+            }
+        )
+
+    if declines(model, _section(user, "Question"), dont_know_rate):
+        return DONT_KNOW_ANSWER
+    context = _section(user, "Context")
+    words = re.findall(r"\S+", context) or ["unknown"]
+    return " ".join(words[i % len(words)] for i in range(answer_tokens))
+
+
+def create_app(config: FakeOpenAIConfig) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    app.state.config = config
+    app.state.stats = {
+        "embedding_requests": 0,
+        "embedding_inputs": 0,
+        "chat_requests": 0,
+        "chat_requests_by_model": {},
+        "rate_limited": 0,
+        "spikes": 0,
+        "max_in_flight": 0,
+    }
+    app.state.seen_prefixes = set()
+    app.state.in_flight = 0
+    rng = random.Random(config.seed)
+
+    def _rate_limited() -> JSONResponse:
+        app.state.stats["rate_limited"] += 1
+        cfg: FakeOpenAIConfig = app.state.config
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after-ms": str(cfg.retry_after_ms)},
+        )
+
+    def _admit() -> bool:
+        """
+        Count the request in flight, or refuse it (caller returns 429).
+        """
+        cfg: FakeOpenAIConfig = app.state.config
+        if cfg.max_concurrency and app.state.in_flight >= cfg.max_concurrency:
+            return False
+        if cfg.rate_limit_prob and rng.random() < cfg.rate_limit_prob:
+            return False
+        app.state.in_flight += 1
+        app.state.stats["max_in_flight"] = max(app.state.stats["max_in_flight"], app.state.in_flight)
+        return True
+
+    def _spike_s() -> float:
+        cfg: FakeOpenAIConfig = app.state.config
+        if cfg.spike_prob and rng.random() < cfg.spike_prob:
+            app.state.stats["spikes"] += 1
+            return cfg.spike_ms / 1000.0
+        return 0.0
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        cfg: FakeOpenAIConfig = app.state.config
+        inputs = body.get("input")
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = int(body.get("dimensions") or cfg.embed_dim)
+
+        if not _admit():
+            return _rate_limited()
+        try:
+            await asyncio.sleep(cfg.embed_latency_ms / 1000.0 + _spike_s())
+        finally:
+            app.state.in_flight -= 1
+        # LangChain sends pre-tokenized chunks (lists of token ids) by default;
+        # hashing the ids keeps embeddings deterministic and overlap-sensitive.
+        texts = [t if isinstance(t, str) else " ".join(map(str, t)) for t in inputs]
+        app.state.stats["embedding_requests"] += 1
+        app.state.stats["embedding_inputs"] += len(texts)
+
+        tokens = sum(count_tokens(t) for t in texts)
+        vectors = [hash_embedding(t, dim) for t in texts]
+        if body.get("encoding_format") == "base64":
+            # What the official client requests by default: float32 bytes, base64.
+            vectors = [base64.b64encode(np.asarray(v, dtype="<f4").tobytes()).decode() for v in vectors]
+        return {
+            "object": "list",
+            "model": body.get("model", "fake-embedding"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": v}
+                for i, v in enumerate(vectors)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        cfg: FakeOpenAIConfig = app.state.config
+        app.state.stats["chat_requests"] += 1
+
+        messages = body.get("messages", [])
+        model = body.get("model", "fake-chat")
+        by_model = app.state.stats["chat_requests_by_model"]
+        by_model[model] = by_model.get(model, 0) + 1
+        text = fake_completion(messages, cfg.answer_tokens, cfg.model_dont_know_rate.get(model, 0.0), model)
+        scale = cfg.model_latency_scale.get(model, 1.0)
+        prompt_tokens = sum(count_tokens(_content(m)) for m in messages)
+        completion_tokens = count_tokens(text)
+        # Prefix caching, simplified: a repeated system message counts as cached.
+        system = next((_content(m) for m in messages if m.get("role") == "system"), "")
+        cached_tokens = count_tokens(system) if system in app.state.seen_prefixes else 0
+        app.state.seen_prefixes.add(system)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not _admit():
+            return _rate_limited()
+        spike = _spike_s()
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(scale * (cfg.ttft_ms / 1000.0 + completion_tokens / cfg.tokens_per_s) + spike)
+            finally:
+                app.state.in_flight -= 1
+            return JSONResponse(
+                {
+                    "id": cid,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop",
+                            "logprobs": None,
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        pieces = [text[i : i + 4] for i in range(0, len(text), 4)]
+
+        async def _events():
+            try:
+                async for event in _stream():
+                    yield event
+            finally:
+                app.state.in_flight -= 1
+
+        async def _stream():
+            await asyncio.sleep(scale * cfg.ttft_ms / 1000.0 + spike)
+            for piece in pieces:
+                chunk = {
+                    "id": cid,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(scale / cfg.tokens_per_s)
+            done = {
+                "id": cid,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            if include_usage:
+                tail = {
+                    "id": cid,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }
+                yield f"data: {json.dumps(tail)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"config": asdict(app.state.config), **app.state.stats}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-dim", type=int, default=1536)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-s", type=float, default=100.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="429 above this many requests in flight")
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    parser.add_argument("--spike-prob", type=float, default=0.0)
+    parser.add_argument("--spike-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        embed_latency_ms=args.embed_latency_ms,
+        embed_dim=args.embed_dim,
+        ttft_ms=args.ttft_ms,
+        tokens_per_s=args.tokens_per_s,
+        answer_tokens=args.answer_tokens,
+        max_concurrency=args.max_concurrency,
+        rate_limit_prob=args.rate_limit_prob,
+        spike_prob=args.spike_prob,
+        spike_ms=args.spike_ms,
+    )
+    print(f"Fake OpenAI on http://{args.host}:{args.port}/v1  (set OPENAI_BASE_URL to this)")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import ServerThread, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import REPO_ROOT, _configure_env, _prepare_workspace
+
+
+def _bug_record(number: int, marker: str) -> str:
+    # Long enough to be its own chunk, so each record is cited on its own.
+    detail = " The request is retried by the client and the partial file is discarded each time." * 5
+    return (
+        f"Bug #{number}\n"
+        f"Title: {marker} export times out\n"
+        f"Description: Exporting the {marker} workspace report times out after 30 seconds for large teams.{detail}\n"
+        "Environment: Web, Reports v3.2\n"
+        "Severity: High\n"
+        "Proposed Fix: Stream the export instead of building it in memory.\n\n\n"
+    )
+
+
+def _visible(api: httpx.Client, marker: str) -> bool:
+    body = {"query": f"{marker} workspace report export times out", "top_k": 3, "answer_mode": "extractive"}
+    resp = api.post("/ask", json=body)
+    resp.raise_for_status()
+    citations = (resp.json().get("tool_output") or {}).get("citations") or []
+    return any(marker in (c.get("snippet") or "") for c in citations)
+
+
+def _wait(api: httpx.Client, marker: str, present: bool, timeout_s: float) -> Optional[float]:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if _visible(api, marker) == present:
+            return time.time()
+        time.sleep(0.2)
+    return None
+
+
+def _embedded(fake: ServerThread) -> int:
+    return httpx.get(f"{fake.url}/stats").json()["embedding_inputs"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File write -> searchable latency of the directory watcher (scripts.ingest --watch)")
+    parser.add_argument("--copies", type=int, default=20, help="corpus copies in DATA_DIR (index size)")
+    parser.add_argument("--trials", type=int, default=3, help="rounds of add / append / remove")
+    parser.add_argument("--debounce", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--target-s", type=float, default=60.0, help="fail if any change takes longer to become searchable")
+    parser.add_argument("--ingest-args", default="", help="extra scripts.ingest options for the base build, e.g. '--sharding source'")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+        "trials": [],
+    }
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-freshness-"))
+    data = workspace / "data"
+    watcher: Optional[subprocess.Popen] = None
+    try:
+        _prepare_workspace(workspace, args.copies)
+        # The watcher gets its own stub so its embedding inputs are counted apart from /ask queries.
+        with ServerThread(create_app(FakeOpenAIConfig(embed_latency_ms=5.0))) as fake_api, ServerThread(
+            create_app(FakeOpenAIConfig(embed_latency_ms=5.0))
+        ) as fake_watcher:
+            _configure_env(workspace, f"{fake_watcher.url}/v1")
+            t0 = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "scripts.ingest", *args.ingest_args.split()],
+                cwd=str(REPO_ROOT), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            base_chunks = _embedded(fake_watcher)
+            results["base_build"] = {"chunks_embedded": base_chunks, "seconds": round(time.perf_counter() - t0, 2)}
+            print(f"base build: {base_chunks} chunks embedded in {results['base_build']['seconds']} s")
+
+            watcher = subprocess.Popen(
+                [
+                    sys.executable, "-m", "scripts.ingest", "--watch",
+                    "--debounce", str(args.debounce), "--poll-interval", str(args.poll_interval),
+                ],
+                cwd=str(REPO_ROOT),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            os.environ["OPENAI_BASE_URL"] = f"{fake_api.url}/v1"
+            from app.main import app
+
+            with ServerThread(app) as server, httpx.Client(base_url=server.url, timeout=30.0) as api:
+                for trial in range(args.trials):
+                    marker = f"zephyrquartz{trial}"
+                    path = data / f"ai_test_bug_report.fresh{trial}.txt"
+                    appended = f"nimbuscobalt{trial}"
+                    steps = [
+                        ("add", marker, True, lambda: path.write_text(_bug_record(9000 + trial, marker), encoding="utf-8")),
+                        (
+                            "append",
+                            appended,
+                            True,
+                            lambda: path.write_text(
+                                _bug_record(9000 + trial, marker) + _bug_record(9500 + trial, appended), encoding="utf-8"
+                            ),
+                        ),
+                        ("remove", marker, False, path.unlink),
+                    ]
+                    for kind, word, present, change in steps:
+                        before = _embedded(fake_watcher)
+                        change()
+                        written = path.stat().st_mtime if path.exists() else time.time()
+                        seen = _wait(api, word, present, args.target_s * 2)
+                        row = {
+                            "trial": trial,
+                            "change": kind,
+                            "freshness_s": round(seen - written, 2) if seen is not None else None,
+                            "chunks_embedded": _embedded(fake_watcher) - before,
+                        }
+                        results["trials"].append(row)
+                        print(f"  {kind:<7} searchable after {row['freshness_s']} s, {row['chunks_embedded']} chunks embedded")
+                metrics = api.get("/metrics").text
+                results["freshness_metric"] = [
+                    line for line in metrics.splitlines() if line.startswith("assistant_index_freshness_seconds_")
+                ][-2:]
+    finally:
+        if watcher is not None:
+            watcher.send_signal(signal.SIGINT)
+            try:
+                watcher.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                watcher.kill()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    times = [r["freshness_s"] for r in results["trials"]]
+    worst = max((t for t in times if t is not None), default=None)
+    embedded = max(r["chunks_embedded"] for r in results["trials"])
+    results["summary"] = {
+        "max_freshness_s": worst,
+        "mean_freshness_s": round(sum(t for t in times if t is not None) / max(1, len(times)), 2),
+        "max_chunks_embedded_per_change": embedded,
+        "base_chunks": base_chunks,
+    }
+    print(f"freshness: max {worst} s (target {args.target_s} s); at most {embedded} of {base_chunks} chunks re-embedded per change")
+    print("\n".join(results.get("freshness_metric", [])))
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    ok = None not in times and worst <= args.target_s and embedded < base_chunks
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
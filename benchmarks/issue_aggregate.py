@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import percentiles, run_metadata, save_results
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Aggregate questions the store should answer.
+POSITIVE = [
+    "Show all issues affecting mobile",
+    "How many Medium bugs on mobile?",
+    "List all High issues",
+    "How many high-severity bugs are there?",
+    "Show bugs with severity Low",
+    "List all Medium issues affecting search",
+]
+# Ordinary questions that must go to routing and retrieval instead.
+NEGATIVE = [
+    "Which issues did users report about the upload being stuck at 99%?",
+    "Is the login bug high priority?",
+    "What is the severity of Bug #7?",
+    "Is Bug #7 a high severity issue?",
+    "Show the bug that breaks search",
+    "Is there a high priority problem with email notifications?",
+    "What high priority problems affect login?",
+    "Are all high issues about the login bug fixed?",
+    "Which bugs affect search?",
+    "How many issues are there?",
+]
+
+
+def _build_store(storage_dir: Path) -> int:
+    from app.ingestion.build_summaries import build_issue_summaries
+    from app.ingestion.loader import load_all_corpora
+
+    corpora = load_all_corpora(REPO_ROOT / "data")
+    bug_docs = next((c.documents for c in corpora if c.name == "ai_test_bug_report"), None)
+    if bug_docs is None:
+        raise RuntimeError(f"No ai_test_bug_report corpus in {REPO_ROOT / 'data'}")
+    stats = build_issue_summaries(bug_docs, mode="fields", out_path=storage_dir / "issue_summaries.json")
+    return int(stats.get("records", 0))
+
+
+def _run(questions: List[str]) -> Dict[str, Any]:
+    from app.tools.issue_aggregate_tool import issue_aggregate_tool
+
+    answered: Dict[str, str] = {}
+    latencies: List[float] = []
+    for q in questions:
+        t0 = time.perf_counter()
+        out = issue_aggregate_tool(q)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        if out is not None:
+            answered[q] = out.answer
+    return {"answered": answered, "latency": percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Which questions the issue-summary store answers as aggregates (and which it must leave alone)"
+    )
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"meta": run_metadata({"out": str(args.out) if args.out else None})}
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-aggregate-"))
+    try:
+        os.environ.update({"ENV_FILE": str(workspace / ".env.none"), "STORAGE_DIR": str(workspace)})
+        results["records"] = _build_store(workspace)
+        positive, negative = _run(POSITIVE), _run(NEGATIVE)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    missed = [q for q in POSITIVE if q not in positive["answered"]]
+    wrong = negative["answered"]
+    results.update({"positive": positive, "negative": negative, "missed": missed, "false_positives": wrong})
+    print(f"aggregates answered: {len(positive['answered'])}/{len(POSITIVE)}; p50 {positive['latency']['p50_ms']} ms")
+    for q in missed:
+        print(f"  MISSED  {q}")
+    print(f"ordinary questions taken as aggregates: {len(wrong)}/{len(NEGATIVE)}")
+    for q, answer in wrong.items():
+        print(f"  WRONG   {q} -> {answer[:100]}")
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    sys.exit(1 if missed or wrong else 0)
+
+
+if __name__ == "__main__":
+    main()
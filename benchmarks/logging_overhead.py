@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import percentiles, run_metadata, save_results
+
+# Records a typical /ask request logs: routing and retrieval at INFO, LLM
+# usage and cache lookups at DEBUG, then the per-request summary line.
+INFO_PER_REQUEST = 3
+DEBUG_PER_REQUEST = 4
+
+
+class SlowSink:
+    """
+    stdout stand-in: each write blocks for `latency_us` (a container log
+    pipe under backpressure) and lines are counted, not kept.
+    """
+
+    def __init__(self, latency_us: float):
+        self.latency_s = latency_us / 1e6
+        self.lines = 0
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _before(level: str, sink: SlowSink) -> Callable[[], None]:
+    """
+    The previous setup_logging: synchronous text handler on the root logger.
+    """
+    root = logging.getLogger()
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s", "%Y-%m-%d %H:%M:%S"))
+    root.addHandler(handler)
+    root.setLevel(level)
+    return lambda: root.removeHandler(handler)
+
+
+def _after(level: str, sink: SlowSink, **options: Any) -> Callable[[], None]:
+    from app.core.logging import configure_logging, shutdown_logging
+
+    configure_logging(level, stream=sink, **options)
+    return shutdown_logging
+
+
+VARIANTS: Dict[str, Callable[[str, SlowSink], Callable[[], None]]] = {
+    "before_sync_text": _before,
+    "sync_json": lambda level, sink: _after(level, sink, fmt="json", async_=False),
+    "async_json": lambda level, sink: _after(level, sink, fmt="json", async_=True),
+    "async_json_load_sampled": lambda level, sink: _after(
+        level, sink, fmt="json", async_=True, queue_size=2000, load_sample_rate=0.1
+    ),
+    "async_json_sampled": lambda level, sink: _after(level, sink, fmt="json", async_=True, sample_rate=0.1),
+}
+
+
+def _request(n: int, work_s: float) -> float:
+    """
+    One simulated request: stage work (sleeps, like waiting on upstream
+    calls) between the log calls. Returns the time spent in log calls (s).
+    """
+    from app.utils.trace import add_counts, annotate, request_trace, span
+
+    log = logging.getLogger("app.bench")
+    access = logging.getLogger("app.access")
+    pause = work_s / (INFO_PER_REQUEST + DEBUG_PER_REQUEST)
+    spent = 0.0
+    with request_trace() as record:
+        annotate(tool="internal_qa")
+        with span("route"):
+            time.sleep(pause)
+            t = time.perf_counter()
+            log.info("Routing query %d to %s", n, "internal_qa")
+            spent += time.perf_counter() - t
+        for _ in range(DEBUG_PER_REQUEST):
+            time.sleep(pause)
+            add_counts(prompt_tokens=120, completion_tokens=40)
+            t = time.perf_counter()
+            log.debug("LLM usage | prompt=%s prompt_tokens=%d completion_tokens=%d", "internal_qa", 120, 40)
+            spent += time.perf_counter() - t
+        for i in range(INFO_PER_REQUEST - 1):
+            time.sleep(pause)
+            t = time.perf_counter()
+            log.info("Retrieved %d chunks for query %d (pass %d)", 5, n, i)
+            spent += time.perf_counter() - t
+    t = time.perf_counter()
+    fields = {"status": 200, "duration_ms": 1.0, "stages_ms": dict(record.spans), **record.fields}
+    access.info("request", extra={"request_id": record.request_id, "fields": fields})
+    return spent + time.perf_counter() - t
+
+
+def _run(variant: str, args: argparse.Namespace) -> Dict[str, Any]:
+    sink = SlowSink(args.sink_latency_us)
+    teardown = VARIANTS[variant](args.level, sink)
+    per_thread = args.requests // args.threads
+    interval = args.threads / args.qps  # open loop: each thread starts a request every `interval` s
+    work_s = args.work_ms / 1000.0
+    samples: List[List[float]] = [[] for _ in range(args.threads)]
+    totals: List[List[float]] = [[] for _ in range(args.threads)]
+
+    def _worker(idx: int) -> None:
+        logging_us, request_ms = samples[idx], totals[idx]
+        start = time.perf_counter() + idx * interval / args.threads
+        for n in range(per_thread):
+            delay = start + n * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            t0 = time.perf_counter()
+            logging_us.append(_request(n, work_s) * 1e6)
+            request_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    teardown()  # flushes the queue for the async variants
+    drain_s = time.perf_counter() - t1
+
+    done = per_thread * args.threads
+    logging_us = percentiles([x for s in samples for x in s])
+    return {
+        "requests": done,
+        "qps": round(done / elapsed, 1),
+        # percentiles() labels are in ms; these samples are microseconds.
+        "logging_per_request_us": {k.replace("_ms", "_us"): v for k, v in logging_us.items()},
+        "request_latency": percentiles([x for s in totals for x in s]),
+        "lines_written": sink.lines,
+        "lines_per_request": round(sink.lines / done, 2),
+        "drain_s": round(drain_s, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request logging cost: previous sync text handler vs async JSON")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--qps", type=float, default=1000.0, help="offered load (open loop)")
+    parser.add_argument("--threads", type=int, default=32, help="concurrent request threads")
+    parser.add_argument("--work-ms", type=float, default=5.0, help="non-logging work per request (sleep)")
+    parser.add_argument("--level", default="DEBUG", choices=["DEBUG", "INFO"])
+    parser.add_argument("--sink-latency-us", type=float, default=20.0, help="blocking time per stdout write")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()})}
+    print(
+        f"{args.requests} requests at {args.qps:g} req/s on {args.threads} threads, level {args.level}, "
+        f"{args.sink_latency_us:g} us per write; time in log calls per request:"
+    )
+    for variant in args.variants:
+        row = results[variant] = _run(variant, args)
+        lat, req = row["logging_per_request_us"], row["request_latency"]
+        print(
+            f"  {variant:<24} p50 {lat['p50_us']:>8} us  p99 {lat['p99_us']:>9} us  request p99 {req['p99_ms']:>7} ms  "
+            f"{row['qps']:>7} req/s  {row['lines_per_request']} lines/request  drain {row['drain_s']} s"
+        )
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    if "before_sync_text" in results and "async_json" in results:
+        # Request threads must spend less time logging than with the synchronous handler.
+        ok = (
+            results["async_json"]["logging_per_request_us"]["p50_us"]
+            < results["before_sync_text"]["logging_per_request_us"]["p50_us"]
+        )
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import ServerThread, percentiles, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.replay import LoggedRequest, load_log
+from benchmarks.run import _configure_env, _ensure_index, _prepare_workspace
+
+DEFAULT_LOG = Path(__file__).resolve().parent / "sample_requests.jsonl"
+VARIANTS = ("large", "small", "tiered")
+_ASK_OPTIONS = ("top_k", "answer_mode", "expand_clusters", "retrieval_mode", "deadline_ms")
+
+
+def _policy(variant: str, small: str, large: str):
+    from app.agent.tiering import TierPolicy
+
+    if variant in ("large", "small"):
+        # Today's single-model setup, with one model or the other.
+        model = large if variant == "large" else small
+        return TierPolicy(small=model, large=model, router=variant, issue_summary=variant, qa=variant)
+    return TierPolicy(small=small, large=large)
+
+
+def _send(agent: Any, req: LoggedRequest) -> Dict[str, Any]:
+    """
+    One logged request through the agent; the outer trace keeps the fields
+    (tool, qa_tier, qa_model, escalation) the request annotated. Requests
+    are grouped as "<qa_tier> (<model>)", "extractive" or "issue_summary (<model>)".
+    """
+    from app.agent.tiering import says_dont_know
+    from app.utils.trace import request_trace
+
+    t0 = time.perf_counter()
+    with request_trace() as record:
+        if req.endpoint == "/summarize":
+            resp = agent.run_issue_summary(issue_text=req.payload["issue_text"])
+        else:
+            options = {k: req.payload[k] for k in _ASK_OPTIONS if req.payload.get(k) is not None}
+            resp = agent.run(user_text=req.payload["query"], **options)
+    latency_ms = (time.perf_counter() - t0) * 1000.0
+    answer = resp.tool_output.get("answer")
+    fields = record.fields
+    if fields.get("qa_model"):
+        tier = f"{fields['qa_tier']} ({fields['qa_model']})"
+    elif fields.get("qa_tier"):
+        tier = fields["qa_tier"]
+    elif fields.get("tool") == "issue_summary":
+        tier = f"issue_summary ({agent.tiers.tool_model('issue_summary')})"
+    else:
+        tier = fields.get("tool", resp.tool_selected)
+    return {
+        "tier": tier,
+        "qa": "qa_tier" in fields,
+        "escalation": record.fields.get("escalation"),
+        "latency_ms": latency_ms,
+        "cost_usd": float(resp.usage.get("cost_usd") or 0.0),
+        "dont_know": answer is not None and says_dont_know(str(answer)),
+    }
+
+
+def _costs(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    xs = sorted(samples)
+    n = len(xs)
+    return {
+        "count": n,
+        "total_usd": round(sum(xs), 6),
+        "mean_usd": round(sum(xs) / n, 8),
+        "p50_usd": round(xs[n // 2], 8),
+        "p95_usd": round(xs[min(n - 1, int(0.95 * n))], 8),
+        "max_usd": round(xs[-1], 8),
+    }
+
+
+def _summary(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    qa = [r for r in rows if r["qa"]]
+    escalations: Dict[str, int] = {}
+    for r in rows:
+        if r["escalation"]:
+            escalations[r["escalation"]] = escalations.get(r["escalation"], 0) + 1
+    return {
+        "latency": percentiles([r["latency_ms"] for r in rows]),
+        "cost": _costs([r["cost_usd"] for r in rows]),
+        "qa_dont_know_rate": round(sum(r["dont_know"] for r in qa) / len(qa), 3) if qa else None,
+        "escalations": escalations,
+    }
+
+
+def _run_variant(
+    variant: str, requests: List[LoggedRequest], args: argparse.Namespace, fake: ServerThread
+) -> Dict[str, Any]:
+    from app.agent.agent import AIAgent
+
+    agent = AIAgent(tiers=_policy(variant, args.small_model, args.large_model))
+    before = httpx.get(f"{fake.url}/stats").json()["chat_requests_by_model"]
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        rows = list(pool.map(lambda r: _send(agent, r), requests * args.rounds))
+    after = httpx.get(f"{fake.url}/stats").json()["chat_requests_by_model"]
+
+    tiers: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        tiers.setdefault(r["tier"], []).append(r)
+    return {
+        **_summary(rows),
+        "chat_requests_by_model": {m: n - before.get(m, 0) for m, n in after.items() if n - before.get(m, 0)},
+        "by_tier": {tier: _summary(group) for tier, group in sorted(tiers.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency and cost per model tier: single large model vs single small model vs cheap-first with escalation"
+    )
+    parser.add_argument("--log", type=Path, default=DEFAULT_LOG, help="JSONL request log to replay")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=VARIANTS)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--copies", type=int, default=5, help="corpus copies in DATA_DIR (index size)")
+    parser.add_argument("--small-model", default="gpt-4o-mini")
+    parser.add_argument("--large-model", default="gpt-4o")
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="fake large-model time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=80.0, help="fake large-model decode speed")
+    parser.add_argument("--small-latency-scale", type=float, default=0.4, help="small-model latency relative to large")
+    parser.add_argument("--small-dont-know-rate", type=float, default=0.25, help="share of questions the small model declines")
+    parser.add_argument("--large-dont-know-rate", type=float, default=0.05)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    requests = load_log(args.log)
+    results: Dict[str, Any] = {"meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()})}
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-tiers-"))
+    try:
+        _prepare_workspace(workspace, args.copies)
+        config = FakeOpenAIConfig(
+            ttft_ms=args.ttft_ms,
+            tokens_per_s=args.tokens_per_s,
+            model_latency_scale={args.small_model: args.small_latency_scale},
+            model_dont_know_rate={
+                args.small_model: args.small_dont_know_rate,
+                args.large_model: args.large_dont_know_rate,
+            },
+        )
+        with ServerThread(create_app(config)) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            # Costs are read from the responses; no ledger writing into the temporary workspace.
+            os.environ["USAGE_ENABLED"] = "false"
+            _ensure_index()
+            print(
+                f"{len(requests)} logged requests x {args.rounds} rounds, {args.concurrency} concurrent; "
+                f"small={args.small_model}, large={args.large_model}:"
+            )
+            for variant in args.variants:
+                row = results[variant] = _run_variant(variant, requests, args, fake)
+                lat, cost = row["latency"], row["cost"]
+                print(
+                    f"  {variant:<7} p50 {lat['p50_ms']:>8} ms  p95 {lat['p95_ms']:>8} ms  "
+                    f"cost/request {cost['mean_usd']:.6f} USD (p95 {cost['p95_usd']:.6f})  "
+                    f"Q&A don't-know {row['qa_dont_know_rate']}  escalations {row['escalations']}"
+                )
+                for tier, t in row["by_tier"].items():
+                    print(
+                        f"      {tier:<28} {t['latency']['count']:>4} requests  p50 {t['latency']['p50_ms']:>8} ms  "
+                        f"cost/request {t['cost']['mean_usd']:.6f} USD"
+                    )
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    if "large" in results and "tiered" in results:
+        large, tiered = results["large"], results["tiered"]
+        # Cheap-first must cost less than the large model alone and decline
+        # at most 5 points more Q&A questions.
+        ok = tiered["cost"]["mean_usd"] < large["cost"]["mean_usd"] and (
+            (tiered["qa_dont_know_rate"] or 0.0) <= (large["qa_dont_know_rate"] or 0.0) + 0.05
+        )
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import ServerThread, percentiles, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import _configure_env, _ensure_index, _prepare_workspace
+
+MODES = ("single", "multi_query", "llm_multi_query", "hyde")
+
+# Short, vague questions and the bug report (title) that answers them.
+QUESTIONS: List[Tuple[str, str]] = [
+    ("upload hangs", "Document Upload Stuck at 99%"),
+    ("pictures broken in preview", "Broken Image Links in Document Preview"),
+    ("page 2 of results", "Pagination Issues on Search Results Page"),
+    ("emails missing", "Email Notifications Not Being Sent"),
+    ("wrong file size", "Incorrect Display of File Size"),
+    ("cannot delete docs", "Document Deletion Not Working"),
+    ("app crashes on my phone", "App Crashing on Specific Device Models (Mobile)"),
+    ("no alerts on phone", "Push Notifications Not Being Received (Mobile)"),
+    ("sync broken when editing together", "Real-Time Collaboration Features Not Syncing Reliably"),
+    ("rotate screen layout", "App Not Adapting to Device Orientation Changes (Mobile)"),
+    ("db errors", "Database Connection Errors Occurring Sporadically (Backend)"),
+    ("install fails", "Installation Failures on Certain OS Versions (Mobile)"),
+    ("slow docs", "Slow Loading Times for Large Document Libraries"),
+    ("share with outside people", "Document Sharing Fails for External Users"),
+    ("text hard to read contrast", "Color Contrast Issues Affecting Accessibility"),
+    ("reset password link", "Password Reset Link Expired Too Quickly"),
+]
+
+
+def _stats(fake: ServerThread) -> Dict[str, int]:
+    return httpx.get(f"{fake.url}/stats").json()
+
+
+def _rank(output: Dict[str, Any], title: str) -> int:
+    for i, c in enumerate(output.get("citations") or [], start=1):
+        if f"Title: {title}" in (c.get("snippet") or ""):
+            return i
+    return 0
+
+
+def _retrieval(args: argparse.Namespace, fake: ServerThread) -> Dict[str, Any]:
+    from app.tools.internal_qa_tool import internal_qa_tool
+
+    out: Dict[str, Any] = {}
+    for mode in args.modes:
+        internal_qa_tool("warm up", top_k=args.top_k, answer_mode="extractive", retrieval_mode=mode)
+        before = _stats(fake)
+        latencies: List[float] = []
+        ranks: List[int] = []
+        for _ in range(args.rounds):
+            for question, title in QUESTIONS:
+                t0 = time.perf_counter()
+                result = internal_qa_tool(question, top_k=args.top_k, answer_mode="extractive", retrieval_mode=mode)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                ranks.append(_rank(result.model_dump(), title))
+        after = _stats(fake)
+        n = len(ranks)
+        out[mode] = {
+            "latency": percentiles(latencies),
+            f"recall@{args.top_k}": round(sum(1 for r in ranks if r) / n, 3),
+            "mrr": round(sum(1.0 / r for r in ranks if r) / n, 3),
+            "embedding_requests_per_question": round((after["embedding_requests"] - before["embedding_requests"]) / n, 2),
+            "embedding_inputs_per_question": round((after["embedding_inputs"] - before["embedding_inputs"]) / n, 2),
+            "chat_requests_per_question": round((after["chat_requests"] - before["chat_requests"]) / n, 2),
+        }
+        row = out[mode]
+        print(
+            f"  {mode:<16} recall@{args.top_k} {row[f'recall@{args.top_k}']:.3f}  mrr {row['mrr']:.3f}  "
+            f"p50 {row['latency']['p50_ms']} ms  p95 {row['latency']['p95_ms']} ms  "
+            f"{row['embedding_requests_per_question']} embedding request(s) / question"
+        )
+    return out
+
+
+def _search_batching(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    FAISS time for N sub-queries: one batched search vs N single searches.
+    """
+    from app.ingestion.embeddings import get_embeddings
+    from app.retriever.faiss_store import FAISSStore
+    from app.retriever.query_expansion import expand_local
+    from app.retriever.search import (
+        similarity_search_with_scores_by_vector,
+        similarity_search_with_scores_by_vectors,
+    )
+
+    embeddings = get_embeddings()
+    store = FAISSStore().load_cached(embeddings)
+    queries = [q for question, _ in QUESTIONS for q in expand_local(question, 4)]
+    vectors = embeddings.embed_documents(queries)
+    groups = [vectors[i : i + 4] for i in range(0, len(vectors), 4)]
+
+    def _time(fn) -> float:
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            for group in groups:
+                fn(group)
+        return (time.perf_counter() - t0) * 1000.0 / (args.rounds * len(groups))
+
+    sequential = _time(lambda g: [similarity_search_with_scores_by_vector(store, v, top_k=args.top_k) for v in g])
+    batched = _time(lambda g: similarity_search_with_scores_by_vectors(store, g, top_k=args.top_k))
+    return {"sub_queries": 4, "sequential_ms": round(sequential, 3), "batched_ms": round(batched, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of the retrieval modes on short, vague questions")
+    parser.add_argument("--copies", type=int, default=20, help="corpus copies in DATA_DIR (index size)")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="fake LLM latency (llm_multi_query / hyde)")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()})}
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-multiquery-"))
+    try:
+        _prepare_workspace(workspace, args.copies)
+        config = FakeOpenAIConfig(embed_latency_ms=args.embed_latency_ms, ttft_ms=args.ttft_ms)
+        with ServerThread(create_app(config)) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            _ensure_index()
+            print(f"{len(QUESTIONS)} questions x {args.rounds} rounds, top_k={args.top_k}:")
+            results["modes"] = _retrieval(args, fake)
+            results["search_batching"] = _search_batching(args)
+            sb = results["search_batching"]
+            print(f"  FAISS search for 4 sub-queries: {sb['batched_ms']} ms batched vs {sb['sequential_ms']} ms one by one")
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    modes = results["modes"]
+    if "single" in modes and "multi_query" in modes:
+        single, multi = modes["single"], modes["multi_query"]
+        key = f"recall@{args.top_k}"
+        # Local expansion must not lose recall and must stay within one extra embedding round trip.
+        ok = multi[key] >= single[key] and multi["latency"]["p50_ms"] <= single["latency"]["p50_ms"] + args.embed_latency_ms
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import ServerThread, free_port, percentiles, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import ASK_QUERIES, REPO_ROOT, _configure_env, _ensure_index, _prepare_workspace
+
+
+def _start_api(env: Dict[str, str]) -> "tuple[subprocess.Popen, str]":
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=str(REPO_ROOT),
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health/ready", timeout=1.0).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("API did not become ready")
+
+
+def _burst(url: str, concurrency: int, total: int, batch_share: float) -> Dict[str, Any]:
+    """
+    Closed-loop burst against /ask; every 1/batch_share-th request is marked batch.
+    """
+    results: Dict[str, Dict[str, List[float]]] = {}
+    lock = threading.Lock()
+    every = int(round(1 / batch_share)) if batch_share > 0 else 0
+
+    def _worker(worker_id: int) -> None:
+        with httpx.Client(base_url=url, timeout=120.0) as client:
+            for i in range(worker_id, total, concurrency):
+                priority = "batch" if every and i % every == 0 else "interactive"
+                t = time.perf_counter()
+                try:
+                    r = client.post(
+                        "/ask",
+                        json={"query": ASK_QUERIES[i % len(ASK_QUERIES)], "top_k": 5},
+                        headers={"X-Request-Priority": priority},
+                    )
+                    status = str(r.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                ms = (time.perf_counter() - t) * 1000.0
+                with lock:
+                    results.setdefault(priority, {}).setdefault(status, []).append(ms)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_worker, range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    out: Dict[str, Any] = {"wall_s": round(wall, 2)}
+    for priority, by_status in results.items():
+        n = sum(len(v) for v in by_status.values())
+        ok = len(by_status.get("200", []))
+        out[priority] = {
+            "requests": n,
+            "ok": ok,
+            "ok_rps": round(ok / wall, 2),
+            "status_counts": {k: len(v) for k, v in sorted(by_status.items())},
+            "ok_latency": percentiles(by_status.get("200", [])),
+            "shed_latency": percentiles(by_status.get("503", [])),
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst /ask against a rate-limited stub upstream, limiter off vs on")
+    parser.add_argument("--concurrency", type=int, default=48)
+    parser.add_argument("--requests", type=int, default=240)
+    parser.add_argument("--batch-share", type=float, default=0.25, help="fraction of requests sent as batch priority")
+    parser.add_argument("--upstream-max-concurrency", type=int, default=8)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    parser.add_argument("--spike-prob", type=float, default=0.05)
+    parser.add_argument("--spike-ms", type=float, default=2000.0)
+    parser.add_argument("--queue-timeout-ms", type=float, default=3000.0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    fake_cfg = FakeOpenAIConfig(
+        ttft_ms=150.0,
+        tokens_per_s=200.0,
+        max_concurrency=args.upstream_max_concurrency,
+        rate_limit_prob=args.rate_limit_prob,
+        spike_prob=args.spike_prob,
+        spike_ms=args.spike_ms,
+    )
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+        "scenarios": {},
+    }
+
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-overload-"))
+    try:
+        _prepare_workspace(workspace, 1)
+        fake_app = create_app(FakeOpenAIConfig())  # no faults while building the index
+        with ServerThread(fake_app) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            _ensure_index()
+            fake_app.state.config = fake_cfg
+
+            for enabled in (False, True):
+                label = "limiter_on" if enabled else "limiter_off"
+                env = dict(os.environ)
+                env.update(
+                    {
+                        "LIMITER_ENABLED": "1" if enabled else "0",
+                        "LIMITER_QUEUE_TIMEOUT_MS": str(args.queue_timeout_ms),
+                    }
+                )
+                before = dict(fake_app.state.stats)
+                proc, url = _start_api(env)
+                try:
+                    run = _burst(url, args.concurrency, args.requests, args.batch_share)
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=10)
+                run["upstream_429s"] = fake_app.state.stats["rate_limited"] - before["rate_limited"]
+                run["upstream_max_in_flight"] = fake_app.state.stats["max_in_flight"]
+                fake_app.state.stats["max_in_flight"] = 0
+                results["scenarios"][label] = run
+
+                inter = run.get("interactive", {})
+                print(
+                    f"[{label}] upstream 429s={run['upstream_429s']} | interactive ok={inter.get('ok')}/{inter.get('requests')} "
+                    f"p95 {inter.get('ok_latency', {}).get('p95_ms')} ms status={inter.get('status_counts')} | "
+                    f"batch status={run.get('batch', {}).get('status_counts')}"
+                )
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.retriever.quantization import VectorFormat, index_bytes
+from benchmarks.common import run_metadata, save_results
+
+DEFAULT_CONFIGS = "float32,float16,int8,float32@512,float16@512,int8@512,float32@256,int8@256"
+
+
+def _parse_config(spec: str) -> VectorFormat:
+    dtype, _, dims = spec.partition("@")
+    return VectorFormat(dtype=dtype, dimensions=int(dims) if dims else None)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_corpus(
+    n_docs: int, n_queries: int, dim: int, clusters: int, decay: float, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unit vectors around `clusters` topic centres, with per-dimension variance
+    falling off as (i+1)^-decay: the leading components carry most of the
+    signal, as in Matryoshka-trained embeddings. Queries are noisy copies of
+    random documents.
+    """
+    rng = np.random.default_rng(seed)
+    scales = (np.arange(dim) + 1.0) ** -decay
+    centres = rng.standard_normal((clusters, dim)) * scales
+    docs = centres[rng.integers(0, clusters, n_docs)] + 0.6 * rng.standard_normal((n_docs, dim)) * scales
+    queries = docs[rng.integers(0, n_docs, n_queries)] + 0.4 * rng.standard_normal((n_queries, dim)) * scales
+    return _normalize(docs), _normalize(queries)
+
+
+def _search(index: faiss.Index, queries: np.ndarray, k: int) -> Tuple[np.ndarray, float]:
+    t = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - t) * 1000.0 / len(queries)
+
+
+def evaluate(fmt: VectorFormat, docs: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, Any]:
+    vectors = fmt.transform(docs)
+    index = fmt.make_index(vectors)
+    index.add(vectors)
+    ids, ms = _search(index, fmt.transform(queries), k)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(ids, truth)])
+    size = index_bytes(index)
+    return {
+        "dtype": fmt.dtype,
+        "dimensions": fmt.dimensions or docs.shape[1],
+        "index_mb": round(size / 1e6, 2),
+        "bytes_per_vector": round(size / len(docs), 1),
+        f"recall@{k}": round(float(recall), 4),
+        "search_ms_per_query": round(ms, 3),
+    }
+
+
+def _table(rows: List[Dict[str, Any]], k: int, baseline_mb: Optional[float]) -> str:
+    lines = [
+        f"| dtype | dims | index MB | vs float32 | recall@{k} | search ms/query |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for r in rows:
+        ratio = f"{r['index_mb'] / baseline_mb:.1%}" if baseline_mb else "-"
+        lines.append(
+            f"| {r['dtype']} | {r['dimensions']} | {r['index_mb']} | {ratio} | {r[f'recall@{k}']} | {r['search_ms_per_query']} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall vs memory of float16/int8 quantization and Matryoshka truncation (synthetic corpus)"
+    )
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=400)
+    parser.add_argument("--decay", type=float, default=0.5, help="per-dimension std falls off as (i+1)^-decay")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS, help="comma-separated dtype[@dimensions]")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    docs, queries = synthetic_corpus(args.docs, args.queries, args.dim, args.clusters, args.decay, args.seed)
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(docs)
+    truth, _ = _search(exact, queries, args.k)
+
+    rows = [evaluate(_parse_config(c), docs, queries, truth, args.k) for c in args.configs.split(",")]
+    baseline = next((r["index_mb"] for r in rows if r["dtype"] == "float32" and r["dimensions"] == args.dim), None)
+    print(_table(rows, args.k, baseline))
+
+    results = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+        "rows": rows,
+    }
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
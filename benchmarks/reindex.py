@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import ServerThread, free_port, percentiles, run_metadata, save_results
+from benchmarks.run import ASK_QUERIES, REPO_ROOT, _configure_env, _ensure_index, _prepare_workspace
+
+
+def _start_stub(nice: int, args: argparse.Namespace) -> subprocess.Popen:
+    """
+    Fake OpenAI server in its own process. The reindex job gets a separate,
+    equally niced stub: its CPU stands in for remote capacity, not for the box.
+    """
+    port = free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port),
+            "--embed-latency-ms", str(args.embed_latency_ms), "--ttft-ms", str(args.ttft_ms),
+            "--tokens-per-s", str(args.tokens_per_s),
+        ],
+        cwd=str(REPO_ROOT),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=(lambda: os.nice(nice)) if nice else None,
+    )
+    proc.url = f"http://127.0.0.1:{port}/v1"  # type: ignore[attr-defined]
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1.0)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("fake OpenAI server did not start")
+
+
+class _Load:
+    """
+    Closed-loop /ask traffic from `clients` threads; latencies are bucketed
+    by the phase label current when each request started.
+    """
+
+    def __init__(self, url: str, clients: int, answer_mode: str):
+        self.url = url
+        self.clients = clients
+        self.answer_mode = answer_mode
+        self.phase = "baseline"
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, args=(i,), daemon=True) for i in range(clients)]
+
+    def _run(self, worker: int) -> None:
+        with httpx.Client(base_url=self.url, timeout=60.0) as client:
+            i = worker
+            while not self._stop.is_set():
+                phase = self.phase
+                t = time.perf_counter()
+                try:
+                    ok = client.post("/ask", json={"query": ASK_QUERIES[i % len(ASK_QUERIES)], "top_k": 5, "answer_mode": self.answer_mode}).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                self.samples.setdefault(phase, []).append((time.perf_counter() - t) * 1000.0)
+                if not ok:
+                    self.errors[phase] = self.errors.get(phase, 0) + 1
+                i += self.clients
+
+    def __enter__(self) -> "_Load":
+        for t in self._threads:
+            t.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=60)
+
+
+def _generation(api: httpx.Client) -> Optional[str]:
+    return api.get("/health/ready").json().get("index_generation")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving latency of /ask before, during and after a background reindex")
+    parser.add_argument("--copies", type=int, default=40, help="corpus copies (reindex size)")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--baseline-s", type=float, default=15.0)
+    parser.add_argument("--answer-mode", default="extractive", help="/ask answer_mode (extractive = CPU-bound, no LLM wait)")
+    parser.add_argument("--summaries", choices=["off", "llm", "fields"], default="fields")
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-s", type=float, default=100.0)
+    parser.add_argument("--max-p95-ratio", type=float, default=1.5, help="fail if p95 during reindex exceeds baseline x this")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+    }
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-reindex-"))
+    stubs: List[subprocess.Popen] = []
+    try:
+        _prepare_workspace(workspace, args.copies)
+        serving_stub = _start_stub(0, args)
+        stubs.append(serving_stub)
+        _configure_env(workspace, serving_stub.url)
+        os.environ["ADMIN_TOKEN"] = admin_token = "benchmark-admin"
+        _ensure_index()
+
+        from app.core.config import get_settings
+        from app.main import app
+
+        batch_stub = _start_stub(get_settings().REINDEX_NICE, args)
+        stubs.append(batch_stub)
+
+        with ServerThread(app) as server, httpx.Client(
+            base_url=server.url, timeout=30.0, headers={"X-Admin-Token": admin_token}
+        ) as api, _Load(
+            server.url, args.clients, args.answer_mode
+        ) as load:
+            initial_generation = _generation(api)
+            time.sleep(args.baseline_s)
+
+            # Settings of the API process are already loaded; only the job
+            # process (which copies os.environ) talks to the batch stub.
+            os.environ["OPENAI_BASE_URL"] = batch_stub.url
+            load.phase = "reindex"
+            job = api.post("/admin/reindex", json={"summaries": args.summaries}).json()
+            os.environ["OPENAI_BASE_URL"] = serving_stub.url
+            print(f"reindex job {job['job_id']} started")
+
+            snapshots: List[Dict[str, Any]] = []
+            while True:
+                time.sleep(1.0)
+                status = api.get(f"/admin/reindex/{job['job_id']}").json()
+                snapshots.append({"elapsed_s": status.get("elapsed_s"), "stage": status.get("stage"), "progress": status.get("progress")})
+                embed = (status.get("progress") or {}).get("embed") or {}
+                print(
+                    f"  {status['status']:<9} stage={status.get('stage')} embedded {embed.get('done', 0)}/{embed.get('total', '?')}"
+                    f" {embed.get('per_s', '-')} chunks/s, ETA {embed.get('eta_s', '-')} s"
+                )
+                if status["status"] in ("succeeded", "failed", "cancelled"):
+                    break
+
+            load.phase = "swap"
+            t_done = time.perf_counter()
+            swapped_after_s = None
+            while status["status"] == "succeeded" and time.perf_counter() - t_done < 60:
+                if _generation(api) == status["generation_id"]:
+                    swapped_after_s = round(time.perf_counter() - t_done, 2)
+                    break
+                time.sleep(0.1)
+            load.phase = "after"
+            time.sleep(min(args.baseline_s, 10.0))
+
+        results["job"] = {**status, "snapshots": snapshots}
+        results["hot_swap"] = {
+            "initial_generation": initial_generation,
+            "new_generation": status.get("generation_id"),
+            "swapped_after_s": swapped_after_s,
+        }
+        results["latency"] = {phase: percentiles(s) for phase, s in load.samples.items()}
+        results["errors"] = load.errors
+    finally:
+        for proc in stubs:
+            proc.terminate()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    base, during = results["latency"]["baseline"], results["latency"].get("reindex", {})
+    ratio = round(during.get("p95_ms", 0.0) / base["p95_ms"], 2) if base.get("p95_ms") else None
+    results["p95_ratio"] = ratio
+    for phase, lat in results["latency"].items():
+        print(f"{phase:<9} n={lat['count']:<5} p50 {lat.get('p50_ms')} ms  p95 {lat.get('p95_ms')} ms  p99 {lat.get('p99_ms')} ms")
+    print(f"job {status['status']} in {status.get('elapsed_s')} s; new generation served after {swapped_after_s} s")
+    print(f"p95 during reindex / baseline: {ratio} (bound {args.max_p95_ratio})")
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    ok = status["status"] == "succeeded" and swapped_after_s is not None and ratio is not None and ratio <= args.max_p95_ratio
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import ServerThread, percentiles, run_metadata, save_results
+
+ENDPOINTS = ("/ask", "/summarize")
+_METRIC_LINE = re.compile(r'^assistant_cache_(hits|misses)_total\{cache="([^"]*)"\}\s+(\S+)$')
+
+
+@dataclass
+class LoggedRequest:
+    endpoint: str
+    payload: Dict[str, Any]
+    ts: Optional[float] = None
+
+
+@dataclass
+class Outcome:
+    endpoint: str
+    tool: str
+    latency_ms: float
+    error: Optional[str] = None
+
+
+def load_log(path: Path) -> List[LoggedRequest]:
+    """
+    Read a JSONL request log (the format written when REQUEST_LOG_PATH is set).
+    Lines for other endpoints or without a payload are skipped.
+    """
+    out: List[LoggedRequest] = []
+    skipped = 0
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            skipped += 1
+            continue
+        endpoint = row.get("endpoint")
+        if endpoint not in ENDPOINTS or not isinstance(row.get("payload"), dict):
+            skipped += 1
+            continue
+        ts = row.get("ts")
+        out.append(LoggedRequest(endpoint, row["payload"], float(ts) if ts is not None else None))
+    if skipped:
+        print(f"  skipped {skipped} line(s) that are not /ask or /summarize requests")
+    out.sort(key=lambda r: r.ts if r.ts is not None else 0.0)
+    return out
+
+
+def scrape_cache_counters(client: httpx.Client) -> Dict[str, Dict[str, float]]:
+    """
+    {cache_name: {"hits": n, "misses": n}} from the /metrics endpoint.
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    try:
+        text = client.get("/metrics").text
+    except httpx.HTTPError:
+        return out
+    for line in text.splitlines():
+        m = _METRIC_LINE.match(line)
+        if m:
+            kind, cache, value = m.groups()
+            out.setdefault(cache, {"hits": 0.0, "misses": 0.0})[kind] = float(value)
+    return out
+
+
+def _cache_delta(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for cache, counts in after.items():
+        prev = before.get(cache, {})
+        hits = counts["hits"] - prev.get("hits", 0.0)
+        misses = counts["misses"] - prev.get("misses", 0.0)
+        total = hits + misses
+        out[cache] = {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 3) if total else None}
+    return out
+
+
+class Replayer:
+    """
+    Sends logged requests to the API and collects per-request outcomes.
+
+    closed loop: `concurrency` workers, each sends its next request when the previous returns.
+    open loop:   requests start on a schedule (fixed rate, Poisson or the log's own
+                 timestamps) regardless of how fast the server answers. Latency is
+                 measured from the scheduled start, so queueing delay is not hidden.
+    """
+
+    def __init__(self, url: str, *, timeout_s: float = 120.0, max_in_flight: int = 256):
+        self.url = url
+        self.timeout_s = timeout_s
+        self.max_in_flight = max_in_flight
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.outcomes: List[Outcome] = []
+
+    def _client(self) -> httpx.Client:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = httpx.Client(base_url=self.url, timeout=self.timeout_s)
+            self._local.client = client
+        return client
+
+    def _send(self, req: LoggedRequest, scheduled: Optional[float] = None) -> None:
+        t0 = scheduled if scheduled is not None else time.perf_counter()
+        tool, error = req.endpoint, None
+        try:
+            r = self._client().post(req.endpoint, json=req.payload)
+            if r.status_code == 200:
+                tool = r.json().get("tool_selected") or tool
+            else:
+                error = f"http_{r.status_code}"
+        except httpx.TimeoutException:
+            error = "timeout"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        except ValueError:
+            error = "bad_json"
+        outcome = Outcome(req.endpoint, tool, (time.perf_counter() - t0) * 1000.0, error)
+        with self._lock:
+            self.outcomes.append(outcome)
+
+    def closed_loop(self, requests: List[LoggedRequest], concurrency: int) -> None:
+        cursor = iter(requests)
+        cursor_lock = threading.Lock()
+
+        def _worker(_: int) -> None:
+            while True:
+                with cursor_lock:
+                    req = next(cursor, None)
+                if req is None:
+                    return
+                self._send(req)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(_worker, range(concurrency)))
+
+    def open_loop(self, requests: List[LoggedRequest], offsets_s: List[float]) -> None:
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        start = time.perf_counter()
+
+        def _run(req: LoggedRequest, scheduled: float) -> None:
+            try:
+                self._send(req, scheduled)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for req, offset in zip(requests, offsets_s):
+                scheduled = start + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if not in_flight.acquire(blocking=False):
+                    # Client-side saturation: count it rather than silently slowing the schedule.
+                    with self._lock:
+                        self.outcomes.append(Outcome(req.endpoint, req.endpoint, 0.0, "client_saturated"))
+                    continue
+                pool.submit(_run, req, scheduled)
+
+
+def schedule(requests: List[LoggedRequest], *, rate: Optional[float], arrivals: str, speed: float, seed: int) -> List[float]:
+    """
+    Start offsets (seconds from t0) for open-loop replay.
+    Without --rate the log's own timestamps are replayed, compressed by `speed`.
+    """
+    if rate is None:
+        if any(r.ts is None for r in requests):
+            raise ValueError("Open loop without --rate needs a 'ts' on every log line")
+        t0 = requests[0].ts
+        return [(r.ts - t0) / speed for r in requests]
+
+    rng = random.Random(seed)
+    offsets, t = [], 0.0
+    for _ in requests:
+        offsets.append(t)
+        t += rng.expovariate(rate) if arrivals == "poisson" else 1.0 / rate
+    return offsets
+
+
+def build_report(outcomes: List[Outcome], wall_s: float) -> Dict[str, Any]:
+    by_tool: Dict[str, List[float]] = {}
+    errors: Dict[str, Dict[str, int]] = {}
+    for o in outcomes:
+        if o.error is None:
+            by_tool.setdefault(o.tool, []).append(o.latency_ms)
+        else:
+            per = errors.setdefault(o.endpoint, {})
+            per[o.error] = per.get(o.error, 0) + 1
+    ok = sum(len(v) for v in by_tool.values())
+    return {
+        "requests": len(outcomes),
+        "ok": ok,
+        "error_rate": round((len(outcomes) - ok) / len(outcomes), 4) if outcomes else 0.0,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(ok / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency_by_tool": {tool: percentiles(xs) for tool, xs in sorted(by_tool.items())},
+        "errors": errors,
+    }
+
+
+def _local_stack(stack: ExitStack, args: argparse.Namespace) -> str:
+    """
+    Start the fake OpenAI server and the API in-process (same setup as benchmarks.run).
+    """
+    from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+    from benchmarks.run import _configure_env, _ensure_index, _prepare_workspace
+
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-replay-"))
+    stack.callback(shutil.rmtree, workspace, True)
+    _prepare_workspace(workspace, 1)
+    fake = stack.enter_context(
+        ServerThread(create_app(FakeOpenAIConfig(ttft_ms=args.ttft_ms, tokens_per_s=args.tokens_per_s)))
+    )
+    _configure_env(workspace, f"{fake.url}/v1")
+    _ensure_index()
+
+    from app.main import app
+
+    return stack.enter_context(ServerThread(app)).url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a logged /ask and /summarize workload against the API")
+    parser.add_argument("log", type=Path, help="JSONL request log (see REQUEST_LOG_PATH)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="API base URL, e.g. http://127.0.0.1:8000")
+    target.add_argument("--local", action="store_true", help="start the API with the fake OpenAI server in-process")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed loop: parallel clients")
+    parser.add_argument("--rate", type=float, default=None, help="open loop: requests/s (default: log timestamps)")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--speed", type=float, default=1.0, help="open loop with log timestamps: time compression")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--limit", type=int, default=None, help="replay at most N requests")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log N times back to back")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="--local only")
+    parser.add_argument("--tokens-per-s", type=float, default=100.0, help="--local only")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    requests = load_log(args.log)
+    if args.repeat > 1:
+        span = (requests[-1].ts - requests[0].ts + 1.0) if requests and requests[0].ts is not None else 0.0
+        requests = [
+            LoggedRequest(r.endpoint, r.payload, None if r.ts is None else r.ts + i * span)
+            for i in range(args.repeat)
+            for r in requests
+        ]
+    if args.limit:
+        requests = requests[: args.limit]
+    if not requests:
+        raise SystemExit(f"No replayable requests in {args.log}")
+
+    with ExitStack() as stack:
+        url = _local_stack(stack, args) if args.local else args.url.rstrip("/")
+        replayer = Replayer(url, timeout_s=args.timeout, max_in_flight=args.max_in_flight)
+
+        with httpx.Client(base_url=url, timeout=10.0) as probe:
+            before = scrape_cache_counters(probe)
+            t0 = time.perf_counter()
+            if args.mode == "closed":
+                replayer.closed_loop(requests, args.concurrency)
+            else:
+                offsets = schedule(requests, rate=args.rate, arrivals=args.arrivals, speed=args.speed, seed=args.seed)
+                replayer.open_loop(requests, offsets)
+            wall = time.perf_counter() - t0
+            after = scrape_cache_counters(probe)
+
+    report = build_report(replayer.outcomes, wall)
+    report["caches"] = _cache_delta(before, after)
+
+    print(f"{report['requests']} requests in {report['wall_s']}s: {report['throughput_rps']} ok/s, error rate {report['error_rate']:.2%}")
+    for tool, lat in report["latency_by_tool"].items():
+        print(f"  {tool:<16} n={lat['count']:<5} p50 {lat['p50_ms']:.0f} ms  p95 {lat['p95_ms']:.0f} ms  p99 {lat['p99_ms']:.0f} ms")
+    for cache, c in report["caches"].items():
+        print(f"  cache {cache}: hit rate {c['hit_rate']}")
+    for endpoint, errs in report["errors"].items():
+        print(f"  errors {endpoint}: {errs}")
+
+    meta_args = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items() if k != "out"}
+    path = save_results({"meta": run_metadata(meta_args), "scenarios": {"replay": report}}, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
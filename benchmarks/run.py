@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.common import ServerThread, percentiles, rss_mb, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("ingest", "retrieval", "e2e", "memory")
+
+ASK_QUERIES = [
+    "What issues were reported about email notifications?",
+    "Why does the document upload get stuck at 99%?",
+    "What severity is the broken image preview bug?",
+    "Which bugs affect the search engine?",
+    "What do users say about mobile buttons?",
+    "Is there a problem with pagination on search results?",
+]
+SUMMARIZE_TEXTS = [
+    "Users report that email notifications are delayed by several hours during peak traffic.",
+    "Uploading PDFs larger than 50MB gets stuck at 99% although the backend stores the file.",
+    "Searching for acronyms such as AI returns documents with the separate letters.",
+    "On mobile, buttons overlap and users cannot tap the right one.",
+]
+
+
+def _prepare_workspace(root: Path, copies: int) -> None:
+    """
+    DATA_DIR with the bundled corpora replicated `copies` times
+    (extra copies are picked up by the prefix.* discovery in the loader).
+    """
+    data = root / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    for src in (REPO_ROOT / "data").glob("ai_test_*.txt"):
+        shutil.copy(src, data / src.name)
+        for i in range(2, copies + 1):
+            shutil.copy(src, data / f"{src.stem}.copy{i}{src.suffix}")
+
+
+def _configure_env(root: Path, base_url: str) -> None:
+    # Must run before app settings are first read (get_settings caches).
+    os.environ.update(
+        {
+            "ENV_FILE": str(root / ".env.none"),
+            "OPENAI_API_KEY": "sk-fake-benchmark",
+            "OPENAI_BASE_URL": base_url,
+            "DATA_DIR": str(root / "data"),
+            "STORAGE_DIR": str(root / "storage"),
+            "FAISS_INDEX_DIR": str(root / "storage" / "faiss_index"),
+            "LOG_LEVEL": "WARNING",
+        }
+    )
+
+
+def scenario_ingest(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.ingestion.build_index import build_faiss_index
+
+    t0 = time.perf_counter()
+    manifest = build_faiss_index()
+    elapsed = time.perf_counter() - t0
+    return {
+        "copies": args.ingest_copies,
+        "docs": manifest["total_docs"],
+        "chunks": manifest["total_chunks"],
+        "seconds": round(elapsed, 3),
+        "chunks_per_s": round(manifest["total_chunks"] / elapsed, 1),
+        "embed_latency_ms": args.embed_latency_ms,
+    }
+
+
+def _synthetic_store(n: int, dim: int, seed: int = 0):
+    import faiss
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    from app.ingestion.hash_embeddings import HashEmbeddings
+
+    rng = np.random.default_rng(seed)
+    n_clusters = max(16, n // 1000)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+
+    index = faiss.IndexFlatL2(dim)
+    batch = 50_000
+    for start in range(0, n, batch):
+        m = min(batch, n - start)
+        x = centers[rng.integers(0, n_clusters, m)] + 0.5 * rng.standard_normal((m, dim)).astype("float32")
+        x /= np.linalg.norm(x, axis=1, keepdims=True)
+        index.add(x)
+
+    ids = {i: str(i) for i in range(n)}
+    docstore = InMemoryDocstore(
+        {str(i): Document(page_content=f"synthetic chunk {i}", metadata={"source": "synthetic", "chunk_id": f"chunk_{i}"}) for i in range(n)}
+    )
+    store = FAISS(HashEmbeddings(dim), index, docstore, ids)
+    queries = centers[rng.integers(0, n_clusters, 256)] + 0.5 * rng.standard_normal((256, dim)).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return store, [q.tolist() for q in queries]
+
+
+def scenario_retrieval(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.retriever.search import similarity_search_with_scores_by_vector
+
+    out: Dict[str, Any] = {"dim": args.dim, "top_k": 5}
+    for n in args.sizes:
+        t0 = time.perf_counter()
+        store, queries = _synthetic_store(n, args.dim)
+        build_s = time.perf_counter() - t0
+
+        def _one(q: List[float]) -> float:
+            t = time.perf_counter()
+            similarity_search_with_scores_by_vector(store, q, top_k=5)
+            return (time.perf_counter() - t) * 1000.0
+
+        serial = [_one(q) for q in queries[:100]]
+
+        threads = os.cpu_count() or 1
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            concurrent = list(pool.map(_one, queries))
+        wall = time.perf_counter() - t0
+
+        out[str(n)] = {
+            "build_s": round(build_s, 2),
+            "serial": percentiles(serial),
+            "qps_serial": round(1000.0 / (sum(serial) / len(serial)), 1),
+            "qps_threads": round(len(queries) / wall, 1),
+            "threads": threads,
+            "rss": rss_mb(),
+        }
+        print(f"  retrieval n={n}: {out[str(n)]['serial']['p50_ms']} ms p50, {out[str(n)]['qps_threads']} QPS")
+        del store
+    return out
+
+
+def _load(
+    url: str, concurrency: int, requests_total: int, make_request: Callable[[int], Tuple[str, Dict[str, Any]]]
+) -> Dict[str, Any]:
+    import httpx
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    def _worker(worker_id: int) -> None:
+        with httpx.Client(base_url=url, timeout=120.0) as client:
+            for i in range(worker_id, requests_total, concurrency):
+                path, payload = make_request(i)
+                t = time.perf_counter()
+                try:
+                    r = client.post(path, json=payload)
+                    ok = r.status_code == 200
+                    key = str(r.status_code)
+                except httpx.HTTPError as e:
+                    ok, key = False, type(e).__name__
+                latencies.append((time.perf_counter() - t) * 1000.0)
+                if not ok:
+                    errors[key] = errors.get(key, 0) + 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_worker, range(concurrency)))
+    wall = time.perf_counter() - t0
+    return {
+        "concurrency": concurrency,
+        "requests": requests_total,
+        "throughput_rps": round(requests_total / wall, 2),
+        "latency": percentiles(latencies),
+        "errors": errors,
+    }
+
+
+def _ensure_index() -> None:
+    from app.retriever.faiss_store import FAISSStore
+
+    if not FAISSStore().exists():
+        from app.ingestion.build_index import build_faiss_index
+
+        build_faiss_index()
+
+
+def scenario_e2e(args: argparse.Namespace) -> Dict[str, Any]:
+    _ensure_index()
+    from app.main import app
+
+    out: Dict[str, Any] = {"ask": {}, "summarize": {}}
+    with ServerThread(app) as api:
+        for c in args.concurrency:
+            n = max(args.requests, c)
+            out["ask"][str(c)] = _load(
+                api.url, c, n, lambda i: ("/ask", {"query": ASK_QUERIES[i % len(ASK_QUERIES)], "top_k": 5})
+            )
+            out["summarize"][str(c)] = _load(
+                api.url, c, n, lambda i: ("/summarize", {"issue_text": SUMMARIZE_TEXTS[i % len(SUMMARIZE_TEXTS)]})
+            )
+            print(
+                f"  e2e c={c}: /ask p95 {out['ask'][str(c)]['latency'].get('p95_ms')} ms, "
+                f"/summarize p95 {out['summarize'][str(c)]['latency'].get('p95_ms')} ms"
+            )
+    return out
+
+
+_WORKER_RSS_CODE = """
+import json
+from benchmarks.common import rss_mb
+before = rss_mb()
+from app.core.container import build_container
+c = build_container()
+print(json.dumps({"before_import": before, "after_warmup": rss_mb(), "ready": c.ready}))
+"""
+
+
+def scenario_memory(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    RSS of one fresh API worker after warm-up (separate process, same index).
+    """
+    _ensure_index()
+    proc = subprocess.run(
+        [sys.executable, "-c", _WORKER_RSS_CODE],
+        cwd=str(REPO_ROOT),
+        env=dict(os.environ),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (local OpenAI stand-in)")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="repeatable; default: all")
+    parser.add_argument("--out", type=Path, default=None, help="results JSON (default: benchmarks/results/)")
+    parser.add_argument("--ingest-copies", type=int, default=5)
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint per concurrency level")
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-s", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    scenarios = args.scenario or list(SCENARIOS)
+    fake_cfg = FakeOpenAIConfig(
+        embed_latency_ms=args.embed_latency_ms, ttft_ms=args.ttft_ms, tokens_per_s=args.tokens_per_s
+    )
+
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-bench-"))
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: v for k, v in vars(args).items() if k != "out"} | {"fake": fake_cfg.__dict__}),
+        "scenarios": {},
+    }
+    try:
+        _prepare_workspace(workspace, args.ingest_copies if "ingest" in scenarios else 1)
+        with ServerThread(create_app(fake_cfg)) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            runners = {
+                "ingest": scenario_ingest,
+                "retrieval": scenario_retrieval,
+                "e2e": scenario_e2e,
+                "memory": scenario_memory,
+            }
+            for name in scenarios:
+                print(f"[{name}]")
+                t0 = time.perf_counter()
+                results["scenarios"][name] = runners[name](args)
+                print(f"  done in {time.perf_counter() - t0:.1f}s")
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
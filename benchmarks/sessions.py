@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import ServerThread, percentiles, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import _configure_env, _ensure_index, _prepare_workspace
+
+# (first question, follow-up, the follow-up asked on its own without a session)
+CONVERSATIONS: List[Tuple[str, str, str]] = [
+    (
+        "Why does the document upload get stuck at 99%?",
+        "What is its severity?",
+        "What is the severity of the document upload stuck at 99% bug?",
+    ),
+    (
+        "What severity is the broken image preview bug?",
+        "How can it be fixed?",
+        "How can the broken image preview bug be fixed?",
+    ),
+    (
+        "What issues were reported about email notifications?",
+        "Which environment are they in?",
+        "Which environment are the email notification issues in?",
+    ),
+    (
+        "Is there a problem with pagination on search results?",
+        "What is the proposed fix for that?",
+        "What is the proposed fix for pagination on search results?",
+    ),
+]
+
+# (previous question, new question): not follow-ups, must be searched for on their own.
+NEW_QUESTIONS: List[Tuple[str, str]] = [
+    ("Why are email notifications delayed?", "Is there a bug that affects login?"),
+    ("Why are email notifications delayed?", "Which bugs mention that the app crashes?"),
+    ("Why are email notifications delayed?", "Show the bug that breaks search"),
+    ("Why are email notifications delayed?", "login"),
+]
+
+
+def _classification() -> Dict[str, Any]:
+    """
+    Follow-up kind per question: CONVERSATIONS follow-ups should be follow-ups,
+    NEW_QUESTIONS should not.
+    """
+    from app.agent.session import Session, Turn, classify_follow_up
+
+    def _kind(previous: str, question: str) -> Any:
+        session = Session("bench", max_turns=6, max_bytes=1 << 16)
+        session.add(Turn(question=previous, answer="", tool="internal_qa"))
+        return classify_follow_up(question, session)
+
+    return {
+        "missed_follow_ups": [f for first, f, _ in CONVERSATIONS if _kind(first, f) is None],
+        "misread_new_questions": {q: _kind(prev, q) for prev, q in NEW_QUESTIONS if _kind(prev, q) is not None},
+    }
+
+
+def _memory(sessions: int, turns: int) -> Dict[str, Any]:
+    """
+    Bytes per session as estimated by the store vs traced allocations.
+    """
+    from app.agent.session import RetrievedContext, SessionStore, Turn
+
+    store = SessionStore(ttl_s=3600.0, max_sessions=sessions)
+    answer = "Exporting the workspace report times out after 30 seconds for large teams. " * 14
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for i in range(sessions):
+        sid = f"bench-{i:06d}"
+        for t in range(turns):
+            context = RetrievedContext(
+                chunk_ids=tuple(f"chunk_{(i * 7 + t * 5 + j) % 50000}" for j in range(5)),
+                scores=tuple(0.8 - 0.05 * j for j in range(5)),
+            )
+            store.record(sid, Turn(question=f"What happened to report {i}/{t}? " * 3, answer=answer, tool="internal_qa", context=context))
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = store.stats()
+    return {
+        "sessions": stats["sessions"],
+        "turns_per_session_recorded": turns,
+        "turns_per_session_kept": len(store.get("bench-000000").turns),
+        "estimated_bytes_per_session": stats["mean_bytes"],
+        "traced_bytes_per_session": round((used - base) / sessions, 1),
+        "max_session_bytes": stats["max_session_bytes"],
+    }
+
+
+def _embedded(fake: ServerThread) -> int:
+    return httpx.get(f"{fake.url}/stats").json()["embedding_inputs"]
+
+
+def _ask(api: httpx.Client, body: Dict[str, Any]) -> Tuple[float, Dict[str, Any]]:
+    t0 = time.perf_counter()
+    resp = api.post("/ask", json=body)
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    resp.raise_for_status()
+    return elapsed, resp.json()
+
+
+def _chunk_ids(data: Dict[str, Any]) -> List[str]:
+    return [c.get("chunk_id") for c in (data.get("tool_output") or {}).get("citations") or []]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow-up questions with and without conversation sessions")
+    parser.add_argument("--copies", type=int, default=10, help="corpus copies in DATA_DIR (index size)")
+    parser.add_argument("--rounds", type=int, default=10, help="passes over the conversations")
+    parser.add_argument("--answer-mode", default="extractive", choices=("extractive", "generate", "auto"))
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--memory-sessions", type=int, default=2000)
+    parser.add_argument("--memory-turns", type=int, default=10)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()})}
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-sessions-"))
+    try:
+        _prepare_workspace(workspace, args.copies)
+        with ServerThread(create_app(FakeOpenAIConfig(embed_latency_ms=args.embed_latency_ms))) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            results["memory"] = _memory(args.memory_sessions, args.memory_turns)
+            mem = results["memory"]
+            print(
+                f"memory: {mem['sessions']} sessions, {mem['turns_per_session_kept']} of {mem['turns_per_session_recorded']} turns kept; "
+                f"{mem['estimated_bytes_per_session']} B/session estimated, {mem['traced_bytes_per_session']} B traced "
+                f"(cap {mem['max_session_bytes']} B)"
+            )
+
+            cls = results["classification"] = _classification()
+            print(
+                f"classification: {len(cls['missed_follow_ups'])} follow-ups missed, "
+                f"{len(cls['misread_new_questions'])} new questions taken as follow-ups {cls['misread_new_questions']}"
+            )
+
+            _ensure_index()
+            from app.main import app
+
+            stateless: List[float] = []
+            follow_ups: List[float] = []
+            embeds = {"stateless": 0, "session": 0}
+            same_context = 0
+            with ServerThread(app) as server, httpx.Client(base_url=server.url, timeout=60.0) as api:
+                base = {"top_k": 5, "answer_mode": args.answer_mode}
+                for _ in range(args.rounds):
+                    for first, follow_up, standalone in CONVERSATIONS:
+                        before = _embedded(fake)
+                        ms, _ = _ask(api, {**base, "query": standalone})
+                        stateless.append(ms)
+                        embeds["stateless"] += _embedded(fake) - before
+
+                        sid = f"bench-{uuid.uuid4().hex[:12]}"
+                        _, first_resp = _ask(api, {**base, "query": first, "session_id": sid})
+                        before = _embedded(fake)
+                        ms, resp = _ask(api, {**base, "query": follow_up, "session_id": sid})
+                        follow_ups.append(ms)
+                        embeds["session"] += _embedded(fake) - before
+                        same_context += _chunk_ids(resp) == _chunk_ids(first_resp)
+                metrics = api.get("/metrics").text
+                results["metrics"] = [
+                    line for line in metrics.splitlines() if line.startswith(("assistant_session", "assistant_follow_ups"))
+                ]
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    n = len(follow_ups)
+    results["follow_up"] = {
+        "stateless": {"latency": percentiles(stateless), "embedding_inputs_per_question": embeds["stateless"] / n},
+        "session": {"latency": percentiles(follow_ups), "embedding_inputs_per_question": embeds["session"] / n},
+        "reused_previous_context": f"{same_context}/{n}",
+    }
+    fu = results["follow_up"]
+    print(
+        f"follow-up p50: {fu['session']['latency']['p50_ms']} ms with session "
+        f"vs {fu['stateless']['latency']['p50_ms']} ms as a standalone question; "
+        f"embedding inputs per follow-up {fu['session']['embedding_inputs_per_question']} "
+        f"vs {fu['stateless']['embedding_inputs_per_question']}; same context {fu['reused_previous_context']}"
+    )
+    print("\n".join(results["metrics"]))
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+    ok = (
+        mem["traced_bytes_per_session"] <= mem["max_session_bytes"]
+        and same_context == n
+        and not cls["missed_follow_ups"]
+        and not cls["misread_new_questions"]
+        and fu["session"]["latency"]["p50_ms"] < fu["stateless"]["latency"]["p50_ms"]
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
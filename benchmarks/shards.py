@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.ingestion.hash_embeddings import HashEmbeddings
+from app.retriever.sharded import ShardedFAISS
+from benchmarks.common import percentiles, run_metadata, save_results
+
+
+def _vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(16, n // 1000), dim)).astype("float32")
+    x = centres[rng.integers(0, len(centres), n)] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _sharded(vectors: np.ndarray, shards: int, fanout_threads: int, sources: bool) -> ShardedFAISS:
+    """
+    Round-robin partition of `vectors` into `shards` flat indexes. With
+    `sources`, shard i holds corpus "source_i" (prunable by a source filter).
+    """
+    dim = vectors.shape[1]
+    stores: Dict[str, FAISS] = {}
+    for s in range(shards):
+        ids = np.arange(s, len(vectors), shards)
+        index = faiss.IndexFlatL2(dim)
+        index.add(vectors[ids])
+        docstore = InMemoryDocstore(
+            {str(i): Document(page_content=f"synthetic chunk {i}", metadata={"source": f"source_{s}"}) for i in ids}
+        )
+        stores[f"shard_{s}"] = FAISS(HashEmbeddings(dim), index, docstore, {j: str(i) for j, i in enumerate(ids)})
+    return ShardedFAISS(
+        stores,
+        sources={name: (f"source_{s}" if sources else None) for s, name in enumerate(stores)},
+        max_workers=fanout_threads,
+    )
+
+
+def _qps(store: ShardedFAISS, queries: List[List[float]], clients: int, k: int, sources: Optional[List[str]]) -> Dict[str, Any]:
+    latencies: List[float] = []
+
+    def _one(q: List[float]) -> None:
+        t = time.perf_counter()
+        store.similarity_search_with_score_by_vector(q, k=k, sources=sources)
+        latencies.append((time.perf_counter() - t) * 1000.0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(_one, queries))
+    wall = time.perf_counter() - t0
+    return {"qps": round(len(queries) / wall, 1), "latency": percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QPS of sharded FAISS retrieval vs shard count and fan-out threads")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--shards", type=lambda v: [int(x) for x in v.split(",")], default=[1, 2, 4, 8])
+    parser.add_argument(
+        "--threads",
+        type=lambda v: [int(x) for x in v.split(",")],
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="fan-out thread counts (the 'cores' axis)",
+    )
+    parser.add_argument("--clients", type=int, default=1, help="concurrent query threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    # One FAISS thread per search, so parallelism comes only from the shard fan-out.
+    faiss.omp_set_num_threads(1)
+    vectors = _vectors(args.docs, args.dim, args.seed)
+    queries = [q.tolist() for q in _vectors(args.queries, args.dim, args.seed + 1)]
+
+    rows: List[Dict[str, Any]] = []
+    for shards in args.shards:
+        for threads in args.threads:
+            store = _sharded(vectors, shards, threads, sources=True)
+            run = _qps(store, queries, args.clients, args.k, None)
+            row = {"shards": shards, "fanout_threads": threads, **run}
+            if shards > 1:
+                # source filter: only one shard is searched
+                row["qps_source_filtered"] = _qps(store, queries, args.clients, args.k, ["source_0"])["qps"]
+            rows.append(row)
+            print(
+                f"shards={shards} threads={threads}: {row['qps']} QPS, p50 {run['latency']['p50_ms']} ms"
+                + (f", source-filtered {row['qps_source_filtered']} QPS" if shards > 1 else "")
+            )
+
+    results = {
+        "meta": run_metadata(
+            {**{k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}, "cpu_count": os.cpu_count()}
+        ),
+        "rows": rows,
+    }
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
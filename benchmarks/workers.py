@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import ServerThread, free_port, rss_mb, run_metadata, save_results
+from benchmarks.fake_openai import FakeOpenAIConfig, create_app
+from benchmarks.run import ASK_QUERIES, REPO_ROOT, _configure_env, _ensure_index, _load, _prepare_workspace, _synthetic_store
+
+
+def _pad_index(vectors: int) -> Dict[str, Any]:
+    """
+    Grow the bundled index with `vectors` synthetic chunks so the index and
+    docstore dominate worker memory, as they do on a real corpus.
+    """
+    from app.ingestion.embeddings import get_embeddings
+    from app.retriever.faiss_store import FAISSStore
+
+    _ensure_index()
+    fs = FAISSStore()
+    store = fs.load(get_embeddings())
+    if vectors:
+        padding, _ = _synthetic_store(vectors, store.index.d)
+        store.merge_from(padding)
+        store.save_local(str(fs.index_dir))
+    files = [fs.index_dir / "index.faiss", fs.index_dir / "index.pkl"]
+    return {"vectors": store.index.ntotal, "index_files_mb": round(sum(p.stat().st_size for p in files) / 1e6, 1)}
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        return [int(c) for c in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+    except OSError:
+        return []
+
+
+def _memory(master: int) -> Dict[str, Any]:
+    workers = [rss_mb(pid) for pid in _children(master)]
+    master_mem = rss_mb(master)
+    return {
+        "master": master_mem,
+        "workers": workers,
+        "worker_rss_mb_mean": round(sum(w.get("vmrss_mb", 0.0) for w in workers) / max(1, len(workers)), 1),
+        "worker_pss_mb_mean": round(sum(w.get("pss_mb", 0.0) for w in workers) / max(1, len(workers)), 1),
+        # PSS adds up across processes: this is what the server really costs.
+        "total_pss_mb": round(master_mem.get("pss_mb", 0.0) + sum(w.get("pss_mb", 0.0) for w in workers), 1),
+        "total_rss_mb": round(master_mem.get("vmrss_mb", 0.0) + sum(w.get("vmrss_mb", 0.0) for w in workers), 1),
+    }
+
+
+def _wait_ready(proc: subprocess.Popen, url: str, workers: int, timeout_s: float) -> None:
+    """
+    Every worker forked, readiness OK, and worker RSS stable (each worker
+    has finished its own start-up, which matters without preload).
+    """
+    deadline = time.time() + timeout_s
+    last: Optional[List[float]] = None
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        pids = _children(proc.pid)
+        try:
+            ok = httpx.get(f"{url}/health/ready", timeout=5.0).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        rss = [rss_mb(pid).get("vmrss_mb", 0.0) for pid in pids]
+        if ok and len(pids) == workers and last is not None and len(last) == len(rss):
+            if all(abs(a - b) < 1.0 for a, b in zip(rss, last)):
+                return
+        last = rss
+        time.sleep(0.5)
+    raise RuntimeError(f"gunicorn with {workers} workers not ready after {timeout_s}s")
+
+
+def _serve(workers: int, preload: bool, args: argparse.Namespace) -> Dict[str, Any]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY=str(workers), PRELOAD_APP="1" if preload else "0")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(REPO_ROOT / "gunicorn.conf.py"), "app.main:app"],
+        cwd=str(REPO_ROOT),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(proc, url, workers, args.startup_timeout)
+        startup_s = time.perf_counter() - t0
+        idle = _memory(proc.pid)
+        payload = {"top_k": 5, "answer_mode": args.answer_mode}
+        run = _load(
+            url,
+            args.clients_per_worker * workers,
+            args.requests,
+            lambda i: ("/ask", {**payload, "query": ASK_QUERIES[i % len(ASK_QUERIES)]}),
+        )
+        loaded = _memory(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {
+        "workers": workers,
+        "preload": preload,
+        "startup_s": round(startup_s, 2),
+        "idle": idle,
+        "after_load": loaded,
+        **{k: run[k] for k in ("throughput_rps", "latency", "errors")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS/PSS and throughput of gunicorn workers, with and without preload")
+    parser.add_argument("--workers", type=lambda v: [int(x) for x in v.split(",")], default=None)
+    parser.add_argument("--preload", choices=["both", "on", "off"], default="both")
+    parser.add_argument("--pad-vectors", type=int, default=100_000, help="synthetic chunks added to the index")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--answer-mode", default="extractive", help="/ask answer_mode (extractive = no LLM call)")
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, cores})
+    modes = {"both": [False, True], "on": [True], "off": [False]}[args.preload]
+
+    results: Dict[str, Any] = {
+        "meta": run_metadata({k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "out"}),
+        "rows": [],
+    }
+    workspace = Path(tempfile.mkdtemp(prefix="assistant-workers-"))
+    try:
+        _prepare_workspace(workspace, 1)
+        with ServerThread(create_app(FakeOpenAIConfig(embed_latency_ms=args.embed_latency_ms))) as fake:
+            _configure_env(workspace, f"{fake.url}/v1")
+            results["index"] = _pad_index(args.pad_vectors)
+            print(f"index: {results['index']}")
+            for workers in worker_counts:
+                for preload in modes:
+                    row = _serve(workers, preload, args)
+                    results["rows"].append(row)
+                    print(
+                        f"workers={workers} preload={'on' if preload else 'off'}: "
+                        f"total PSS {row['after_load']['total_pss_mb']} MB "
+                        f"(RSS {row['after_load']['total_rss_mb']} MB), "
+                        f"worker PSS {row['after_load']['worker_pss_mb_mean']} MB, "
+                        f"{row['throughput_rps']} req/s, p95 {row['latency'].get('p95_ms')} ms, "
+                        f"startup {row['startup_s']} s"
+                    )
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    path = save_results(results, args.out)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Multi-worker serving: gunicorn master + uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+With preload (default) the master builds the service container (FAISS index,
+docstore, summary store, clients) once and forks WEB_CONCURRENCY workers
+that share those pages copy-on-write.
+
+Environment:
+    WEB_CONCURRENCY   number of workers (default 1)
+    HOST / PORT       bind address (default 0.0.0.0:8000)
+    PRELOAD_APP       1 = load once before fork (default), 0 = load per worker
+    WORKER_TIMEOUT    seconds before a silent worker is restarted (default 120)
+"""
+from __future__ import annotations
+
+import gc
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "1").strip().lower() in {"1", "true", "yes", "y", "on"}
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # No collections in the master while the index is loaded: avoids freed
+    # holes in pages that are about to be shared (see gc.freeze docs).
+    if server.cfg.preload_app:
+        gc.disable()
+
+
+def when_ready(server):
+    # Runs in the master after app.main is imported and before any fork.
+    if server.cfg.preload_app:
+        from app.core.container import preload_container
+
+        preload_container()
+
+
+def post_fork(server, worker):
+    gc.enable()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import re
+import statistics
+from typing import Dict, Iterator, List
+
+from langchain_core.messages import AIMessageChunk
+from pydantic import ValidationError
+
+from app.core.config import get_settings
+from app.schemas.responses import IssueSummaryOutput
+from app.tools.issue_summary_tool import issue_summary_tool
+
+_FIELD_RE = re.compile(r"^(Title|Description|Environment|Severity|Proposed Fix):\s*(.+)$", re.MULTILINE)
+
+# How real completions tend to deviate from "JSON only".
+VARIANTS = ["plain", "fenced", "preamble_and_trailer", "lowercase_severity"]
+
+
+def _bug_records(text: str) -> List[Dict[str, str]]:
+    records = []
+    for block in re.split(r"(?m)^﻿?Bug #\d+\s*$", text):
+        fields = dict(_FIELD_RE.findall(block))
+        if fields.get("Title"):
+            records.append(fields)
+    return records
+
+
+def _completion(record: Dict[str, str], variant: str) -> str:
+    env = record.get("Environment", "")
+    obj = {
+        "reported_issues": [record["Title"]],
+        "affected_components": [p.strip() for p in env.split(",") if p.strip()],
+        "severity": record.get("Severity", "Unknown"),
+        "notes": record.get("Proposed Fix", ""),
+    }
+    if variant == "lowercase_severity":
+        obj["severity"] = obj["severity"].lower()
+    body = json.dumps(obj, indent=2)
+    if variant == "fenced":
+        return f"```json\n{body}\n```"
+    if variant == "preamble_and_trailer":
+        return (
+            f"Here is the structured summary:\n{body}\n\n"
+            "The severity reflects the user impact described in the report; "
+            "let me know if you want a more detailed breakdown of each component."
+        )
+    return body
+
+
+class StubStreamingChat:
+    """
+    Streams a canned completion in ~4-char "tokens".
+    """
+
+    def __init__(self, completion: str, token_chars: int = 4):
+        self.tokens = [completion[i : i + token_chars] for i in range(0, len(completion), token_chars)]
+        self.consumed = 0
+
+    def stream(self, messages, **kwargs) -> Iterator[AIMessageChunk]:
+        for tok in self.tokens:
+            self.consumed += 1
+            yield AIMessageChunk(content=tok)
+
+
+def _baseline_parse_ok(completion: str) -> bool:
+    # Previous implementation: bare json.loads on the whole completion, then
+    # IssueSummaryOutput(...) outside the try (a ValidationError failed the request).
+    try:
+        data = json.loads(completion.strip())
+    except Exception:
+        return False
+    try:
+        IssueSummaryOutput(
+            reported_issues=data.get("reported_issues", []),
+            affected_components=data.get("affected_components", []),
+            severity=data.get("severity", "Unknown"),
+            notes=data.get("notes"),
+        )
+    except ValidationError:
+        return False
+    return True
+
+
+def main():
+    s = get_settings()
+    s.ISSUE_SUMMARY_OUTPUT_MODE = "stream"
+
+    text = (s.DATA_DIR / "ai_test_bug_report.txt").read_text(encoding="utf-8")
+    records = _bug_records(text)
+    print(f"bug records: {len(records)}\n")
+    print(f"{'variant':<22} | {'old fail %':>10} | {'new fail %':>10} | {'tokens emitted':>14} | {'tokens read':>11}")
+    print("-" * 80)
+
+    for variant in VARIANTS:
+        old_fail = new_fail = 0
+        emitted: List[int] = []
+        read: List[int] = []
+        for r in records:
+            completion = _completion(r, variant)
+            old_fail += not _baseline_parse_ok(completion)
+
+            stub = StubStreamingChat(completion)
+            out = issue_summary_tool(r["Description"], llm=stub)
+            ok = out.severity == r.get("Severity", "Unknown") and out.reported_issues == [r["Title"]]
+            new_fail += not ok
+            emitted.append(len(stub.tokens))
+            read.append(stub.consumed)
+
+        n = len(records)
+        print(
+            f"{variant:<22} | {100.0 * old_fail / n:>10.1f} | {100.0 * new_fail / n:>10.1f} | "
+            f"{statistics.mean(emitted):>14.1f} | {statistics.mean(read):>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import random
+import string
+import sys
+import time
+from typing import Callable, Dict
+
+from app.agent.prompt_builder import PROMPTS, build_messages
+from app.agent.prompts import (
+    INTERNAL_QA_SYSTEM_PROMPT,
+    INTERNAL_QA_USER_PROMPT_TEMPLATE,
+)
+
+
+def _random_text(rng: random.Random, n: int) -> str:
+    alphabet = string.ascii_letters + string.digits + " {}\n\"'%"
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def check_prefix_stability(samples: int = 200) -> None:
+    """
+    Every rendered request for a prompt must start with the same bytes:
+    the system message is identical and the user message starts with the
+    static prefix. Inputs include braces/quotes to catch format leaks.
+    """
+    rng = random.Random(0)
+    for name, prompt in PROMPTS.items():
+        assert prompt.static_user_prefix.strip(), f"{name}: empty static user prefix"
+
+        system_msgs = set()
+        for _ in range(samples):
+            values = {f: _random_text(rng, rng.randint(0, 400)) for f in prompt.fields}
+            messages = build_messages(name, **values)
+            system_msgs.add(messages[0]["content"].encode("utf-8"))
+            user = messages[1]["content"].encode("utf-8")
+            assert user.startswith(prompt.static_user_prefix.encode("utf-8")), name
+
+        assert len(system_msgs) == 1, f"{name}: system prompt is not byte-stable"
+        print(f"[ok] {name}: static prefix {len(prompt.static_prefix)} chars stable over {samples} renders")
+
+
+def _time(fn: Callable[[], object], n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6  # us/op
+
+
+def bench_render(n: int = 100_000) -> Dict[str, float]:
+    context = "[1] (ai_test_bug_report:chunk_3)\n" + "Upload stuck at 99%. " * 40
+    question = "What severity is the upload stuck at 99% bug?"
+
+    def _str_format():
+        return [
+            {"role": "system", "content": INTERNAL_QA_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": INTERNAL_QA_USER_PROMPT_TEMPLATE.format(context=context, question=question),
+            },
+        ]
+
+    def _builder():
+        return build_messages("internal_qa", context=context, question=question)
+
+    return {
+        "inline str.format": _time(_str_format, n),
+        "build_messages": _time(_builder, n),
+    }
+
+
+def main():
+    check_prefix_stability()
+    print("\nRender cost (internal_qa, ~1KB context):")
+    for label, us in bench_render().items():
+        print(f"  {label:<30} {us:8.2f} us/op")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except AssertionError as e:
+        print(f"Prefix stability check failed: {e}")
+        sys.exit(1)
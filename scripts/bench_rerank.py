@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import get_settings
+from app.ingestion.loader import flatten_documents, load_all_corpora
+from app.ingestion.splitter import split_documents
+from app.retriever.rerank import get_scorer, rerank
+
+QUERIES = [
+    "upload stuck at 99%",
+    "search results for acronyms are wrong",
+    "email notifications are not sent",
+    "what severity is the broken image preview bug?",
+    "mobile buttons overlapping",
+]
+
+
+def _candidate_pool(chunk_size: int) -> List[Document]:
+    s = get_settings()
+    docs = flatten_documents(load_all_corpora(s.DATA_DIR))
+    return split_documents(docs, chunk_size=chunk_size, chunk_overlap=0)
+
+
+def _candidates(pool: List[Document], n: int) -> List[Tuple[Document, float]]:
+    # Repeat the pool if the corpus is smaller than n; distances are synthetic.
+    out = []
+    for i in range(n):
+        out.append((pool[i % len(pool)], 0.5 + i * 0.01))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU latency of the re-ranking stage per candidate count")
+    parser.add_argument("--scorer", default="lexical", choices=["lexical", "cross_encoder"])
+    parser.add_argument("--model", default=get_settings().RERANK_MODEL)
+    parser.add_argument("--counts", default="10,20,50,100,200")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=400)
+    args = parser.parse_args()
+
+    scorer = get_scorer(args.scorer, model_name=args.model)
+    pool = _candidate_pool(args.chunk_size)
+    counts = [int(c) for c in args.counts.split(",") if c.strip()]
+
+    print(f"scorer={args.scorer} pool_chunks={len(pool)} repeat={args.repeat}")
+    print(f"{'candidates':>10} | {'p50 ms':>8} | {'p95 ms':>8} | {'max ms':>8} | {'us/cand':>8}")
+    print("-" * 56)
+
+    for n in counts:
+        cands = _candidates(pool, n)
+        # warm-up (model load / caches)
+        rerank(QUERIES[0], cands, top_k=5, scorer=scorer, budget_ms=1e9)
+
+        samples: List[float] = []
+        for r in range(args.repeat):
+            q = QUERIES[r % len(QUERIES)]
+            t0 = time.perf_counter()
+            rerank(q, cands, top_k=5, scorer=scorer, budget_ms=1e9)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+
+        samples.sort()
+        p50 = statistics.median(samples)
+        p95 = samples[int(0.95 * (len(samples) - 1))]
+        print(f"{n:>10} | {p50:>8.3f} | {p95:>8.3f} | {samples[-1]:>8.3f} | {p50 * 1000.0 / n:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+from app.utils.metrics import REGISTRY
+from app.utils.trace import request_trace, span
+
+N = 200_000
+SPANS_PER_REQUEST = 8  # agent.run, route, route.llm, tool, load_index, embed, search, llm
+
+
+def _ns_per_op(fn: Callable[[], None], n: int = N) -> float:
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - t0) / n
+
+
+def _noop() -> None:
+    pass
+
+
+def _span_no_trace() -> None:
+    with span("bench.no_trace"):
+        pass
+
+
+def main():
+    baseline = _ns_per_op(_noop)
+    no_trace = _ns_per_op(_span_no_trace)
+
+    with request_trace("bench"):
+        in_trace = _ns_per_op(lambda: _span_no_trace())
+
+    def _request() -> None:
+        with request_trace() as rec:
+            for i in range(SPANS_PER_REQUEST):
+                with span(f"bench.stage{i}"):
+                    pass
+        rec.server_timing()
+
+    per_request = _ns_per_op(_request, n=N // 10)
+
+    t0 = time.perf_counter()
+    REGISTRY.render()
+    render_ms = (time.perf_counter() - t0) * 1000.0
+
+    print(f"empty call                      {baseline:8.0f} ns")
+    print(f"span() outside request          {no_trace - baseline:8.0f} ns")
+    print(f"span() inside request           {in_trace - baseline:8.0f} ns")
+    print(f"request with {SPANS_PER_REQUEST} spans + header   {per_request / 1000.0:8.1f} us")
+    print(f"/metrics render                 {render_ms:8.2f} ms")
+    print(
+        f"\nOverhead vs a 5 ms extractive request: {per_request / 5e6 * 100.0:.3f}%"
+        f" | vs a 500 ms LLM request: {per_request / 5e8 * 100.0:.5f}%"
+    )
+
+
+if __name__ == "__main__":
+    main()
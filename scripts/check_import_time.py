@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded on first use (client creation, index load, document loading),
+# never at import time of an entry point.
+HEAVY_MODULES = (
+    "openai",
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_openai",
+    "langchain_text_splitters",
+    "faiss",
+    "numpy",
+    "pypdf",
+    "unstructured",
+    "docx",
+    "torch",
+    "sentence_transformers",
+)
+
+
+@dataclass(frozen=True)
+class ImportBudget:
+    module: str
+    budget_ms: float
+    forbidden: Sequence[str] = HEAVY_MODULES
+
+
+# Budgets are ~2x the import time on a 1-vCPU dev container; pass --scale
+# on slower machines. FastAPI alone is most of app.main.
+BUDGETS = (
+    ImportBudget("app.main", 1000.0),
+    ImportBudget("app.agent.agent", 450.0),
+    ImportBudget("app.tools.issue_summary_tool", 450.0),
+    ImportBudget("app.retriever.faiss_store", 400.0),
+    ImportBudget("scripts.ingest", 350.0),
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str) -> Tuple[float, Set[str]]:
+    """
+    Cumulative import time (ms) of `module` in a fresh interpreter and
+    every module imported along the way (python -X importtime).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(REPO_ROOT),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    imported: Set[str] = set()
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        imported.add(name)
+        if name == module:
+            total_us = int(m.group(2))
+    return total_us / 1000.0, imported
+
+
+def check(budget: ImportBudget, runs: int, scale: float) -> Dict[str, object]:
+    samples: List[float] = []
+    imported: Set[str] = set()
+    for _ in range(runs):
+        ms, imported = measure(budget.module)
+        samples.append(ms)
+    best = min(samples)  # least noisy estimate of the import cost
+    heavy = sorted(
+        name for name in imported if any(name == f or name.startswith(f + ".") for f in budget.forbidden)
+    )
+    roots = sorted({name.split(".")[0] for name in heavy})
+    return {
+        "module": budget.module,
+        "ms": round(best, 1),
+        "budget_ms": round(budget.budget_ms * scale, 1),
+        "over_budget": best > budget.budget_ms * scale,
+        "forbidden_imports": roots,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if an entry point imports heavy libraries eagerly or exceeds its import-time budget"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="imports per module; the fastest counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    parser.add_argument("--module", action="append", help="check only these entry points (repeatable)")
+    args = parser.parse_args()
+
+    budgets = [b for b in BUDGETS if not args.module or b.module in args.module]
+    failed = False
+    for budget in budgets:
+        r = check(budget, args.runs, args.scale)
+        ok = not r["over_budget"] and not r["forbidden_imports"]
+        failed |= not ok
+        line = f"{'OK  ' if ok else 'FAIL'} {r['module']:<32} {r['ms']:>7.1f} ms (budget {r['budget_ms']:.0f} ms)"
+        if r["forbidden_imports"]:
+            line += f" | eager heavy imports: {', '.join(r['forbidden_imports'])}"
+        print(line)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
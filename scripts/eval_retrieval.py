@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import get_settings
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_QUERIES = REPO_ROOT / "benchmarks" / "retrieval_queries.jsonl"
+
+# Record headers in the corpora: "Bug #12" (bug reports), "Feedback #7:" (feedback).
+_RECORD_RE = re.compile(r"^\ufeff?(Bug|Feedback) #(\d+)", flags=re.MULTILINE)
+
+
+def load_queries(path: Path) -> List[Dict[str, Any]]:
+    """
+    JSONL of {"question": str, "relevant": ["bug:12", "feedback:7", ...]}.
+    """
+    queries = []
+    for n, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if not row.get("question") or not row.get("relevant"):
+            raise RuntimeError(f"{path}:{n}: expected 'question' and a non-empty 'relevant' list")
+        queries.append({"question": row["question"], "relevant": {r.lower() for r in row["relevant"]}})
+    return queries
+
+
+def _doc_key(md: Dict[str, Any]) -> Tuple[Any, Any]:
+    return md.get("file_path") or md.get("file_name"), md.get("page")
+
+
+def record_spans(documents: Sequence[Any]) -> Dict[Tuple[Any, Any], List[Tuple[int, int, str]]]:
+    """
+    Per source document: (start, end, label) of each record, e.g. "bug:12".
+    """
+    spans: Dict[Tuple[Any, Any], List[Tuple[int, int, str]]] = {}
+    for d in documents:
+        text = d.page_content
+        heads = [(m.start(), f"{m.group(1).lower()}:{m.group(2)}") for m in _RECORD_RE.finditer(text)]
+        ends = [start for start, _ in heads[1:]] + [len(text)]
+        spans[_doc_key(d.metadata or {})] = [(start, end, label) for (start, label), end in zip(heads, ends)]
+    return spans
+
+
+def chunk_labels(chunk: Any, spans: Dict[Tuple[Any, Any], List[Tuple[int, int, str]]]) -> Set[str]:
+    """
+    Records a chunk overlaps (splitter start_index + length against record spans).
+    """
+    md = chunk.metadata or {}
+    start = md.get("start_index")
+    if start is None or start < 0:
+        return {f"{m.group(1).lower()}:{m.group(2)}" for m in _RECORD_RE.finditer(chunk.page_content)}
+    end = start + len(chunk.page_content)
+    return {label for s, e, label in spans.get(_doc_key(md), []) if s < end and start < e}
+
+
+def score(ranked_labels: List[List[Set[str]]], queries: List[Dict[str, Any]], ks: Sequence[int]) -> Dict[str, float]:
+    """
+    recall@k: share of a query's relevant records found in its top k chunks
+    (averaged over queries); MRR: reciprocal rank of the first chunk that
+    covers a relevant record.
+    """
+    out: Dict[str, float] = {}
+    for k in ks:
+        recalls = []
+        for labels, q in zip(ranked_labels, queries):
+            found = set().union(*labels[:k]) if labels[:k] else set()
+            recalls.append(len(found & q["relevant"]) / len(q["relevant"]))
+        out[f"recall@{k}"] = round(statistics.fmean(recalls), 3)
+    rr = []
+    for labels, q in zip(ranked_labels, queries):
+        rank = next((i for i, ls in enumerate(labels, start=1) if ls & q["relevant"]), None)
+        rr.append(1.0 / rank if rank else 0.0)
+    out["mrr"] = round(statistics.fmean(rr), 3)
+    return out
+
+
+def _ints(raw: str) -> List[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+def _dimensions(raw: str) -> List[Optional[int]]:
+    return [None if x.strip() in ("full", "none", "") else int(x) for x in raw.split(",")]
+
+
+def _embeddings(args: argparse.Namespace):
+    """
+    Embeddings for the run: the selected provider behind the shared cache.
+    """
+    from app.ingestion.embedding_cache import CachedEmbeddings
+    from app.ingestion.embeddings import _openai_embeddings
+    from app.ingestion.hash_embeddings import HashEmbeddings
+
+    s = get_settings()
+    provider = args.embedder or s.EMBEDDING_PROVIDER
+    if provider == "hash":
+        inner, model_id = HashEmbeddings(s.HASH_EMBEDDING_DIM), f"hash-{s.HASH_EMBEDDING_DIM}"
+    else:
+        inner, model_id = (None if args.offline else _openai_embeddings()), s.OPENAI_EMBEDDING_MODEL
+    if args.no_cache:
+        if inner is None:
+            raise RuntimeError("--offline needs the embedding cache (drop --no-cache).")
+        return inner, model_id
+    return CachedEmbeddings(inner, args.cache, model_id, offline=args.offline), model_id
+
+
+def evaluate(args: argparse.Namespace) -> Dict[str, Any]:
+    import numpy as np
+
+    from app.ingestion.loader import flatten_documents, load_all_corpora
+    from app.ingestion.splitter import split_documents
+    from app.retriever.batch import BatchSearcher
+    from app.retriever.quantization import VectorFormat, build_vectorstore, index_bytes
+
+    queries = load_queries(args.queries)
+    ks = sorted(set(_ints(args.top_k)))
+    embeddings, model_id = _embeddings(args)
+    docs = flatten_documents(load_all_corpora(args.data_dir))
+    if not docs:
+        raise RuntimeError(f"No corpus files found in {args.data_dir}")
+    spans = record_spans(docs)
+
+    query_vectors = np.asarray(embeddings.embed_documents([q["question"] for q in queries]), dtype=np.float32)
+
+    rows: List[Dict[str, Any]] = []
+    grid = itertools.product(
+        _ints(args.chunk_sizes), _ints(args.chunk_overlaps), args.vector_dtypes.split(","), _dimensions(args.dimensions)
+    )
+    for chunk_size, overlap, dtype, dims in grid:
+        if overlap >= chunk_size:
+            continue
+        misses_before = getattr(embeddings, "misses", 0)
+        t0 = time.perf_counter()
+        chunks = split_documents(docs, chunk_size=chunk_size, chunk_overlap=overlap)
+        store = build_vectorstore(chunks, embeddings, VectorFormat(dtype=dtype, dimensions=dims))
+        build_s = time.perf_counter() - t0
+
+        searcher = BatchSearcher(store)
+        result = searcher.search(query_vectors, max(ks))
+        ranked = [[chunk_labels(d, spans) for d in result.documents(row)] for row in range(len(queries))]
+
+        latencies = []
+        for _ in range(args.repeat):
+            for vec in query_vectors:
+                t = time.perf_counter()
+                store.similarity_search_with_score_by_vector(vec.tolist(), k=max(ks))
+                latencies.append((time.perf_counter() - t) * 1000.0)
+        latencies.sort()
+
+        row = {
+            "chunk_size": chunk_size,
+            "chunk_overlap": overlap,
+            "vector_dtype": dtype,
+            "dimensions": dims,
+            "chunks": len(chunks),
+            "build_s": round(build_s, 3),
+            "embedded": getattr(embeddings, "misses", 0) - misses_before,
+            "index_kb": round(index_bytes(store.index) / 1024, 1),
+            **score(ranked, queries, ks),
+            "query_p50_ms": round(latencies[len(latencies) // 2], 3),
+            "query_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+        }
+        rows.append(row)
+    cache = getattr(embeddings, "path", None)
+    return {
+        "embedding_model": model_id,
+        "embedding_cache": str(cache) if cache else None,
+        "queries": len(queries),
+        "top_k": ks,
+        "results": rows,
+    }
+
+
+def print_table(report: Dict[str, Any]) -> None:
+    ks = report["top_k"]
+    cols = ["chunk_size", "chunk_overlap", "vector_dtype", "dimensions", "chunks", "build_s", "embedded", "index_kb"]
+    cols += [f"recall@{k}" for k in ks] + ["mrr", "query_p50_ms"]
+    heads = ["size", "overlap", "dtype", "dims", "chunks", "build s", "embedded", "index KB"]
+    heads += [f"R@{k}" for k in ks] + ["MRR", "p50 ms"]
+    table = [[("full" if r[c] is None else str(r[c])) for c in cols] for r in report["results"]]
+    widths = [max(len(h), *(len(row[i]) for row in table)) for i, h in enumerate(heads)]
+    print(f"embeddings: {report['embedding_model']} (cache: {report['embedding_cache'] or 'off'}), {report['queries']} queries")
+    print(" | ".join(h.rjust(w) for h, w in zip(heads, widths)))
+    print("-+-".join("-" * w for w in widths))
+    for row in table:
+        print(" | ".join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+def main():
+    s = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Retrieval quality / cost of chunking and index configurations on a labelled query set"
+    )
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES, help="JSONL: question + relevant records")
+    parser.add_argument("--data-dir", type=Path, default=s.DATA_DIR)
+    parser.add_argument("--chunk-sizes", default="500,900,1500")
+    parser.add_argument("--chunk-overlaps", default="0,150")
+    parser.add_argument("--vector-dtypes", default="float32", help="comma list of float32,float16,int8")
+    parser.add_argument("--dimensions", default="full", help="comma list of Matryoshka sizes ('full' = no truncation)")
+    parser.add_argument("--top-k", default="1,3,5,10")
+    parser.add_argument("--embedder", choices=["openai", "hash"], default=None, help="default: EMBEDDING_PROVIDER")
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=s.EMBEDDING_CACHE_PATH or (s.STORAGE_DIR / "embedding_cache.sqlite"),
+        help="SQLite embedding cache shared across configurations and runs",
+    )
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--offline", action="store_true", help="never call the embeddings API; fail on cache misses")
+    parser.add_argument("--repeat", type=int, default=3, help="latency passes over the queries")
+    parser.add_argument("--min-recall", type=float, default=0.0, help="exit 1 if a configuration's recall@<max k> is lower")
+    parser.add_argument("--out", type=Path, default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = evaluate(args)
+    print_table(report)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.out}")
+    key = f"recall@{report['top_k'][-1]}"
+    worst = min((r[key] for r in report["results"]), default=0.0)
+    sys.exit(0 if worst >= args.min_recall else 1)
+
+
+if __name__ == "__main__":
+    main()
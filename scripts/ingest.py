@@ -4,13 +4,25 @@ import argparse
 import json
 from pathlib import Path
 
-from app.ingestion.build_index import build_faiss_index
 from app.core.config import get_settings
 from app.core.logging import setup_logging
 
 logger = setup_logging()
 
 
+def _build_options(args: argparse.Namespace) -> dict:
+    return {
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "summaries": args.summaries,
+        "dedup_feedback": args.dedup_feedback,
+        "vector_dtype": args.vector_dtype,
+        "dimensions": args.dimensions,
+        "sharding": args.sharding,
+        "num_shards": args.shards,
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(description="Build FAISS index from internal documents")
     parser.add_argument(
@@ -25,22 +37,95 @@ def main():
         default=150,
         help="Chunk overlap for text splitting (default: 150)",
     )
+    parser.add_argument(
+        "--summaries",
+        choices=["off", "llm", "fields"],
+        default=None,
+        help="Precompute bug-report summaries: llm, fields (no LLM) or off (default: SUMMARY_PRECOMPUTE)",
+    )
+    parser.add_argument(
+        "--dedup-feedback",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Collapse near-duplicate feedback lines into one indexed representative (default: FEEDBACK_DEDUP_ENABLED)",
+    )
+    parser.add_argument(
+        "--vector-dtype",
+        choices=["float32", "float16", "int8"],
+        default=None,
+        help="Index vector storage: float32, float16 or int8 scalar quantization (default: INDEX_VECTOR_DTYPE)",
+    )
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=None,
+        help="Keep the leading N embedding dimensions (Matryoshka truncation; default: INDEX_DIMENSIONS)",
+    )
+    parser.add_argument(
+        "--sharding",
+        choices=["none", "source", "hash"],
+        default=None,
+        help="One index per corpus (source), hash partitions (hash) or a single index (default: INDEX_SHARDING)",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Number of hash partitions for --sharding hash (default: INDEX_HASH_SHARDS)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and apply added/changed/removed files in DATA_DIR to the index incrementally "
+        "(builds first if there is no index yet)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=None,
+        help="--watch: apply changes once files are quiet for this many seconds (default: WATCH_DEBOUNCE_S)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=None,
+        help="--watch: seconds between directory scans (default: WATCH_POLL_S)",
+    )
     args = parser.parse_args()
 
+    # Imported after argument parsing: --help and usage errors stay instant.
+    from app.ingestion.build_index import build_faiss_index
+
     settings = get_settings()
 
     logger.info("Starting ingestion pipeline")
     logger.info("Data directory: %s", settings.DATA_DIR.resolve())
     logger.info("FAISS index directory: %s", settings.FAISS_INDEX_DIR.resolve())
 
-    manifest = build_faiss_index(
-        chunk_size=args.chunk_size,
-        chunk_overlap=args.chunk_overlap,
-    )
+    if args.watch:
+        from app.ingestion.watcher import watch
+        from app.retriever.faiss_store import FAISSStore
+
+        store = FAISSStore()
+        if store.exists() and "files" in store.read_manifest():
+            logger.info("Index generation %s found; watching for changes", store.generation_id())
+        else:
+            build_faiss_index(**_build_options(args))
+            logger.info("Initial index built; watching for changes")
+        try:
+            watch(poll_s=args.poll_interval, debounce_s=args.debounce)
+        except KeyboardInterrupt:
+            logger.info("Watcher stopped")
+        return
+
+    manifest = build_faiss_index(**_build_options(args))
 
     logger.info("Ingestion completed successfully")
-    logger.info("Manifest summary:\n%s", json.dumps(manifest, indent=2))
+    logger.info("Manifest summary:\n%s", json.dumps({k: v for k, v in manifest.items() if k != "files"}, indent=2))
 
 
 if __name__ == "__main__":
-    main()
+    from app.utils.usage_ledger import usage_scope
+
+    with usage_scope("ingestion"):
+        main()